@@ -1,121 +1,382 @@
-import streamlit as st
-from langchain_groq import ChatGroq
-from langchain_core.prompts import PromptTemplate
-from langchain_core.messages import HumanMessage
-from langchain_classic import hub
+import re
+import time
+import asyncio
+import functools
 from langchain_core.output_parsers import StrOutputParser
-from typing import Dict, Any
-from config import SECRETS, AgentState
+from typing import Dict, Any, List, Optional, Tuple
+from config import AgentState, ROUTER_CONFIDENCE, CONTEXT_TOKEN_BUDGET
+from context_packer import pack_context
+from chunker import ChunkIndex
+from answer_cache import QUERY_EMBEDDINGS
+from llm import get_chat_model, get_prompt
+from router import normalize_route
+from gazetteer import get_city_gazetteer
+from speculation import Speculation
+from memory import format_history
+from run_log import log
+from tracing import span
 
+# Every agent has an async twin (a-prefixed) that awaits the LLM, retriever
+# and embedding calls instead of blocking; app.initialize_system binds both
+# to the same graph node.
 
-def router_agent(state: AgentState, temperature: float) -> dict:
-    st.session_state.logs.append("---ROUTER AGENT---")
-    model = ChatGroq(
-        temperature=temperature,
-        model_name="openai/gpt-oss-20b",
-        groq_api_key=SECRETS["GROQ_API_KEY"]
-    )
 
-    prompt = PromptTemplate(
-        template="""As the Router Agent, analyze the user's question and conversation history to determine the best next step.
+def _fast_route(state: AgentState, fast_router: Any) -> Optional[dict]:
+    route, confidence, tier = fast_router.classify(state.current_query, QUERY_EMBEDDINGS.get(state.query_embedding_key), threshold=ROUTER_CONFIDENCE)
+    fast_router.record(tier)
+    if tier == "llm":
+        return None
+    log(f"Routing decision: {route} ({tier}, confidence {confidence:.2f})")
+    return {"next_step": route}
 
-        Conversation History:
-        {history}
 
-        Current Question: {question}
+def _router_messages(state: AgentState) -> list:
+    history_str = format_history(state.chat_history, state.conversation_summary)
+    return get_prompt("router").format_messages(question=state.current_query, history=history_str)
 
-        Choose one of these actions:
-        - "retrieve": If question can be answered with known documents (from internal knowledge base)
-        - "weather_search": If question information about weather or climate for any location
 
-        Only respond with the action word.""",
-        input_variables=["question", "history"]
-    )
+def _routing_result(response: Any) -> dict:
+    decision = normalize_route(response.content)
+    log(f"Routing decision: {decision}")
+    return {"next_step": decision}
 
-    history_str = "".join([f"{m.type}: {m.content}" for m in state.chat_history[-5:]])
-    response = model.invoke(prompt.format(question=state.current_query, history=history_str))
-    decision = response.content.strip().lower()
 
-    st.session_state.logs.append(f"Routing decision: {decision}")
-    return {"next_step": decision}
+def router_agent(state: AgentState, temperature: float, fast_router: Any = None) -> dict:
+    log("---ROUTER AGENT---")
+    if fast_router is not None:
+        fast = _fast_route(state, fast_router)
+        if fast is not None:
+            return fast
+
+    response = get_chat_model(temperature).invoke(_router_messages(state))
+    return _routing_result(response)
+
+
+async def arouter_agent(state: AgentState, temperature: float, fast_router: Any = None) -> dict:
+    log("---ROUTER AGENT---")
+    if fast_router is not None:
+        # the centroid tier may need to embed the query
+        fast = await asyncio.to_thread(_fast_route, state, fast_router)
+        if fast is not None:
+            return fast
+
+    response = await get_chat_model(temperature).ainvoke(_router_messages(state))
+    return _routing_result(response)
+
+
+def _retrieval_kwargs(state: AgentState) -> dict:
+    # pushed down into the vector search as a payload filter
+    return {"sources": state.source_filter} if state.source_filter else {}
+
 
+def _retrieval_result(docs_list_objects: list) -> dict:
+    retrieved_content_with_meta = []
+    for doc in docs_list_objects:
+        retrieved_content_with_meta.append({
+            "content": doc.page_content,
+            "metadata": doc.metadata
+        })
+    log(f"Retrieved {len(retrieved_content_with_meta)} documents")
+    return {"retrieved_docs": retrieved_content_with_meta}
 
 
 def retrieve_agent(state: AgentState, retriever_instance: Any) -> dict:
-    st.session_state.logs.append("---RETRIEVAL AGENT---")
-    query = state.current_query
+    log("---RETRIEVAL AGENT---")
+    try:
+        return _retrieval_result(retriever_instance.invoke(state.current_query, **_retrieval_kwargs(state)))
+    except Exception as e:
+        log(f"Retrieval error: {str(e)}")
+        return {"retrieved_docs": []}
+
+
+async def aretrieve_agent(state: AgentState, retriever_instance: Any) -> dict:
+    log("---RETRIEVAL AGENT---")
     try:
-        docs_list_objects = retriever_instance.invoke(query)
-        retrieved_content_with_meta = []
-        for doc in docs_list_objects:
-            retrieved_content_with_meta.append({
-                "content": doc.page_content,
-                "metadata": doc.metadata
-            })
-        st.session_state.logs.append(f"Retrieved {len(retrieved_content_with_meta)} documents")
-        return {"retrieved_docs": retrieved_content_with_meta}
+        return _retrieval_result(await retriever_instance.ainvoke(state.current_query, **_retrieval_kwargs(state)))
     except Exception as e:
-        st.session_state.logs.append(f"Retrieval error: {str(e)}")
+        log(f"Retrieval error: {str(e)}")
         return {"retrieved_docs": []}
 
 
+def _match_city(query: str, gazetteer: Any) -> Optional[str]:
+    # the bundled gazetteer covers common cities; the LLM is only the fallback
+    city_name = (gazetteer or get_city_gazetteer()).find(query)
+    if city_name:
+        log(f"City matched locally: {city_name}")
+    return city_name
+
+
+def _extract_city_with_llm(query: str, temperature: float) -> str:
+    model = get_chat_model(temperature)
+    res = model.invoke(get_prompt("city_extraction").format_messages(question=query))
+    return res.content.strip()
+
+
+async def _aextract_city_with_llm(query: str, temperature: float) -> str:
+    model = get_chat_model(temperature)
+    res = await model.ainvoke(get_prompt("city_extraction").format_messages(question=query))
+    return res.content.strip()
+
 
-def weather_search_agent(state: AgentState, weather_search_tool: Any, temperature: float) -> dict:
-    st.session_state.logs.append("---WEATHER SEARCH AGENT---")
+def _fetch_weather(city_name: str, weather_search_tool: Any, weather_cache: Any) -> str:
+    def fetch(city: str) -> str:
+        # only real API calls are spans; cache hits never get here
+        with span("openweathermap", "weather", city=city):
+            return weather_search_tool.run(city)
+
+    if weather_cache is not None and city_name:
+        return weather_cache.get(city_name, fetch)
+    return fetch(city_name)
+
+
+def _weather_result(city_name: str, results: str) -> dict:
+    weather_results_with_meta = [{
+        "content": results,
+        "metadata": {"source": "weather_search"}
+    }]
+
+    log(f"Found weather results for: {city_name}")
+    return {"retrieved_docs": weather_results_with_meta}
+
+
+def weather_search_agent(state: AgentState, weather_search_tool: Any, temperature: float, weather_cache: Any = None, gazetteer: Any = None) -> dict:
+    log("---WEATHER SEARCH AGENT---")
     query = state.current_query
     try:
-        model = ChatGroq(
-            temperature=temperature,
-            model_name="openai/gpt-oss-20b",
-            groq_api_key=SECRETS["GROQ_API_KEY"]
-        )
-        res = model.invoke([
-            HumanMessage(content=f"""
-        You are given a question and must extract the city name from it.
-        Respond ONLY with the city name (no extra text). If no city is found, respond with an empty string.
-        Question: {query}
-        """)
-        ])
-        city_name = res.content.strip()
-        results = weather_search_tool.run(city_name)
-
-        weather_results_with_meta = [{
-            "content": results,
-            "metadata": {"source": "weather_search"}
-        }]
-
-        st.session_state.logs.append(f"Found weather results for: {city_name}")
-        return {"retrieved_docs": weather_results_with_meta}
+        city_name = _match_city(query, gazetteer) or _extract_city_with_llm(query, temperature)
+        return _weather_result(city_name, _fetch_weather(city_name, weather_search_tool, weather_cache))
     except Exception as e:
-        st.session_state.logs.append(f"weather search error: {str(e)}")
+        log(f"weather search error: {str(e)}")
         return {"retrieved_docs": []}
 
 
-def generate_agent(state: AgentState , temperature: float) -> dict:
-    st.session_state.logs.append("---GENERATION AGENT---")
-    if not state.retrieved_docs:
-        st.session_state.logs.append("No context available for generation.")
-        return {"generated_answer": "I don't have enough information to answer that question."}
+async def aweather_search_agent(state: AgentState, weather_search_tool: Any, temperature: float, weather_cache: Any = None, gazetteer: Any = None) -> dict:
+    log("---WEATHER SEARCH AGENT---")
+    query = state.current_query
+    try:
+        city_name = _match_city(query, gazetteer) or await _aextract_city_with_llm(query, temperature)
+        # OpenWeatherMapAPIWrapper is sync-only; cache hits return without touching the network
+        results = await asyncio.to_thread(_fetch_weather, city_name, weather_search_tool, weather_cache)
+        return _weather_result(city_name, results)
+    except Exception as e:
+        log(f"weather search error: {str(e)}")
+        return {"retrieved_docs": []}
+
+
+def _speculative_result(decision: dict, prefetched: Any, city_name: Optional[str]) -> dict:
+    route = decision["next_step"]
+    if prefetched is None:
+        return decision
+    log(f"Using speculative {route} result")
+    if route == "retrieve":
+        update = _retrieval_result(prefetched)
+    else:
+        update = _weather_result(city_name, prefetched)
+    return {**decision, **update, "speculative_route": route}
+
+
+def speculative_router_agent(state: AgentState, temperature: float, retriever_instance: Any, fast_router: Any = None, weather_search_tool: Any = None, weather_cache: Any = None, gazetteer: Any = None) -> dict:
+    """Router that overlaps the LLM decision with retrieval (and a gazetteer-matched
+    weather fetch when ``weather_search_tool`` is given); the losing branch is dropped."""
+    log("---ROUTER AGENT---")
+    if fast_router is not None:
+        fast = _fast_route(state, fast_router)
+        if fast is not None:
+            return fast
+
+    speculation = Speculation()
+    speculation.start("retrieve", functools.partial(retriever_instance.invoke, state.current_query, **_retrieval_kwargs(state)))
+    city_name = _match_city(state.current_query, gazetteer) if weather_search_tool is not None else None
+    if city_name:
+        speculation.start("weather_search", _fetch_weather, city_name, weather_search_tool, weather_cache)
+
+    try:
+        decision = _routing_result(get_chat_model(temperature).invoke(_router_messages(state)))
+    except Exception:
+        speculation.discard()
+        raise
+    try:
+        prefetched = speculation.result(decision["next_step"])
+    except Exception as e:
+        # the regular node runs the branch again
+        log(f"Speculative {decision['next_step']} failed: {str(e)}")
+        return decision
+    return _speculative_result(decision, prefetched, city_name)
+
 
-    model = ChatGroq(
-        temperature= temperature,
-        model_name="openai/gpt-oss-20b",
-        groq_api_key=SECRETS["GROQ_API_KEY"]
+async def aspeculative_router_agent(state: AgentState, temperature: float, retriever_instance: Any, fast_router: Any = None, weather_search_tool: Any = None, weather_cache: Any = None, gazetteer: Any = None) -> dict:
+    log("---ROUTER AGENT---")
+    if fast_router is not None:
+        fast = await asyncio.to_thread(_fast_route, state, fast_router)
+        if fast is not None:
+            return fast
+
+    speculation = Speculation()
+    speculation.start_task("retrieve", retriever_instance.ainvoke(state.current_query, **_retrieval_kwargs(state)))
+    city_name = _match_city(state.current_query, gazetteer) if weather_search_tool is not None else None
+    if city_name:
+        speculation.start_task("weather_search", asyncio.to_thread(_fetch_weather, city_name, weather_search_tool, weather_cache))
+
+    try:
+        decision = _routing_result(await get_chat_model(temperature).ainvoke(_router_messages(state)))
+    except Exception:
+        speculation.discard()
+        raise
+    try:
+        prefetched = await speculation.aresult(decision["next_step"])
+    except Exception as e:
+        log(f"Speculative {decision['next_step']} failed: {str(e)}")
+        return decision
+    return _speculative_result(decision, prefetched, city_name)
+
+
+class _GenerationTimer:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.first_token_at = None
+        self.chunks = []
+
+    def add(self, chunk: str) -> None:
+        if self.first_token_at is None and chunk:
+            self.first_token_at = time.perf_counter()
+        self.chunks.append(chunk)
+
+    def result(self, packing: Dict[str, float]) -> dict:
+        finished = time.perf_counter()
+        metrics = {
+            "ttft_ms": ((self.first_token_at or finished) - self.started) * 1000,
+            "generation_ms": (finished - self.started) * 1000,
+            "context_tokens": packing["context_tokens"],
+            "tokens_saved": packing["tokens_saved"],
+        }
+        log(f"Response generated (first token {metrics['ttft_ms']:.0f} ms, total {metrics['generation_ms']:.0f} ms)")
+        return {"generated_answer": "".join(self.chunks), "generation_metrics": metrics}
+
+
+def _rag_inputs(state: AgentState, token_budget: int, chunk_index: Optional[ChunkIndex] = None) -> Tuple[Dict[str, str], Dict[str, float]]:
+    context, packing = pack_context(state.retrieved_docs, token_budget, chunk_index=chunk_index)
+    log(
+        f"Packed {packing['passages']} passages into {packing['context_tokens']} tokens ({packing['tokens_saved']} saved)"
     )
+    return {"context": context, "question": state.current_query}, packing
+
+
+NO_CONTEXT_ANSWER = {"generated_answer": "I don't have enough information to answer that question."}
+
+
+def generate_agent(state: AgentState , temperature: float, token_budget: int = CONTEXT_TOKEN_BUDGET, chunk_index: Optional[ChunkIndex] = None) -> dict:
+    log("---GENERATION AGENT---")
+    if not state.retrieved_docs:
+        log("No context available for generation.")
+        return dict(NO_CONTEXT_ANSWER)
+
+    rag_chain = get_prompt("rag") | get_chat_model(temperature) | StrOutputParser()
+
+    # streamed so the graph can surface tokens as they arrive (stream_mode="messages")
+    inputs, packing = _rag_inputs(state, token_budget, chunk_index)
+    timer = _GenerationTimer()
+    for chunk in rag_chain.stream(inputs):
+        timer.add(chunk)
+    return timer.result(packing)
+
+
+async def agenerate_agent(state: AgentState, temperature: float, token_budget: int = CONTEXT_TOKEN_BUDGET, chunk_index: Optional[ChunkIndex] = None) -> dict:
+    log("---GENERATION AGENT---")
+    if not state.retrieved_docs:
+        log("No context available for generation.")
+        return dict(NO_CONTEXT_ANSWER)
+
+    rag_chain = get_prompt("rag") | get_chat_model(temperature) | StrOutputParser()
 
-    prompt = hub.pull("rlm/rag-prompt")
-    rag_chain = prompt | model | StrOutputParser()
+    inputs, packing = _rag_inputs(state, token_budget, chunk_index)
+    timer = _GenerationTimer()
+    async for chunk in rag_chain.astream(inputs):
+        timer.add(chunk)
+    return timer.result(packing)
 
-    context_content = "".join([doc["content"] for doc in state.retrieved_docs])
 
-    response = rag_chain.invoke({
-        "context": context_content,
-        "question": state.current_query
-    })
+def _query_entities(query: str) -> List[str]:
+    # paraphrases embed alike even when a city, name or number differs: those must match exactly
+    cities = get_city_gazetteer().find_all(query)
+    names = re.findall(r"(?<=\s)[A-Z][\w'-]*", query)
+    numbers = re.findall(r"\d[\d.,:/-]*", query)
+    return sorted({re.sub(r"'s$", "", entity.lower().rstrip(".,:/-")) for entity in cities + names + numbers})
 
-    st.session_state.logs.append("Response generated")
-    return {"generated_answer": response}
+
+def _cache_scope(state: AgentState, scope: str) -> str:
+    return f"{scope}|{','.join(sorted(state.source_filter))}|{','.join(_query_entities(state.current_query or ''))}"
+
+
+def _is_follow_up(state: AgentState) -> bool:
+    # an answer depends on the conversation it was given in, which the cache does not key on
+    return bool(state.chat_history or state.conversation_summary)
+
+
+def _cache_result(state: AgentState, answer_cache: Any, scope: str, query_embedding: list) -> dict:
+    cached = answer_cache.lookup(query_embedding, _cache_scope(state, scope))
+    query_embedding_key = QUERY_EMBEDDINGS.put(state.current_query, query_embedding)
+    if cached is None:
+        log("Answer cache miss")
+        return {"query_embedding_key": query_embedding_key, "cache_hit": False}
+
+    log(f"Answer cache hit (similarity {cached['similarity']:.3f})")
+    return {
+        "query_embedding_key": query_embedding_key,
+        "cache_hit": True,
+        "next_step": cached["route"],
+        "generated_answer": cached["answer"],
+    }
+
+
+def answer_cache_agent(state: AgentState, answer_cache: Any, embeddings: Any, scope: str) -> dict:
+    log("---ANSWER CACHE---")
+    if _is_follow_up(state):
+        log("Answer cache skipped: follow-up question")
+        return {"cache_hit": False}
+    try:
+        query_embedding = embeddings.embed_query(state.current_query)
+    except Exception as e:
+        log(f"Answer cache skipped: {str(e)}")
+        return {"cache_hit": False}
+    return _cache_result(state, answer_cache, scope, query_embedding)
+
+
+async def aanswer_cache_agent(state: AgentState, answer_cache: Any, embeddings: Any, scope: str) -> dict:
+    log("---ANSWER CACHE---")
+    if _is_follow_up(state):
+        log("Answer cache skipped: follow-up question")
+        return {"cache_hit": False}
+    try:
+        query_embedding = await embeddings.aembed_query(state.current_query)
+    except Exception as e:
+        log(f"Answer cache skipped: {str(e)}")
+        return {"cache_hit": False}
+    return _cache_result(state, answer_cache, scope, query_embedding)
+
+
+def remember_answer_agent(state: AgentState, answer_cache: Any, scope: str) -> dict:
+    # answers produced without any context are not worth replaying
+    query_embedding = QUERY_EMBEDDINGS.get(state.query_embedding_key)
+    if query_embedding is not None and state.retrieved_docs and state.generated_answer:
+        answer_cache.store(
+            query_embedding,
+            _cache_scope(state, scope),
+            state.generated_answer,
+            route=state.next_step,
+            query=state.current_query,
+        )
+    return {}
+
+
+def cache_decision(state: AgentState) -> str:
+    return "hit" if state.cache_hit else "miss"
 
 
 def route_decision(state: AgentState) -> str:
-    return state.next_step
\ No newline at end of file
+    return normalize_route(state.next_step)
+
+
+def speculative_route_decision(state: AgentState) -> str:
+    # the winning branch already ran inside the router
+    route = normalize_route(state.next_step)
+    return "generate" if state.speculative_route == route else route
@@ -0,0 +1,130 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import List, Any, Dict, Optional
+import numpy as np
+from config import (
+    ANSWER_CACHE_MAX_ENTRIES, ANSWER_CACHE_SIMILARITY, ANSWER_CACHE_TTL, ANSWER_CACHE_WEATHER_TTL,
+)
+
+
+class SemanticAnswerCache:
+    """Answers keyed by query embedding, scoped to a knowledge version.
+
+    Lookups are one vectorised cosine-similarity pass over a fixed-size
+    float32 matrix; rows from another scope or past their TTL are masked out.
+    When full, the least recently used slot is overwritten.
+    """
+
+    def __init__(self, max_entries: int = 1024, similarity_threshold: float = 0.95, ttl_seconds: float = 86400.0, route_ttls: Optional[Dict[str, float]] = None):
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.route_ttls = route_ttls or {}
+        self.hits = 0
+        self.misses = 0
+        self._matrix: Optional[np.ndarray] = None
+        self._scopes: List[Optional[str]] = [None] * max_entries
+        self._answers: List[Optional[Dict[str, Any]]] = [None] * max_entries
+        self._expires_at = np.zeros(max_entries, dtype=np.float64)
+        self._last_used = np.zeros(max_entries, dtype=np.float64)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(vector: List[float]) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, query_vector: List[float], scope: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            now = time.time()
+            if self._matrix is None or len(query_vector) != self._matrix.shape[1]:
+                self.misses += 1
+                return None
+            valid = (self._expires_at > now) & np.fromiter((s == scope for s in self._scopes), dtype=bool, count=self.max_entries)
+            if not valid.any():
+                self.misses += 1
+                return None
+            scores = np.where(valid, self._matrix @ self._normalize(query_vector), -np.inf)
+            best = int(np.argmax(scores))
+            if scores[best] < self.similarity_threshold:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._last_used[best] = now
+            return {**self._answers[best], "similarity": float(scores[best])}
+
+    def store(self, query_vector: List[float], scope: str, answer: str, route: Optional[str] = None, query: Optional[str] = None) -> None:
+        with self._lock:
+            now = time.time()
+            if self._matrix is None or len(query_vector) != self._matrix.shape[1]:
+                self._matrix = np.zeros((self.max_entries, len(query_vector)), dtype=np.float32)
+                self._expires_at[:] = 0
+            # prefer an expired slot, otherwise evict the least recently used one
+            expired = np.flatnonzero(self._expires_at <= now)
+            slot = int(expired[0]) if len(expired) else int(np.argmin(self._last_used))
+            self._matrix[slot] = self._normalize(query_vector)
+            self._scopes[slot] = scope
+            self._answers[slot] = {"answer": answer, "route": route, "query": query}
+            self._expires_at[slot] = now + self.route_ttls.get(route, self.ttl_seconds)
+            self._last_used[slot] = now
+
+    def __len__(self) -> int:
+        return int((self._expires_at > time.time()).sum())
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": len(self),
+        }
+
+
+class QueryEmbeddings:
+    """Query vectors of recent runs, keyed by question.
+
+    The answer cache node embeds the question once; the router and
+    remember_answer read the vector back through the key kept in the graph
+    state, so the state never carries (and re-validates) the vector itself.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._vectors: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, query: str, vector: List[float]) -> str:
+        with self._lock:
+            self._vectors[query] = vector
+            self._vectors.move_to_end(query)
+            while len(self._vectors) > self.max_entries:
+                self._vectors.popitem(last=False)
+        return query
+
+    def get(self, key: Optional[str]) -> Optional[List[float]]:
+        if key is None:
+            return None
+        with self._lock:
+            return self._vectors.get(key)
+
+
+QUERY_EMBEDDINGS = QueryEmbeddings()
+
+
+_SHARED_CACHE: Optional[SemanticAnswerCache] = None
+
+
+def get_answer_cache() -> SemanticAnswerCache:
+    # shared by every session in the process; entries are scoped per knowledge version
+    global _SHARED_CACHE
+    if _SHARED_CACHE is None:
+        _SHARED_CACHE = SemanticAnswerCache(
+            max_entries=ANSWER_CACHE_MAX_ENTRIES,
+            similarity_threshold=ANSWER_CACHE_SIMILARITY,
+            ttl_seconds=ANSWER_CACHE_TTL,
+            route_ttls={"weather_search": ANSWER_CACHE_WEATHER_TTL},
+        )
+    return _SHARED_CACHE
@@ -1,82 +1,293 @@
-import streamlit as st
 import time
 import os
 import functools
-from config import SECRETS, AgentState
-from vectorstore import load_uploaded_docs, split_documents, build_qdrant_vectorstore, calculate_knowledge_hash
-from agents import router_agent, retrieve_agent, weather_search_agent, generate_agent, route_decision
+import itertools
+from config import SECRETS, AgentState, ANSWER_CACHE_ENABLED, LLM_MODEL, SPECULATIVE_EXECUTION, SPECULATIVE_WEATHER
+from vectorstore import iter_uploaded_docs, iter_split_documents, build_vectorstore, file_digest, embedding_cache_stats, get_embeddings
+from chunker import ChunkIndex
+from agents import (
+    router_agent, retrieve_agent, weather_search_agent, generate_agent, route_decision,
+    answer_cache_agent, remember_answer_agent, cache_decision,
+    arouter_agent, aretrieve_agent, aweather_search_agent, agenerate_agent, aanswer_cache_agent,
+    speculative_router_agent, aspeculative_router_agent, speculative_route_decision,
+)
+from speculation import SPECULATION_STATS
+from memory import ConversationMemory
+from answer_cache import get_answer_cache
+from router import get_fast_router
+from weather_cache import get_weather_cache
+from knowledge_manifest import build_manifest
+from system_registry import get_system_registry, system_collection
+from run_log import log_to
+from tracing import TRACER, span, traced
+from startup import LazyImports, LazyModule, timed
 import warnings
 from langgraph.graph import START, END, StateGraph
-from langchain_community.utilities import OpenWeatherMapAPIWrapper
 from langchain_core.messages import HumanMessage, AIMessage
+from langchain_core.runnables import RunnableLambda
+
+st = LazyModule("streamlit")
+_lazy = LazyImports(globals(), OpenWeatherMapAPIWrapper="langchain_community.utilities:OpenWeatherMapAPIWrapper")
+__getattr__ = _lazy
 
 
 warnings.filterwarnings("ignore")
-def initialize_system(uploaded_files, chunk_size=250, k=3, temperature=0.0):
-    docs = load_uploaded_docs(uploaded_files)
+def _bind_node(agent, async_agent, **kwargs):
+    # invoke/stream run the sync agent, ainvoke/astream await the async one; each call is a span
+    return RunnableLambda(
+        traced(functools.partial(agent, **kwargs), name=agent.__name__),
+        afunc=traced(functools.partial(async_agent, **kwargs), name=agent.__name__),
+    )
+
 
-    if not docs:
+def _load_knowledge(uploaded_files, load_uploaded_docs_fn, default_pdf_path, on_error):
+    # Pages, chunks and embedded batches are streamed stage to stage; peek at
+    # the first page only to decide whether the default document is needed.
+    uploaded_docs = iter(load_uploaded_docs_fn(uploaded_files, on_error=on_error))
+    first_doc = next(uploaded_docs, None)
+    docs = []
+
+    if first_doc is not None:
+        docs = itertools.chain([first_doc], uploaded_docs)
+    else:
         try:
-            base_dir = os.path.dirname(__file__)
-            pdf_path = os.path.join(base_dir, "pdf_file", "Riyanshu_Resume.pdf")
+            # default_pdf_path may be the PDF itself or an app base dir holding pdf_file/
+            pdf_path = default_pdf_path or os.path.dirname(__file__)
+            if os.path.isdir(pdf_path):
+                pdf_path = os.path.join(pdf_path, "pdf_file", "Riyanshu_Resume.pdf")
             if os.path.exists(pdf_path) and os.path.getsize(pdf_path) > 0:
                 from langchain_community.document_loaders import PyPDFLoader
                 loader = PyPDFLoader(pdf_path)
                 file_docs = loader.load()
+                with open(pdf_path, "rb") as pdf_file:
+                    digest = file_digest(pdf_file.read())
                 for doc in file_docs:
                     if not hasattr(doc, "metadata") or doc.metadata is None:
                         doc.metadata = {}
                     doc.metadata["source"] = os.path.basename(pdf_path)
+                    doc.metadata["file_digest"] = digest
                 docs.extend(file_docs)
             else:
-                st.warning("Default dOCUMENT not found or is empty. Continuing without docs.")
+                (on_error or st.warning)("Default dOCUMENT not found or is empty. Continuing without docs.")
         except Exception as e:
-            st.error(f"Failed to load default resume: {e}")
-
-    doc_splits = split_documents(docs, chunk_size=chunk_size)
-
-    retriever, retriever_tool = build_qdrant_vectorstore(
-        doc_splits,
-        google_api_key=SECRETS["GOOGLE_API_KEY"],
-        qdrant_url=SECRETS["QDRANT_URL"],
-        qdrant_api=SECRETS["QDRANT_API"]
-    )
-
-    weather_search_tool = OpenWeatherMapAPIWrapper()
-
-    # --- BIND AGENTS TO TOOLS USING functools.partial ---
-    router_node = functools.partial(router_agent, temperature=temperature)
-    retrieve_node = functools.partial(retrieve_agent, retriever_instance=retriever)
-    weather_search_node = functools.partial(
-        weather_search_agent, 
+            (on_error or st.error)(f"Failed to load default resume: {e}")
+
+    return docs
+
+
+def initialize_system(
+    uploaded_files,
+    chunk_size=250,
+    k=3,
+    temperature=0.0,
+    progress_callback=None,
+    load_uploaded_docs_fn=iter_uploaded_docs,
+    split_documents_fn=iter_split_documents,
+    build_vectorstore_fn=build_vectorstore,
+    weather_api_wrapper_cls=None,
+    stategraph_cls=StateGraph,
+    default_pdf_path=None,
+    knowledge_hash="",
+    answer_cache=None,
+    answer_cache_fn=get_answer_cache,
+    query_embeddings_fn=get_embeddings,
+    fast_router=None,
+    weather_cache=None,
+    speculative=SPECULATIVE_EXECUTION,
+    on_error=None,
+    sync=True,
+):
+    # token counts of every chunk split here, so generation need not re-tokenize retrieved chunks
+    chunk_index = ChunkIndex()
+    if sync:
+        doc_splits = split_documents_fn(
+            _load_knowledge(uploaded_files, load_uploaded_docs_fn, default_pdf_path, on_error), chunk_size=chunk_size, index=chunk_index
+        )
+        vectorstore_kwargs = {}
+    else:
+        # attach to the index as it is: nothing is loaded, embedded or deleted
+        doc_splits, vectorstore_kwargs = [], {"sync": False}
+
+    # loading, splitting and embedding are streamed into the build, so they are timed together
+    with timed("knowledge base (load, split, embed, index)"):
+        retriever, retriever_tool = build_vectorstore_fn(
+            doc_splits,
+            google_api_key=SECRETS["GOOGLE_API_KEY"],
+            qdrant_url=SECRETS["QDRANT_URL"],
+            qdrant_api=SECRETS["QDRANT_API"],
+            progress_callback=progress_callback,
+            k=k,
+            **vectorstore_kwargs
+        )
+
+    with timed("weather tool"):
+        weather_search_tool = (weather_api_wrapper_cls or _lazy.get("OpenWeatherMapAPIWrapper"))()
+
+    # --- BIND AGENTS TO TOOLS: each node gets the sync agent and its async twin ---
+    # query embeddings are only built for the nodes that need them
+    if fast_router is None:
+        with timed("fast router"):
+            fast_router = get_fast_router(query_embeddings_fn(SECRETS["GOOGLE_API_KEY"]))
+    weather_cache = weather_cache or get_weather_cache()
+    if speculative:
+        router_node = _bind_node(
+            speculative_router_agent,
+            aspeculative_router_agent,
+            temperature=temperature,
+            retriever_instance=retriever,
+            fast_router=fast_router,
+            weather_search_tool=weather_search_tool if SPECULATIVE_WEATHER else None,
+            weather_cache=weather_cache
+        )
+    else:
+        router_node = _bind_node(router_agent, arouter_agent, temperature=temperature, fast_router=fast_router)
+    retrieve_node = _bind_node(retrieve_agent, aretrieve_agent, retriever_instance=retriever)
+    weather_search_node = _bind_node(
+        weather_search_agent,
+        aweather_search_agent,
         weather_search_tool=weather_search_tool, 
-        temperature=temperature
+        temperature=temperature,
+        weather_cache=weather_cache
     )
-    generate_node = functools.partial(generate_agent, temperature=temperature)
+    generate_node = _bind_node(generate_agent, agenerate_agent, temperature=temperature, chunk_index=chunk_index)
+
+    if answer_cache is None and answer_cache_fn is not None and ANSWER_CACHE_ENABLED:
+        answer_cache = answer_cache_fn()
+    # cached answers are only valid for this exact knowledge base and configuration
+    cache_scope = f"{knowledge_hash}|{chunk_size}|{k}|{temperature}"
+    if answer_cache is not None:
+        answer_cache_node = _bind_node(
+            answer_cache_agent,
+            aanswer_cache_agent,
+            answer_cache=answer_cache,
+            embeddings=query_embeddings_fn(SECRETS["GOOGLE_API_KEY"]),
+            scope=cache_scope
+        )
+        remember_answer_node = functools.partial(remember_answer_agent, answer_cache=answer_cache, scope=cache_scope)
     # --- END BINDING ---
 
-    workflow = StateGraph(AgentState)
+    workflow = stategraph_cls(AgentState)
     
     # --- USE THE BOUND NODES ---
     workflow.add_node("router", router_node)
     workflow.add_node("retrieve", retrieve_node)
     workflow.add_node("weather_search", weather_search_node)
     workflow.add_node("generate", generate_node)
+    if answer_cache is not None:
+        workflow.add_node("answer_cache", answer_cache_node)
+        workflow.add_node("remember_answer", remember_answer_node)
     # --- END ---
 
-    workflow.add_edge(START, "router")
-
-    workflow.add_conditional_edges(
-        "router",
-        route_decision,
-        {"retrieve": "retrieve", "weather_search": "weather_search"}
-    )
+    if answer_cache is not None:
+        workflow.add_edge(START, "answer_cache")
+        workflow.add_conditional_edges(
+            "answer_cache",
+            cache_decision,
+            {"hit": END, "miss": "router"}
+        )
+    else:
+        workflow.add_edge(START, "router")
+
+    if speculative:
+        workflow.add_conditional_edges(
+            "router",
+            speculative_route_decision,
+            {"retrieve": "retrieve", "weather_search": "weather_search", "generate": "generate"}
+        )
+    else:
+        workflow.add_conditional_edges(
+            "router",
+            route_decision,
+            {"retrieve": "retrieve", "weather_search": "weather_search"}
+        )
 
     workflow.add_edge("retrieve", "generate")
     workflow.add_edge("weather_search", "generate")
-    workflow.add_edge("generate", END)
-
-    return workflow.compile(), retriever, weather_search_tool, temperature, retriever_tool
+    if answer_cache is not None:
+        workflow.add_edge("generate", "remember_answer")
+        workflow.add_edge("remember_answer", END)
+    else:
+        workflow.add_edge("generate", END)
+
+    with timed("graph compile"):
+        graph = workflow.compile()
+    return graph, retriever, weather_search_tool, temperature, retriever_tool
+
+
+class _StreamCollector:
+    def __init__(self, on_token=None, on_node=None, token_nodes=("generate",)):
+        self.on_token = on_token
+        self.on_node = on_node
+        self.token_nodes = token_nodes
+        self.started = time.perf_counter()
+        self.first_token_at = None
+        self.updates = {}
+        self.trace_id = None
+
+    def add(self, mode, payload):
+        if mode == "messages":
+            chunk, metadata = payload
+            if metadata.get("langgraph_node") in self.token_nodes and chunk.content:
+                if self.first_token_at is None:
+                    self.first_token_at = time.perf_counter()
+                if self.on_token is not None:
+                    self.on_token(chunk.content)
+            return
+        for node_name, node_state in payload.items():
+            if self.on_node is not None:
+                self.on_node(node_name)
+            self.updates.update(node_state or {})
+
+    def result(self):
+        metrics = {"total_ms": (time.perf_counter() - self.started) * 1000}
+        if self.first_token_at is not None:
+            metrics["ttft_ms"] = (self.first_token_at - self.started) * 1000
+        metrics.update({f"generation_{key}": value for key, value in self.updates.get("generation_metrics", {}).items()})
+        if self.trace_id is not None:
+            metrics["trace_id"] = self.trace_id
+        return self.updates, metrics
+
+
+def stream_graph(graph, agent_state, on_token=None, on_node=None, token_nodes=("generate",)):
+    """Run the graph, passing answer tokens to ``on_token`` as they are generated.
+
+    Returns the merged node updates and per-query timings measured from the
+    start of the run; ``trace_id`` identifies the run's spans in ``TRACER``.
+    """
+    collector = _StreamCollector(on_token, on_node, token_nodes)
+    with span("query", "graph") as root:
+        collector.trace_id = root.trace_id
+        for mode, payload in graph.stream(agent_state, stream_mode=["updates", "messages"]):
+            collector.add(mode, payload)
+    return collector.result()
+
+
+async def astream_graph(graph, agent_state, on_token=None, on_node=None, token_nodes=("generate",)):
+    """``stream_graph`` on the async agents, for callers that already run an event loop."""
+    collector = _StreamCollector(on_token, on_node, token_nodes)
+    with span("query", "graph") as root:
+        collector.trace_id = root.trace_id
+        async for mode, payload in graph.astream(agent_state, stream_mode=["updates", "messages"]):
+            collector.add(mode, payload)
+    return collector.result()
+
+
+def graph_dot(graph):
+    """Graphviz source for a compiled graph, drawn from the nodes and edges it actually has."""
+    names = {START: "start", END: "end"}
+    lines = ["digraph {", "    node [shape=box, style=rounded]"]
+    for edge in graph.get_graph().edges:
+        # conditional edges are dashed; langgraph only keeps a label when the route differs from the target
+        style = (f' [style=dashed, label="{edge.data}"]' if edge.data else " [style=dashed]") if edge.conditional else ""
+        lines.append(f'    "{names.get(edge.source, edge.source)}" -> "{names.get(edge.target, edge.target)}"{style}')
+    lines.append("}")
+    return "\n".join(lines)
+
+
+def remember_message(message):
+    # the full history is only kept for display
+    st.session_state.chat_history.append(message)
+    st.session_state.memory.add(message)
 
 
 def run_app():
@@ -99,6 +310,10 @@ def run_app():
 
         st.subheader("Knowledge Sources")
         uploaded_files = st.file_uploader("Upload text files", type=["txt", "pdf", "docx"], accept_multiple_files=True)
+        source_filter = st.multiselect(
+            "Restrict answers to sources (optional)",
+            [file.name for file in uploaded_files or []],
+        )
         reset_params = st.button("Apply Parameters & Update Knowledge")
         st.divider()
 
@@ -115,6 +330,8 @@ def run_app():
         st.session_state.logs = []
     if "chat_history" not in st.session_state:
         st.session_state.chat_history = []
+    if "memory" not in st.session_state:
+        st.session_state.memory = ConversationMemory()
     if "final_answer" not in st.session_state:
         st.session_state.final_answer = ""
     if "params_applied" not in st.session_state:
@@ -124,23 +341,45 @@ def run_app():
     if "knowledge_hash" not in st.session_state:
         st.session_state.knowledge_hash = ""
 
-    # Calculate current knowledge hash
-    current_knowledge_hash = calculate_knowledge_hash(uploaded_files or [])
+    # Per-file digests are memoized, so reruns with the same uploads read nothing
+    manifest = build_manifest(uploaded_files or [])
+    current_knowledge_hash = manifest.hash
     knowledge_changed = current_knowledge_hash != st.session_state.knowledge_hash
 
     # Initialize or update system
     if (reset_params or not st.session_state.params_applied or knowledge_changed):
         with st.spinner("Configuring system with new parameters and knowledge sources..."):
             try:
-                st.session_state.graph, st.session_state.retriever_instance, st.session_state.weather_search_tool, st.session_state.temperature, st.session_state.retriever_tool_for_display = initialize_system(
-                    uploaded_files=uploaded_files or [],
-                    chunk_size=chunk_size,
-                    k=retriever_k,
-                    temperature=temperature
+                ingest_progress = st.empty()
+                # every session with the same knowledge and parameters shares one built system
+                lease = get_system_registry().acquire(
+                    (current_knowledge_hash, chunk_size, retriever_k, temperature),
+                    functools.partial(
+                        initialize_system,
+                        uploaded_files=uploaded_files or [],
+                        chunk_size=chunk_size,
+                        k=retriever_k,
+                        temperature=temperature,
+                        knowledge_hash=current_knowledge_hash,
+                        build_vectorstore_fn=functools.partial(
+                            build_vectorstore, collection_name=system_collection(current_knowledge_hash, chunk_size)
+                        ),
+                        progress_callback=lambda done, total: ingest_progress.info(
+                            f"Embedded {done} new chunks"
+                        )
+                    ),
                 )
+                previous_lease = st.session_state.get("system_lease")
+                st.session_state.system_lease = lease
+                if previous_lease is not None:
+                    previous_lease.release()
+                st.session_state.graph, st.session_state.retriever_instance, st.session_state.weather_search_tool, st.session_state.temperature, st.session_state.retriever_tool_for_display = lease.system
+                ingest_progress.empty()
+                added, removed = manifest.diff(st.session_state.get("knowledge_manifest"))
                 st.session_state.params_applied = True
                 st.session_state.knowledge_hash = current_knowledge_hash
-                st.success("System configured with new knowledge!")
+                st.session_state.knowledge_manifest = manifest
+                st.success(f"System configured with new knowledge! ({len(added)} files added, {len(removed)} removed)")
             except Exception as e:
                 st.error(f"Configuration failed: {str(e)}")
                 st.stop()
@@ -158,16 +397,19 @@ def run_app():
 
         if prompt := st.chat_input("Ask about your knowledge sources..."):
             user_msg = HumanMessage(content=prompt)
-            st.session_state.chat_history.append(user_msg)
+            remember_message(user_msg)
 
             with st.chat_message("user"):
                 st.write(prompt)
 
             agent_state = AgentState(
                 messages=[user_msg],
-                chat_history=st.session_state.chat_history,
+                # only the bounded window and summary enter the graph state
+                chat_history=st.session_state.memory.messages(),
+                conversation_summary=st.session_state.memory.summary,
                 current_query=prompt,
-                retrieved_docs=[]
+                retrieved_docs=[],
+                source_filter=source_filter
             )
 
             with st.spinner("Executing workflow..."):
@@ -178,21 +420,31 @@ def run_app():
                 try:
                     step_count = 0
                     max_steps = 10
-                    current_state_updates = {}
-
-                    for output in st.session_state.graph.stream(agent_state):
-                        node_name = list(output.keys())[0]
-                        node_state = output[node_name]
+                    answer_placeholder = None
+                    streamed_tokens = []
 
+                    def on_node(node_name):
+                        nonlocal step_count
                         status_text.info(f"Executing: **{node_name.replace('_', ' ').title()}**")
-                        st.session_state.logs.append(f"Completed node: {node_name}")
-
                         step_count += 1
                         progress_bar.progress(min(step_count / max_steps, 1.0))
-                        time.sleep(0.3)
-
-                        current_state_updates = node_state
 
+                    def on_token(token):
+                        nonlocal answer_placeholder
+                        if answer_placeholder is None:
+                            answer_placeholder = st.chat_message("assistant").empty()
+                        streamed_tokens.append(token)
+                        answer_placeholder.markdown("".join(streamed_tokens) + "▌")
+
+                    with log_to(st.session_state.logs):
+                        current_state_updates, query_metrics = stream_graph(
+                            st.session_state.graph, agent_state, on_token=on_token, on_node=on_node
+                        )
+                    st.session_state.query_metrics = query_metrics
+                    if "ttft_ms" in query_metrics:
+                        st.session_state.logs.append(
+                            f"Time to first token: {query_metrics['ttft_ms']:.0f} ms, total: {query_metrics['total_ms']:.0f} ms"
+                        )
 
                     progress_bar.empty()
                     status_text.success("✅ Workflow completed!")
@@ -200,15 +452,18 @@ def run_app():
                     if current_state_updates and 'generated_answer' in current_state_updates:
                         final_answer = current_state_updates['generated_answer']
                         ai_msg = AIMessage(content=final_answer)
-                        st.session_state.chat_history.append(ai_msg)
+                        remember_message(ai_msg)
                         st.session_state.final_answer = final_answer
 
-                        with st.chat_message("assistant"):
-                            st.write(final_answer)
+                        if answer_placeholder is not None:
+                            answer_placeholder.markdown(final_answer)
+                        else:
+                            with st.chat_message("assistant"):
+                                st.write(final_answer)
                     else:
                         fallback_message = "I couldn't generate a complete response for your query. Please try rephrasing."
                         ai_msg = AIMessage(content=fallback_message)
-                        st.session_state.chat_history.append(ai_msg)
+                        remember_message(ai_msg)
                         st.session_state.final_answer = fallback_message
 
                         with st.chat_message("assistant"):
@@ -220,7 +475,7 @@ def run_app():
                     status_text.error(f"❌ Execution failed: {str(e)}")
                     st.session_state.logs.append(f"ERROR TRACEBACK:{error_trace}")
                     error_msg = AIMessage(content="Sorry, I encountered an error processing your request. Please check the logs.")
-                    st.session_state.chat_history.append(error_msg)
+                    remember_message(error_msg)
 
                     with st.chat_message("assistant"):
                         st.write("Sorry, I encountered an error processing your request. Please check the logs.")
@@ -245,30 +500,46 @@ def run_app():
 
         with col2:
             st.subheader("Workflow Diagram")
-            st.graphviz_chart("""
-                digraph {
-                    node [shape=box, style=rounded]
-                    start -> router
-                    router -> retrieve [label="retrieve"]
-                    router -> weather_search [label="weather_search"]
-                    retrieve -> generate [label="docs retrieved"]
-                    weather_search -> generate [label="results found"]
-                    generate -> end [label="answer created"]
-                }
-            """)
+            # answer_cache and speculation are optional, so draw the graph this session runs
+            st.graphviz_chart(graph_dot(st.session_state.graph))
 
             st.subheader("Agent Configuration")
+            cache_stats = embedding_cache_stats()
+            answer_stats = get_answer_cache().stats()
+            router_stats = get_fast_router().stats()
+            query_metrics = st.session_state.get("query_metrics", {})
+            speculation_stats = SPECULATION_STATS.stats()
+            weather_stats = get_weather_cache().stats()
+            system_stats = get_system_registry().stats()
             st.markdown(f"""
             - **Chunk Size**: `{chunk_size}`
             - **Retriever K (Top K Docs)**: `{retriever_k}`
             - **LLM Temperature**: `{temperature}`
-            - **Main LLM Model**: `llama3-70b-8192` (Groq)
+            - **Embedding Cache**: `{cache_stats['hits']}` hits / `{cache_stats['misses']}` misses
+            - **Answer Cache**: `{answer_stats['hits']}` hits / `{answer_stats['misses']}` misses (`{answer_stats['hit_rate']:.0%}`), `{answer_stats['size']}` entries
+            - **Router**: `{router_stats['rules']}` rules / `{router_stats['centroid']}` centroid / `{router_stats['llm']}` LLM (`{router_stats['fast_path_rate']:.0%}` fast path)
+            - **Weather Cache**: `{weather_stats['hits']}` hits / `{weather_stats['misses']}` misses, `{weather_stats['coalesced']}` coalesced
+            - **Shared Systems**: `{system_stats['size']}` cached (`{system_stats['in_use']}` in use, `{system_stats['bytes'] / 2**20:.1f}` MB), `{system_stats['builds']}` builds / `{system_stats['hits'] + system_stats['coalesced']}` reused
+            - **Speculation**: `{speculation_stats['used']}`/`{speculation_stats['launched']}` branches used, `{speculation_stats['saved_ms']:.0f}` ms saved, `{speculation_stats['wasted_ms']:.0f}` ms wasted
+            - **Last Query**: first token `{query_metrics.get('ttft_ms', 0):.0f}` ms, total `{query_metrics.get('total_ms', 0):.0f}` ms, context `{query_metrics.get('generation_context_tokens', 0):.0f}` tokens (`{query_metrics.get('generation_tokens_saved', 0):.0f}` saved)
+            - **Main LLM Model**: `{LLM_MODEL}` (Groq)
             - **Grading LLM Model**: `gemma2-9b-it` (Groq)
             """)
 
+            st.subheader("Trace")
+            if query_metrics.get("trace_id"):
+                st.markdown("**Last Query**")
+                st.dataframe([
+                    {"span": s.name, "kind": s.kind, "ms": round(s.duration_ms or 0, 1), **s.attributes, "error": s.error}
+                    for s in sorted(TRACER.spans(query_metrics["trace_id"]), key=lambda s: s.start_time)
+                ])
+            st.markdown("**Latency by span (recent queries, slowest p95 first)**")
+            st.dataframe(TRACER.summary())
+
     # Add reset button
     if st.button("Clear Chat History"):
         st.session_state.chat_history = []
+        st.session_state.memory.clear()
         st.session_state.logs = []
         st.session_state.final_answer = ""
         st.session_state.get("knowledge_hash", None)
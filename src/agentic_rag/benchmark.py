@@ -0,0 +1,379 @@
+"""Offline benchmarks for ingestion and the agent graph.
+
+Every external service is replaced by a deterministic fake with configurable
+latency (LLM, embeddings, weather) and documents go to the local NumPy index,
+so runs need no network or API keys:
+
+    python benchmark.py run --sizes 10 100 1000 --out results.json
+    python benchmark.py compare baseline.json results.json --tolerance 0.15
+"""
+import os
+import re
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+import platform
+import tempfile
+import contextlib
+import functools
+from typing import Any, Dict, Iterator, List, Optional
+from unittest import mock
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+import agents
+import app
+import vectorstore
+from answer_cache import SemanticAnswerCache
+from config import AgentState, LOAD_PARALLEL
+from chunker import ChunkIndex
+from embedding_cache import CachedEmbeddings
+from parsers import UploadedBytes
+from router import FastRouter
+from tokenizer import get_tokenizer
+from tracing import TRACER, LLMTracingHandler
+from weather_cache import WeatherCache
+
+
+TOPICS = {
+    "skills": "python sql docker kubernetes pandas numpy pytorch fastapi langchain qdrant",
+    "experience": "engineer intern startup project pipeline deployment latency throughput migration",
+    "education": "university degree course thesis gpa semester research mathematics statistics",
+    "hobbies": "chess hiking photography guitar cycling cooking reading travel football",
+}
+DOCUMENT_QUERIES = [
+    "What programming skills are listed in the resume?",
+    "Summarize the work experience in the documents.",
+    "Which university and degree are mentioned?",
+    "What hobbies does the candidate have?",
+    "Which projects used docker and kubernetes?",
+]
+WEATHER_QUERIES = [
+    "What is the weather in London today?",
+    "Is it raining in Paris?",
+    "Temperature in Tokyo right now?",
+]
+
+
+class FakeEmbeddings(Embeddings):
+    """Hashed bag-of-words vectors: deterministic, and similar texts get similar vectors."""
+
+    def __init__(self, dim: int = 256, latency_ms: float = 0.0, per_text_ms: float = 0.0):
+        self.dim = dim
+        self.latency_ms = latency_ms
+        self.per_text_ms = per_text_ms
+
+    def _vector(self, text: str) -> List[float]:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for word in re.findall(r"\w+", text.lower()):
+            vector[int(hashlib.md5(word.encode()).hexdigest()[:8], 16) % self.dim] += 1.0
+        return vector.tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        time.sleep((self.latency_ms + self.per_text_ms * len(texts)) / 1000)
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+class FakeChatModel(BaseChatModel):
+    """Answers the repo's prompts without a model: routes by keyword, echoes context."""
+
+    latency_ms: float = 0.0
+    per_token_ms: float = 0.0
+    answer_tokens: int = 40
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-benchmark"
+
+    def _reply(self, prompt: str) -> str:
+        if "Only respond with the action word" in prompt:
+            question = prompt.split("Current Question:")[-1].lower()
+            return "weather_search" if any(w in question for w in ("weather", "rain", "temperature")) else "retrieve"
+        if "extract the city name" in prompt:
+            match = re.search(r"\b(?:in|for)\s+([A-Z][a-z]+)", prompt.split("Question:")[-1])
+            return match.group(1) if match else ""
+        context = prompt.split("Context:")[-1].split()
+        return " ".join(context[:self.answer_tokens]) or "I don't know."
+
+    def _words(self, messages: List[Any]) -> List[str]:
+        time.sleep(self.latency_ms / 1000)
+        return re.findall(r"\S+\s*", self._reply("\n".join(str(m.content) for m in messages)))
+
+    def _generate(self, messages: List[Any], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        words = self._words(messages)
+        time.sleep(self.per_token_ms * len(words) / 1000)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(words)))])
+
+    def _stream(self, messages: List[Any], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        for word in self._words(messages):
+            time.sleep(self.per_token_ms / 1000)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=word))
+            if run_manager:
+                run_manager.on_llm_new_token(word, chunk=chunk)
+            yield chunk
+
+
+class FakeWeather:
+    """Stands in for ``OpenWeatherMapAPIWrapper``."""
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency_ms = latency_ms
+
+    def run(self, city: str) -> str:
+        time.sleep(self.latency_ms / 1000)
+        return f"In {city}, the current weather is: clouds, 18°C, humidity 60%."
+
+
+def _pdf(pages: List[str]) -> bytes:
+    """A minimal text PDF, one content stream per page."""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in pages:
+        lines = [text[i:i + 90].replace("\\", "").replace("(", "").replace(")", "") for i in range(0, len(text), 90)]
+        stream = "BT /F1 9 Tf 40 800 Td 11 TL " + " ".join(f"({line}) '" for line in lines) + " ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream".encode("latin-1"))
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>".encode())
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>".encode()
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
+
+
+def make_corpus(files: int, pages_per_file: int = 4, words_per_page: int = 300, seed: int = 0, fmt: str = "pdf") -> List[UploadedBytes]:
+    """Deterministic synthetic uploads; each page mixes the TOPICS vocabularies."""
+    rng = random.Random(seed)
+    vocabulary = {topic: words.split() for topic, words in TOPICS.items()}
+    corpus = []
+    for n in range(files):
+        pages = []
+        for _ in range(pages_per_file):
+            topic = rng.choice(list(vocabulary))
+            words = [rng.choice(vocabulary[topic] if rng.random() < 0.6 else vocabulary[rng.choice(list(vocabulary))]) for _ in range(words_per_page)]
+            pages.append(f"{topic.title()}: " + " ".join(words) + ".")
+        if fmt == "pdf":
+            corpus.append(UploadedBytes(f"doc_{n:05d}.pdf", _pdf(pages)))
+        else:
+            corpus.append(UploadedBytes(f"doc_{n:05d}.txt", "\n\n".join(pages).encode()))
+    return corpus
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {"count": 0}
+    values = sorted(values)
+    pick = lambda q: values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+    return {"count": len(values), "mean": sum(values) / len(values), "p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99), "max": values[-1]}
+
+
+@contextlib.contextmanager
+def fake_backends(workdir: str, llm: FakeChatModel, embeddings: FakeEmbeddings) -> Iterator[CachedEmbeddings]:
+    """Route the graph's model and embedding lookups to the fakes for the duration of a run."""
+    cached = CachedEmbeddings(embeddings, model_name="fake", path=os.path.join(workdir, "embeddings.sqlite3"))
+    with mock.patch.object(agents, "get_chat_model", lambda temperature=0.0: llm), \
+            mock.patch.object(vectorstore, "get_embeddings", lambda google_api_key: cached), \
+            mock.patch.dict(vectorstore._LOCAL_STORES, clear=True), \
+            mock.patch.dict(vectorstore._LEXICAL_INDEXES, clear=True):
+        yield cached
+
+
+def bench_ingestion(corpus: List[UploadedBytes], workdir: str, chunk_size: int = 250, parallel_load: bool = LOAD_PARALLEL) -> Dict[str, Any]:
+    """Time each ingestion stage on its own, then the streamed pipeline end to end."""
+    started = time.perf_counter()
+    docs = list(vectorstore.iter_uploaded_docs(corpus, parallel=parallel_load, on_error=print))
+    load_s = time.perf_counter() - started
+
+    chunk_index = ChunkIndex()
+    started = time.perf_counter()
+    chunks = list(vectorstore.iter_split_documents(docs, chunk_size=chunk_size, index=chunk_index))
+    split_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    vectorstore.build_local_vectorstore(iter(chunks), "fake", collection_name="bench", index_dir=os.path.join(workdir, "index"), retrieval_mode="dense")
+    index_s = time.perf_counter() - started
+
+    # a rebuild of the unchanged corpus exercises the delta path (nothing to embed)
+    started = time.perf_counter()
+    vectorstore.build_local_vectorstore(vectorstore.iter_split_documents(vectorstore.iter_uploaded_docs(corpus, parallel=parallel_load, on_error=print), chunk_size=chunk_size), "fake", collection_name="bench", index_dir=os.path.join(workdir, "index"), retrieval_mode="dense")
+    reindex_s = time.perf_counter() - started
+
+    return {
+        "files": len(corpus),
+        "pages": len(docs),
+        "chunks": len(chunks),
+        "chunk_tokens": percentiles(list(chunk_index.token_counts)),
+        "parallel_load": parallel_load,
+        "load_s": load_s,
+        "split_s": split_s,
+        "index_s": index_s,
+        "reindex_s": reindex_s,
+        "pages_per_s": len(docs) / load_s if load_s else 0.0,
+        "chunks_per_s": len(chunks) / split_s if split_s else 0.0,
+        "indexed_chunks_per_s": len(chunks) / index_s if index_s else 0.0,
+    }
+
+
+def bench_queries(corpus: List[UploadedBytes], workdir: str, queries: int = 50, chunk_size: int = 250, k: int = 3, speculative: bool = True, weather_ms: float = 0.0, seed: int = 0) -> Dict[str, Any]:
+    """Build the real graph over the corpus and time queries end to end and per node."""
+    build = functools.partial(vectorstore.build_local_vectorstore, index_dir=os.path.join(workdir, "index"), retrieval_mode="dense")
+    graph = app.initialize_system(
+        uploaded_files=corpus,
+        chunk_size=chunk_size,
+        k=k,
+        build_vectorstore_fn=lambda doc_splits, google_api_key, qdrant_url, qdrant_api, progress_callback=None, k=k: build(doc_splits, google_api_key, progress_callback=progress_callback, k=k),
+        weather_api_wrapper_cls=lambda: FakeWeather(weather_ms),
+        # fresh caches: every query does the full amount of work
+        answer_cache=SemanticAnswerCache(similarity_threshold=1.1),
+        query_embeddings_fn=vectorstore.get_embeddings,
+        fast_router=FastRouter(embeddings=vectorstore.get_embeddings("fake")),
+        weather_cache=WeatherCache(ttl_seconds=0),
+        speculative=speculative,
+        on_error=print,
+    )[0]
+
+    rng = random.Random(seed)
+    end_to_end, first_token, nodes = [], [], {}
+    for n in range(queries):
+        pool = WEATHER_QUERIES if n % 4 == 3 else DOCUMENT_QUERIES
+        query = f"{rng.choice(pool)} (#{n})"
+        _, metrics = app.stream_graph(graph, AgentState(current_query=query))
+        end_to_end.append(metrics["total_ms"])
+        if "ttft_ms" in metrics:
+            first_token.append(metrics["ttft_ms"])
+        for span in TRACER.spans(metrics["trace_id"]):
+            if span.kind != "graph":
+                nodes.setdefault(f"{span.kind}:{span.name}", []).append(span.duration_ms)
+    return {
+        "queries": queries,
+        "end_to_end_ms": percentiles(end_to_end),
+        "ttft_ms": percentiles(first_token),
+        "spans_ms": {name: percentiles(values) for name, values in sorted(nodes.items())},
+    }
+
+
+def run(sizes: List[int], pages_per_file: int = 4, words_per_page: int = 300, queries: int = 50, llm_ms: float = 50.0, token_ms: float = 1.0, embed_ms: float = 20.0, embed_text_ms: float = 0.1, weather_ms: float = 80.0, fmt: str = "pdf", seed: int = 0, parallel_load: bool = LOAD_PARALLEL) -> Dict[str, Any]:
+    llm = FakeChatModel(latency_ms=llm_ms, per_token_ms=token_ms, callbacks=[LLMTracingHandler()])
+    embeddings = FakeEmbeddings(latency_ms=embed_ms, per_text_ms=embed_text_ms)
+    results = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "tokenizer": get_tokenizer().name,
+            "config": {"pages_per_file": pages_per_file, "words_per_page": words_per_page, "queries": queries, "llm_ms": llm_ms, "token_ms": token_ms, "embed_ms": embed_ms, "embed_text_ms": embed_text_ms, "weather_ms": weather_ms, "format": fmt, "seed": seed, "parallel_load": parallel_load},
+        },
+        "runs": [],
+    }
+    for files in sizes:
+        corpus = make_corpus(files, pages_per_file, words_per_page, seed=seed, fmt=fmt)
+        with tempfile.TemporaryDirectory() as workdir, fake_backends(workdir, llm, embeddings):
+            ingestion = bench_ingestion(corpus, workdir, parallel_load=parallel_load)
+        with tempfile.TemporaryDirectory() as workdir, fake_backends(workdir, llm, embeddings):
+            query = bench_queries(corpus, workdir, queries=queries, weather_ms=weather_ms, seed=seed)
+        results["runs"].append({"files": files, "ingestion": ingestion, "query": query})
+    return results
+
+
+# metric path -> True when higher is better
+COMPARED_METRICS = {
+    ("ingestion", "pages_per_s"): True,
+    ("ingestion", "chunks_per_s"): True,
+    ("ingestion", "indexed_chunks_per_s"): True,
+    ("ingestion", "reindex_s"): False,
+    ("query", "end_to_end_ms", "p50"): False,
+    ("query", "end_to_end_ms", "p95"): False,
+    ("query", "ttft_ms", "p95"): False,
+}
+
+
+def _lookup(data: Dict[str, Any], path: tuple) -> Optional[float]:
+    for key in path:
+        if not isinstance(data, dict) or key not in data:
+            return None
+        data = data[key]
+    return data
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], tolerance: float = 0.15) -> List[Dict[str, Any]]:
+    """Metrics that got worse by more than ``tolerance`` (relative), per corpus size and per span p95."""
+    regressions = []
+    baseline_runs = {run["files"]: run for run in baseline["runs"]}
+    for run in current["runs"]:
+        before = baseline_runs.get(run["files"])
+        if before is None:
+            continue
+        paths = dict(COMPARED_METRICS)
+        paths.update({("query", "spans_ms", name, "p95"): False for name in run["query"]["spans_ms"]})
+        for path, higher_is_better in paths.items():
+            old, new = _lookup(before, path), _lookup(run, path)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if (change < -tolerance) if higher_is_better else (change > tolerance):
+                regressions.append({"files": run["files"], "metric": ".".join(path), "baseline": old, "current": new, "change": change})
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="run the benchmarks and write JSON results")
+    run_parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100])
+    run_parser.add_argument("--pages-per-file", type=int, default=4)
+    run_parser.add_argument("--words-per-page", type=int, default=300)
+    run_parser.add_argument("--queries", type=int, default=50)
+    run_parser.add_argument("--llm-ms", type=float, default=50.0)
+    run_parser.add_argument("--token-ms", type=float, default=1.0)
+    run_parser.add_argument("--embed-ms", type=float, default=20.0)
+    run_parser.add_argument("--weather-ms", type=float, default=80.0)
+    run_parser.add_argument("--format", choices=["pdf", "txt"], default="pdf")
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--serial-load", action="store_true", help="parse uploads in-process instead of in a process pool")
+    run_parser.add_argument("--out", default="-")
+    compare_parser = commands.add_parser("compare", help="exit 1 if CURRENT regressed against BASELINE")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--tolerance", type=float, default=0.15)
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        results = run(
+            args.sizes, args.pages_per_file, args.words_per_page, args.queries,
+            llm_ms=args.llm_ms, token_ms=args.token_ms, embed_ms=args.embed_ms, weather_ms=args.weather_ms, fmt=args.format, seed=args.seed, parallel_load=not args.serial_load,
+        )
+        text = json.dumps(results, indent=2)
+        if args.out == "-":
+            print(text)
+        else:
+            with open(args.out, "w", encoding="utf-8") as f:
+                f.write(text)
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.current, encoding="utf-8") as f:
+        current = json.load(f)
+    regressions = compare(baseline, current, args.tolerance)
+    for regression in regressions:
+        print(f"{regression['files']:>6} files  {regression['metric']}: {regression['baseline']:.2f} -> {regression['current']:.2f} ({regression['change']:+.0%})")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
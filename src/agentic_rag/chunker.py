@@ -0,0 +1,190 @@
+import os
+import itertools
+import functools
+import threading
+import multiprocessing
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from langchain_core.documents import Document
+from config import CHUNK_OVERLAP_RATIO, CHUNK_PARALLEL, CHUNK_MAX_WORKERS, CHUNK_PAGES_PER_TASK
+from tokenizer import get_tokenizer
+from startup import LazyImports
+
+# Worker processes import this module: keep it free of Streamlit and vector-store imports.
+
+_lazy = LazyImports(globals(), RecursiveCharacterTextSplitter="langchain_text_splitters:RecursiveCharacterTextSplitter")
+__getattr__ = _lazy
+
+
+def chunk_overlap(chunk_size: int, ratio: float = CHUNK_OVERLAP_RATIO) -> int:
+    return max(0, min(chunk_size - 1, int(round(chunk_size * ratio))))
+
+
+@functools.lru_cache(maxsize=None)
+def _length_function(max_cached_chars: int = 64) -> Callable[[str], int]:
+    # the splitter measures every word-sized piece, and words repeat; whole chunks are not kept
+    count = get_tokenizer().count
+    cached_count = functools.lru_cache(maxsize=1 << 16)(count)
+    return lambda text: cached_count(text) if len(text) <= max_cached_chars else count(text)
+
+
+@functools.lru_cache(maxsize=32)
+def get_splitter(chunk_size: int, overlap: int) -> Any:
+    """One splitter per (chunk_size, overlap) per process, measuring with the shared tokenizer."""
+    return _lazy.get("RecursiveCharacterTextSplitter")(
+        chunk_size=chunk_size, chunk_overlap=overlap, length_function=_length_function(), add_start_index=True
+    )
+
+
+def split_pages(docs: List[Any], chunk_size: int, overlap: int) -> List[Document]:
+    """Split pages into chunks carrying chunk_size, chunk_overlap, start_index and token_count."""
+    splitter = get_splitter(chunk_size, overlap)
+    tokenizer = get_tokenizer()
+    chunks = []
+    for doc in docs:
+        # chunk_size and overlap travel with every chunk so its ID changes when the split does
+        metadata = {**(getattr(doc, "metadata", None) or {}), "chunk_size": chunk_size, "chunk_overlap": overlap}
+        for chunk in splitter.create_documents([doc.page_content], [metadata]):
+            chunk.metadata["token_count"] = tokenizer.count(chunk.page_content)
+            chunks.append(chunk)
+    return chunks
+
+
+class ChunkIndex:
+    """(source, page, char offset, token count) for every chunk, in flat typed arrays.
+
+    Source names are interned; a missing page is stored as -1. Row ``i`` is
+    the ``i``-th chunk produced, so each page's chunks are one run of rows,
+    which is all ``token_count`` scans.
+    """
+
+    def __init__(self):
+        self.sources: List[str] = []
+        self._source_ids: Dict[str, int] = {}
+        self.source_ids = array("i")
+        self.pages = array("i")
+        self.offsets = array("q")
+        self.token_counts = array("i")
+        # (source id, page) -> its first row and one past its last
+        self._page_rows: Dict[Tuple[int, int], List[int]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, metadata: Dict[str, Any]) -> int:
+        source = str(metadata.get("source", ""))
+        page = metadata.get("page")
+        with self._lock:
+            source_id = self._source_ids.get(source)
+            if source_id is None:
+                source_id = self._source_ids[source] = len(self.sources)
+                self.sources.append(source)
+            page = page if isinstance(page, int) else -1
+            row = len(self.token_counts)
+            self.source_ids.append(source_id)
+            self.pages.append(page)
+            self.offsets.append(int(metadata.get("start_index") or 0))
+            self.token_counts.append(int(metadata.get("token_count") or 0))
+            rows = self._page_rows.setdefault((source_id, page), [row, row])
+            rows[1] = row + 1
+            return row
+
+    def token_count(self, source: str, page: Optional[int], start_index: int) -> Optional[int]:
+        """Token count of the chunk at ``start_index`` of a source page, or None if it was not indexed."""
+        source_id = self._source_ids.get(str(source))
+        rows = self._page_rows.get((source_id, page if isinstance(page, int) else -1))
+        if rows is None:
+            return None
+        # the splitter's offsets are not always increasing within a page, so no bisect
+        for row in range(*rows):
+            if self.offsets[row] == start_index:
+                return self.token_counts[row]
+        return None
+
+    def __len__(self) -> int:
+        return len(self.token_counts)
+
+    def __getitem__(self, row: int) -> Dict[str, Any]:
+        page = self.pages[row]
+        return {
+            "source": self.sources[self.source_ids[row]],
+            "page": page if page >= 0 else None,
+            "start_index": self.offsets[row],
+            "token_count": self.token_counts[row],
+        }
+
+    def total_tokens(self) -> int:
+        return sum(self.token_counts)
+
+    def tokens_by_source(self) -> Dict[str, int]:
+        totals = [0] * len(self.sources)
+        for source_id, tokens in zip(self.source_ids, self.token_counts):
+            totals[source_id] += tokens
+        return dict(zip(self.sources, totals))
+
+    def nbytes(self) -> int:
+        return sum(len(column) * column.itemsize for column in (self.source_ids, self.pages, self.offsets, self.token_counts))
+
+
+_POOL: Optional[ProcessPoolExecutor] = None
+_POOL_WORKERS = 0
+_POOL_LOCK = threading.Lock()
+
+
+def _get_pool(max_workers: Optional[int]) -> ProcessPoolExecutor:
+    # kept for the life of the process: re-chunking after a parameter change reuses warm workers
+    global _POOL, _POOL_WORKERS
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL_WORKERS = max_workers or os.cpu_count() or 1
+            _POOL = ProcessPoolExecutor(max_workers=_POOL_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _POOL
+
+
+def _batches(docs: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    docs = iter(docs)
+    while True:
+        batch = list(itertools.islice(docs, size))
+        if not batch:
+            return
+        yield batch
+
+
+def iter_chunks(
+    docs: Iterable[Any],
+    chunk_size: int = 250,
+    overlap: Optional[int] = None,
+    parallel: bool = CHUNK_PARALLEL,
+    max_workers: Optional[int] = CHUNK_MAX_WORKERS,
+    pages_per_task: int = CHUNK_PAGES_PER_TASK,
+    index: Optional[ChunkIndex] = None,
+) -> Iterator[Document]:
+    """Yield chunks in page order, splitting batches of pages across worker processes.
+
+    Input smaller than two batches, or a single worker, is split in-process.
+    At most two batches per worker are outstanding, so chunks never pile up
+    ahead of the consumer. Every chunk is recorded in ``index`` when one is
+    given.
+    """
+    overlap = chunk_overlap(chunk_size) if overlap is None else overlap
+    batches = _batches(docs, max(1, pages_per_task))
+    head = list(itertools.islice(batches, 2))
+    if not parallel or len(head) < 2 or (max_workers or os.cpu_count() or 1) < 2:
+        results: Iterator[List[Document]] = (split_pages(batch, chunk_size, overlap) for batch in itertools.chain(head, batches))
+    else:
+        results = _split_in_pool(itertools.chain(head, batches), chunk_size, overlap, _get_pool(max_workers))
+    for chunks in results:
+        for chunk in chunks:
+            if index is not None:
+                index.add(chunk.metadata)
+            yield chunk
+
+
+def _split_in_pool(batches: Iterable[List[Any]], chunk_size: int, overlap: int, pool: ProcessPoolExecutor) -> Iterator[List[Document]]:
+    pending = deque()
+    for batch in batches:
+        pending.append(pool.submit(split_pages, batch, chunk_size, overlap))
+        if len(pending) >= 2 * _POOL_WORKERS:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
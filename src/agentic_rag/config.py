@@ -1,34 +1,177 @@
 import os
-import streamlit as st
+import threading
+from collections.abc import MutableMapping
 from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Mapping
 from langchain_core.messages import BaseMessage
 
-def load_secrets_from_streamlit():
-    os.environ["LANGCHAIN_TRACING_V2"] = "true"
-    os.environ["LANGCHAIN_ENDPOINT"] = "https://api.smith.langchain.com"
-    os.environ["LANGCHAIN_API_KEY"] = st.secrets.get("LANGCHAIN_API_KEY", "")
-    os.environ["TAVILY_API_KEY"] = st.secrets.get("TAVILY_API_KEY", "")
-    os.environ["OPENWEATHERMAP_API_KEY"] = st.secrets.get("OPEN_WEATHER_API_KEY", "")
 
+def _streamlit_secrets() -> Dict[str, Any]:
+    # st.secrets raises without a secrets.toml, e.g. in the headless server
+    try:
+        import streamlit as st
+        return {key: st.secrets[key] for key in st.secrets}
+    except Exception:
+        return {}
+
+
+def load_secrets(source: Optional[Mapping[str, Any]] = None) -> Dict[str, str]:
+    """API keys from ``source`` (Streamlit secrets by default), falling back to environment variables."""
+    source = _streamlit_secrets() if source is None else source
+
+    def get(key: str, env_key: str) -> str:
+        return str(source.get(key) or os.getenv(env_key, ""))
+
+    langchain_api_key = get("LANGCHAIN_API_KEY", "LANGCHAIN_API_KEY")
+    # only trace to LangSmith when there is a key to trace with
+    os.environ["LANGCHAIN_TRACING_V2"] = "true" if langchain_api_key else os.getenv("LANGCHAIN_TRACING_V2", "false")
+    os.environ["LANGCHAIN_ENDPOINT"] = "https://api.smith.langchain.com"
+    os.environ["LANGCHAIN_API_KEY"] = langchain_api_key
+    os.environ["TAVILY_API_KEY"] = get("TAVILY_API_KEY", "TAVILY_API_KEY")
+    os.environ["OPENWEATHERMAP_API_KEY"] = get("OPEN_WEATHER_API_KEY", "OPENWEATHERMAP_API_KEY")
 
     secrets = {
-    "GOOGLE_API_KEY": st.secrets.get("GOOGLE_API_KEY", ""),
-    "GROQ_API_KEY": st.secrets.get("GROQ_API_KEY", ""),
-    "QDRANT_API": st.secrets.get("Qdrant_API_KEY", ""),
-    "QDRANT_URL": st.secrets.get("Qdrant_END_POINT", ""),
+    "GOOGLE_API_KEY": get("GOOGLE_API_KEY", "GOOGLE_API_KEY"),
+    "GROQ_API_KEY": get("GROQ_API_KEY", "GROQ_API_KEY"),
+    "QDRANT_API": get("Qdrant_API_KEY", "QDRANT_API_KEY"),
+    "QDRANT_URL": get("Qdrant_END_POINT", "QDRANT_URL"),
     }
     return secrets
 
-SECRETS = load_secrets_from_streamlit()
+
+def load_secrets_from_streamlit():
+    return load_secrets()
+
+
+class LazySecrets(MutableMapping):
+    """``load_secrets()`` on first access, so importing config neither reads Streamlit secrets nor touches the environment."""
+
+    def __init__(self, loader=load_secrets):
+        self._loader = loader
+        self._data: Optional[Dict[str, str]] = None
+        self._lock = threading.Lock()
+
+    def _loaded(self) -> Dict[str, str]:
+        if self._data is None:
+            with self._lock:
+                if self._data is None:
+                    self._data = self._loader()
+        return self._data
+
+    def __getitem__(self, key: str) -> str:
+        return self._loaded()[key]
+
+    def __setitem__(self, key: str, value: str) -> None:
+        self._loaded()[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        del self._loaded()[key]
+
+    def __iter__(self):
+        return iter(self._loaded())
+
+    def __len__(self) -> int:
+        return len(self._loaded())
+
+    def __repr__(self) -> str:
+        return f"LazySecrets({'unloaded' if self._data is None else sorted(self._data)})"
+
+
+SECRETS = LazySecrets()
+
+
+def configure(secrets: Mapping[str, str]) -> Dict[str, str]:
+    """Merge ``secrets`` into the process-wide secrets, e.g. from the server's own configuration; ``None`` values are ignored."""
+    SECRETS.update({key: value for key, value in secrets.items() if value is not None})
+    return SECRETS
+
+EMBEDDING_MODEL = "models/embedding-001"
+LLM_MODEL = os.getenv("LLM_MODEL", "openai/gpt-oss-20b")
+PROMPTS_DIR = os.getenv("PROMPTS_DIR", os.path.join(os.path.dirname(__file__), "data", "prompts"))
+EMBEDDING_CACHE_PATH = os.getenv(
+    "EMBEDDING_CACHE_PATH",
+    os.path.join(os.path.expanduser("~"), ".cache", "agentic_rag", "embeddings.sqlite3"),
+)
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "200000"))
+
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "64"))
+INGEST_MAX_WORKERS = int(os.getenv("INGEST_MAX_WORKERS", "4"))
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "8"))
+
+# "qdrant" (remote, default) or "local" (in-process NumPy index persisted under LOCAL_INDEX_DIR)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "qdrant").lower()
+LOCAL_INDEX_DIR = os.getenv(
+    "LOCAL_INDEX_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "agentic_rag", "indexes"),
+)
+
+# "dense" (vector search only) or "hybrid" (vector + BM25, fused with reciprocal-rank fusion)
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "dense").lower()
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "20"))
+# minimum cosine similarity for a chunk to be returned; unset means no cutoff
+RETRIEVER_SCORE_THRESHOLD = float(os.environ["RETRIEVER_SCORE_THRESHOLD"]) if os.getenv("RETRIEVER_SCORE_THRESHOLD") else None
+
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1024"))
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.95"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "86400"))
+ANSWER_CACHE_WEATHER_TTL = float(os.getenv("ANSWER_CACHE_WEATHER_TTL", "600"))
+
+LOAD_PARALLEL = os.getenv("LOAD_PARALLEL", "true").lower() in ("1", "true", "yes")
+LOAD_MAX_WORKERS = int(os.getenv("LOAD_MAX_WORKERS", "0")) or None
+LOAD_PAGES_PER_TASK = int(os.getenv("LOAD_PAGES_PER_TASK", "25"))
+# uploads smaller than this in total are parsed in-process; a pool only pays off on real work
+LOAD_PARALLEL_MIN_BYTES = int(os.getenv("LOAD_PARALLEL_MIN_BYTES", str(1 << 20)))
+
+# chunk overlap as a fraction of chunk_size
+CHUNK_OVERLAP_RATIO = float(os.getenv("CHUNK_OVERLAP_RATIO", "0.15"))
+# pages are split in worker processes once there are at least two tasks' worth
+CHUNK_PARALLEL = os.getenv("CHUNK_PARALLEL", "true").lower() in ("1", "true", "yes")
+CHUNK_MAX_WORKERS = int(os.getenv("CHUNK_MAX_WORKERS", "0")) or None
+CHUNK_PAGES_PER_TASK = int(os.getenv("CHUNK_PAGES_PER_TASK", "64"))
+
+# queries the local router classifies below this confidence go to the LLM
+ROUTER_CONFIDENCE = float(os.getenv("ROUTER_CONFIDENCE", "0.85"))
+
+WEATHER_CACHE_TTL = float(os.getenv("WEATHER_CACHE_TTL", "600"))
+
+# built systems (graph + index) shared by every Streamlit session in the process,
+# keyed by (knowledge hash, chunk_size, k, temperature); only unused ones are evicted.
+# Each (knowledge hash, chunk_size) has its own collection, dropped when its last system is evicted
+SYSTEM_CACHE_MAX_ENTRIES = int(os.getenv("SYSTEM_CACHE_MAX_ENTRIES", "8"))
+SYSTEM_CACHE_MAX_MB = float(os.getenv("SYSTEM_CACHE_MAX_MB", "1024"))
+SYSTEM_CACHE_IDLE_SECONDS = float(os.getenv("SYSTEM_CACHE_IDLE_SECONDS", "3600"))
+
+# start retrieval (and, optionally, the weather fetch) while the LLM router decides
+SPECULATIVE_EXECUTION = os.getenv("SPECULATIVE_EXECUTION", "true").lower() in ("1", "true", "yes")
+SPECULATIVE_WEATHER = os.getenv("SPECULATIVE_WEATHER", "false").lower() in ("1", "true", "yes")
+
+# retrieved chunks are merged, de-duplicated and cut to this many tokens before generation
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "2000"))
+TOKENIZER_ENCODING = os.getenv("TOKENIZER_ENCODING", "cl100k_base")
+
+# recent messages passed verbatim to the graph; older ones live in a rolling summary
+CONVERSATION_WINDOW = int(os.getenv("CONVERSATION_WINDOW", "6"))
+CONVERSATION_SUMMARY_TOKENS = int(os.getenv("CONVERSATION_SUMMARY_TOKENS", "300"))
+
+# spans kept in memory for percentiles; set TRACE_EXPORT_PATH to also append every span to a JSONL file
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "5000"))
+TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH", "")
 
 class AgentState(BaseModel):
     messages: List[BaseMessage] = Field(default_factory=list)
     chat_history: List[BaseMessage] = Field(default_factory=list)
+    conversation_summary: str = ""
     current_query: Optional[str] = None
     retrieved_docs: List[Dict[str, Any]] = Field(default_factory=list)
     generated_answer: Optional[str] = None
     next_step: Optional[str] = None
+    source_filter: List[str] = Field(default_factory=list)
+    # key into answer_cache.QUERY_EMBEDDINGS; the vector itself stays out of the state
+    query_embedding_key: Optional[str] = None
+    cache_hit: bool = False
+    generation_metrics: Dict[str, float] = Field(default_factory=dict)
+    speculative_route: Optional[str] = None
 
 
     model_config = ConfigDict(arbitrary_types_allowed=True)
\ No newline at end of file
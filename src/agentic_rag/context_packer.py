@@ -0,0 +1,114 @@
+from typing import List, Any, Dict, Optional, Tuple
+from tokenizer import Tokenizer, get_tokenizer
+from chunker import ChunkIndex
+
+
+SEPARATOR = "\n\n---\n\n"
+
+
+def _span_key(metadata: Dict[str, Any]) -> Optional[Tuple[Any, Any]]:
+    # start_index is an offset into one page (or whole file) of one source
+    if metadata.get("start_index") is None:
+        return None
+    return metadata.get("file_digest") or metadata.get("source"), metadata.get("page")
+
+
+def merge_passages(docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Merge overlapping or adjacent chunks of the same source page and drop duplicates.
+
+    ``docs`` are ``{"content", "metadata"}`` dicts in relevance order; each
+    passage returned keeps the best rank of the chunks it absorbed and how
+    many it absorbed (``chunks``).
+    """
+    groups: Dict[Tuple[Any, Any], List[Tuple[int, int, str, Dict[str, Any]]]] = {}
+    passages = []
+    for rank, doc in enumerate(docs):
+        key = _span_key(doc.get("metadata") or {})
+        if key is None:
+            passages.append({"rank": rank, "content": doc["content"], "metadata": doc.get("metadata") or {}, "chunks": 1})
+        else:
+            groups.setdefault(key, []).append((int(doc["metadata"]["start_index"]), rank, doc["content"], doc["metadata"]))
+
+    for spans in groups.values():
+        spans.sort(key=lambda span: span[0])
+        start, rank, text, metadata = spans[0]
+        chunks = 1
+        for next_start, next_rank, next_text, next_metadata in spans[1:]:
+            end = start + len(text)
+            if next_start > end:
+                passages.append({"rank": rank, "content": text, "metadata": metadata, "chunks": chunks})
+                start, rank, text, metadata = next_start, next_rank, next_text, next_metadata
+                chunks = 1
+                continue
+            # overlapping or touching: append only the part past the current end
+            text += next_text[end - next_start:]
+            rank = min(rank, next_rank)
+            chunks += 1
+        passages.append({"rank": rank, "content": text, "metadata": metadata, "chunks": chunks})
+
+    passages.sort(key=lambda passage: passage["rank"])
+    kept, seen = [], []
+    for passage in passages:
+        # drop passages whose text already appears inside a better-ranked one
+        normalized = " ".join(passage["content"].split())
+        if normalized and not any(normalized in other for other in seen):
+            kept.append(passage)
+            seen.append(normalized)
+    return kept
+
+
+def _header(metadata: Dict[str, Any]) -> str:
+    source = metadata.get("source")
+    if not source:
+        return ""
+    page = metadata.get("page")
+    return f"[{source}, page {page + 1}]\n" if isinstance(page, int) else f"[{source}]\n"
+
+
+def _known_token_count(metadata: Dict[str, Any], chunk_index: Optional[ChunkIndex]) -> Optional[int]:
+    # from the chunk's own metadata, else from the index of what this process split
+    if metadata.get("token_count") is not None:
+        return metadata["token_count"]
+    if chunk_index is None or metadata.get("start_index") is None:
+        return None
+    return chunk_index.token_count(metadata.get("source", ""), metadata.get("page"), int(metadata["start_index"]))
+
+
+def pack_context(docs: List[Dict[str, Any]], token_budget: int, tokenizer: Optional[Tokenizer] = None, chunk_index: Optional[ChunkIndex] = None) -> Tuple[str, Dict[str, float]]:
+    """Build the generation context from retrieved docs within ``token_budget`` tokens.
+
+    Returns the context and token counts: ``raw_tokens`` for the naive
+    concatenation, ``context_tokens`` as packed, and ``tokens_saved``.
+    Chunks with a known token count (see ``_known_token_count``) are not
+    re-tokenized unless merged with others.
+    """
+    tokenizer = tokenizer or get_tokenizer()
+    counts = [_known_token_count(doc.get("metadata") or {}, chunk_index) for doc in docs]
+    raw_tokens = sum(counts) if all(count is not None for count in counts) else tokenizer.count("".join(doc["content"] for doc in docs))
+    separator_tokens = tokenizer.count(SEPARATOR)
+
+    parts = []
+    used = 0
+    passages = merge_passages(docs)
+    for passage in passages:
+        header = _header(passage["metadata"])
+        text = header + passage["content"].strip()
+        known = _known_token_count(passage["metadata"], chunk_index) if passage["chunks"] == 1 else None
+        # the header ends in a newline, so its tokens never merge with the chunk's
+        content_tokens = tokenizer.count(text) if known is None else tokenizer.count(header) + known
+        cost = content_tokens + (separator_tokens if parts else 0)
+        if used + cost <= token_budget:
+            parts.append(text)
+            used += cost
+        elif not parts:
+            # never return an empty context because the best passage is long
+            parts.append(tokenizer.truncate(text, token_budget))
+            used = tokenizer.count(parts[0])
+    context = SEPARATOR.join(parts)
+    return context, {
+        "raw_tokens": raw_tokens,
+        "context_tokens": used,
+        "tokens_saved": max(0, raw_tokens - used),
+        "passages": len(parts),
+        "dropped_passages": len(passages) - len(parts),
+    }
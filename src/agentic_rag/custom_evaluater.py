@@ -129,6 +129,12 @@ def check_retrieval_presence(run, example) -> EvaluationResult:
 
 
 if __name__ == "__main__":
+    import sys
+    from evaluate import is_local_dataset, main
+
+    # a local .jsonl dataset runs through the concurrent, resumable runner with these evaluators
+    if len(sys.argv) > 1 and is_local_dataset(sys.argv[1]):
+        sys.exit(main(sys.argv[1:]))
 
     predictor = run_agent_graph           
     dataset_name = "Neura_Dynamics_Assignment"  # <-- your LangSmith dataset name
@@ -0,0 +1,165 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+
+Predictor = Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+
+def example_id(example: Dict[str, Any], index: int) -> str:
+    if example.get("id") is not None:
+        return str(example["id"])
+    # stable across runs as long as the example itself does not change
+    return hashlib.sha1(json.dumps(example, sort_keys=True, default=str).encode()).hexdigest()[:16] + f"-{index}"
+
+
+def load_jsonl(path: str) -> List[Dict[str, Any]]:
+    """A local dataset: one LangSmith-shaped example (``{"input": {...}, "output": ...}``) per line."""
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def load_checkpoint(path: str) -> Dict[str, Dict[str, Any]]:
+    """Finished results by example id; the last line for an id wins and a torn final line is ignored."""
+    records: Dict[str, Dict[str, Any]] = {}
+    if not path or not os.path.exists(path):
+        return records
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            records[record["id"]] = record
+    return records
+
+
+def _ends_mid_line(path: str) -> bool:
+    if not os.path.getsize(path):
+        return False
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) != b"\n"
+
+
+def _score(evaluators: Iterable[Any], output: Optional[Dict[str, Any]], example: Dict[str, Any]) -> Dict[str, Any]:
+    # evaluators are langsmith @run_evaluator functions; call the wrapped function on plain dicts
+    run = {"outputs": output or {}, "metadata": {"retrieved_docs": (output or {}).get("retrieved_docs")}}
+    example = {key: value for key, value in example.items() if key != "id"}
+    scores, comments, errors = {}, {}, []
+    for evaluator in evaluators:
+        # one broken evaluator fails its example, not the whole run
+        try:
+            result = getattr(evaluator, "__wrapped__", evaluator)(run, example)
+        except Exception as e:
+            errors.append(f"{getattr(evaluator, '__name__', type(evaluator).__name__)}: {type(e).__name__}: {e}")
+            continue
+        scores[result.key] = result.score
+        comments[result.key] = result.comment
+    return {"scores": scores, "comments": comments, "evaluator_errors": errors}
+
+
+async def run_local_eval(
+    examples: List[Dict[str, Any]],
+    predictor: Predictor,
+    evaluators: Iterable[Any] = (),
+    checkpoint_path: Optional[str] = None,
+    max_concurrency: int = 8,
+    timeout: Optional[float] = None,
+    on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    """Run ``predictor`` over ``examples`` with at most ``max_concurrency`` in flight.
+
+    Each finished example is appended to ``checkpoint_path`` as one JSON line
+    as soon as it completes, so an interrupted run picks up where it stopped:
+    examples already recorded without an error are skipped. Returns
+    ``summarize`` over every recorded example.
+    """
+    evaluators = list(evaluators)
+    done = load_checkpoint(checkpoint_path)
+    keyed = [(example_id(example, index), example) for index, example in enumerate(examples)]
+    pending = [(eid, example) for eid, example in keyed if eid not in done or done[eid].get("error")]
+    semaphore = asyncio.Semaphore(max_concurrency)
+    checkpoint = open(checkpoint_path, "a", encoding="utf-8") if checkpoint_path else None
+    if checkpoint is not None and _ends_mid_line(checkpoint_path):
+        # a killed run can leave a torn last line; start the next record on its own line
+        checkpoint.write("\n")
+
+    async def run_one(eid: str, example: Dict[str, Any]) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            output, error = None, None
+            try:
+                output = await asyncio.wait_for(predictor(example), timeout)
+                error = output.get("error")
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            latency_ms = (time.perf_counter() - started) * 1000
+            scored = _score(evaluators, output, example)
+            # an example an evaluator failed on is an error row, retried on resume
+            error = error or "; ".join(scored["evaluator_errors"]) or None
+            record = {
+                "id": eid,
+                "output": (output or {}).get("output"),
+                "error": error,
+                "latency_ms": latency_ms,
+                "metrics": (output or {}).get("metrics", {}),
+                **scored,
+            }
+        done[eid] = record
+        if checkpoint is not None:
+            checkpoint.write(json.dumps(record, default=str) + "\n")
+            checkpoint.flush()
+        if on_result is not None:
+            on_result(record)
+
+    try:
+        await asyncio.gather(*(run_one(eid, example) for eid, example in pending))
+    finally:
+        if checkpoint is not None:
+            checkpoint.close()
+    return summarize([done[eid] for eid, _ in keyed if eid in done])
+
+
+def _percentile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))] if values else 0.0
+
+
+def summarize(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    scores: Dict[str, List[float]] = {}
+    for record in records:
+        for key, score in record.get("scores", {}).items():
+            scores.setdefault(key, []).append(float(score or 0))
+    latencies = [record["latency_ms"] for record in records if not record.get("error")]
+    tokens = {
+        name: sum(record.get("metrics", {}).get(name, 0) or 0 for record in records)
+        for name in ("input_tokens", "output_tokens", "context_tokens")
+    }
+    ttfts = [record["metrics"]["ttft_ms"] for record in records if record.get("metrics", {}).get("ttft_ms") is not None]
+    return {
+        "examples": len(records),
+        "errors": sum(1 for record in records if record.get("error")),
+        "scores": {key: sum(values) / len(values) for key, values in sorted(scores.items())},
+        "latency_ms": {"mean": sum(latencies) / len(latencies) if latencies else 0.0, "p50": _percentile(latencies, 0.5), "p95": _percentile(latencies, 0.95), "max": max(latencies, default=0.0)},
+        "ttft_ms": {"p50": _percentile(ttfts, 0.5), "p95": _percentile(ttfts, 0.95)},
+        "tokens": {**tokens, **{f"{name}_per_example": total / len(records) if records else 0.0 for name, total in tokens.items()}},
+    }
+
+
+def format_summary(summary: Dict[str, Any]) -> str:
+    lines = [f"examples: {summary['examples']}  errors: {summary['errors']}"]
+    lines += [f"{key}: {value:.3f}" for key, value in summary["scores"].items()]
+    latency = summary["latency_ms"]
+    lines.append(f"latency ms: mean {latency['mean']:.0f}  p50 {latency['p50']:.0f}  p95 {latency['p95']:.0f}  max {latency['max']:.0f}")
+    lines.append(f"ttft ms: p50 {summary['ttft_ms']['p50']:.0f}  p95 {summary['ttft_ms']['p95']:.0f}")
+    tokens = summary["tokens"]
+    lines.append(
+        f"tokens: input {tokens['input_tokens']:.0f} ({tokens['input_tokens_per_example']:.0f}/example)  "
+        f"output {tokens['output_tokens']:.0f} ({tokens['output_tokens_per_example']:.0f}/example)  "
+        f"context {tokens['context_tokens']:.0f} ({tokens['context_tokens_per_example']:.0f}/example)"
+    )
+    return "\n".join(lines)
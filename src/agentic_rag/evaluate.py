@@ -1,22 +1,34 @@
 import os
+import sys
+import asyncio
+import argparse
+import functools
 from dotenv import load_dotenv
-from langsmith.evaluation import evaluate
+from langsmith.evaluation import aevaluate
 from langchain_core.messages import HumanMessage
-import streamlit as st
 
-from app import initialize_system
+from app import initialize_system, astream_graph
 from config import AgentState, load_secrets_from_streamlit
+from eval_runner import load_jsonl, run_local_eval, format_summary
+from tracing import TRACER
 
-# -------------------------------------------------
-# INITIAL SETUP
-# -------------------------------------------------
-load_secrets_from_streamlit()
+DATASET_NAME = "Neura_Dynamics_Assignment"   # <-- your dataset name in LangSmith
+# examples evaluated concurrently on one event loop
+EVAL_MAX_CONCURRENCY = int(os.getenv("EVAL_MAX_CONCURRENCY", "8"))
 
-print("Initializing agent graph...")
-app_graph, _, _, _, _ = initialize_system(uploaded_files=[])
-print("Initialization complete.\n")
 
-DATASET_NAME = "Neura_Dynamics_Assignment"   # <-- your dataset name in LangSmith
+# -------------------------------------------------
+# INITIAL SETUP (on first use, not at import)
+# -------------------------------------------------
+@functools.lru_cache(maxsize=None)
+def get_app_graph():
+    load_secrets_from_streamlit()
+    print("Initializing agent graph...")
+    # no answer cache: every example must run the whole graph, or repeats score the cache.
+    # attach only: syncing no uploads would delete everything the server ingested
+    graph = initialize_system(uploaded_files=[], answer_cache_fn=None, sync=False)[0]
+    print("Initialization complete.\n")
+    return graph
 
 
 # -------------------------------------------------
@@ -66,46 +78,97 @@ def extract_answer(final_state):
 # -------------------------------------------------
 # MAIN PREDICTOR FOR LANGSMITH EVALUATION
 # -------------------------------------------------
-def run_agent_graph(example):
-    print("\n=== NEW EXAMPLE RECEIVED ===")
-    print("Example repr:", repr(example)[:1000])
-
-    query = extract_query(example)
-    if not query:
-        return {"error": f"Could not extract query. Example: {repr(example)}"}
-
-    # mock Streamlit session state
-    class MockState:
-        logs = []
-    st.session_state = MockState()
-
+def _initial_state(example, query):
     # Build agent state for your workflow
-    initial_state = AgentState(
+    return AgentState(
         messages=[HumanMessage(content=query)],
         chat_history=example.get("input", {}).get("chat_history", []),
         current_query=query,
         retrieved_docs=example.get("input", {}).get("retrieved_docs", [])
     )
 
-    # Invoke your LangGraph workflow
-    final_state = app_graph.invoke(initial_state)
 
-    print("final_state repr:", repr(final_state)[:2000])
-    answer = extract_answer(final_state)
+def run_agent_graph(example):
+    query = extract_query(example)
+    if not query:
+        return {"error": f"Could not extract query. Example: {repr(example)[:200]}"}
 
-    return {"output": answer}
+    # Invoke your LangGraph workflow
+    final_state = get_app_graph().invoke(_initial_state(example, query))
+    return {"output": extract_answer(final_state)}
 
 
-# -------------------------------------------------
-# RUN LANGSMITH EVALUATION WITH YOUR DATASET
-# -------------------------------------------------
-print(f"Running evaluation on LangSmith dataset: {DATASET_NAME}\n")
-
-results = evaluate(
-    run_agent_graph,
-    data=DATASET_NAME,     # <-- THIS USES YOUR LANGSMITH DATASET
-    description="Evaluation run for RAG + Weather Agent using LangGraph"
-)
+async def arun_agent_graph(example):
+    """Async predictor: the graph awaits its LLM and HTTP calls, so examples share one loop.
 
-print("\n=== EVALUATION RESULTS ===")
-print(results)
+    Besides the answer it reports the run's latency and token counts.
+    """
+    query = extract_query(example)
+    if not query:
+        return {"error": f"Could not extract query. Example: {repr(example)[:200]}"}
+
+    updates, metrics = await astream_graph(get_app_graph(), _initial_state(example, query))
+    llm_spans = [span for span in TRACER.spans(metrics["trace_id"]) if span.kind == "llm"]
+    return {
+        "output": extract_answer(updates),
+        "retrieved_docs": len(updates.get("retrieved_docs") or []),
+        "metrics": {
+            "total_ms": metrics["total_ms"],
+            "ttft_ms": metrics.get("ttft_ms"),
+            "context_tokens": metrics.get("generation_context_tokens", 0),
+            "input_tokens": sum(span.attributes.get("input_tokens") or 0 for span in llm_spans),
+            "output_tokens": sum(span.attributes.get("output_tokens") or 0 for span in llm_spans),
+            "llm_calls": len(llm_spans),
+        },
+    }
+
+
+def is_local_dataset(dataset):
+    return dataset.endswith(".jsonl") or os.path.exists(dataset)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate the agent graph on a LangSmith dataset or a local JSONL file.")
+    parser.add_argument("dataset", nargs="?", default=DATASET_NAME, help="LangSmith dataset name or path to a .jsonl file")
+    parser.add_argument("--checkpoint", help="JSONL results file; an interrupted local run resumes from it (default: <dataset>.results.jsonl)")
+    parser.add_argument("--concurrency", type=int, default=EVAL_MAX_CONCURRENCY)
+    parser.add_argument("--limit", type=int, help="only the first N examples")
+    parser.add_argument("--timeout", type=float, help="seconds allowed per example")
+    args = parser.parse_args(argv)
+
+    if not is_local_dataset(args.dataset):
+        # -------------------------------------------------
+        # RUN LANGSMITH EVALUATION WITH YOUR DATASET
+        # -------------------------------------------------
+        print(f"Running evaluation on LangSmith dataset: {args.dataset}\n")
+        results = asyncio.run(aevaluate(
+            arun_agent_graph,
+            data=args.dataset,     # <-- THIS USES YOUR LANGSMITH DATASET
+            description="Evaluation run for RAG + Weather Agent using LangGraph",
+            max_concurrency=args.concurrency
+        ))
+        print("\n=== EVALUATION RESULTS ===")
+        print(results)
+        return 0
+
+    from custom_evaluater import check_contains_reference, check_retrieval_presence
+    examples = load_jsonl(args.dataset)[:args.limit]
+    checkpoint = args.checkpoint or os.path.splitext(args.dataset)[0] + ".results.jsonl"
+    print(f"Running local evaluation on {len(examples)} examples from {args.dataset} (results in {checkpoint})\n")
+    summary = asyncio.run(run_local_eval(
+        examples,
+        arun_agent_graph,
+        evaluators=[check_contains_reference, check_retrieval_presence],
+        checkpoint_path=checkpoint,
+        max_concurrency=args.concurrency,
+        timeout=args.timeout,
+        on_result=lambda record: print(f"[{record['id']}] {record['latency_ms']:.0f} ms {record['scores']}{' ERROR ' + record['error'] if record['error'] else ''}"),
+    ))
+    print("\n=== EVALUATION RESULTS ===")
+    print(format_summary(summary))
+    return 0
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    sys.exit(main())
@@ -0,0 +1,62 @@
+import os
+import re
+import functools
+from typing import Dict, List, Optional
+
+
+CITIES_PATH = os.path.join(os.path.dirname(__file__), "data", "cities.txt")
+
+_WORD_RE = re.compile(r"[^\W\d_]+", re.UNICODE)
+
+
+def _words(text: str) -> List[str]:
+    return _WORD_RE.findall(text.lower())
+
+
+class Gazetteer:
+    """Hash index from lower-cased name n-grams to canonical place names."""
+
+    def __init__(self, names: Dict[str, str]):
+        self._names = {" ".join(_words(alias)): canonical for alias, canonical in names.items()}
+        self._max_words = max((len(alias.split()) for alias in self._names), default=1)
+
+    @classmethod
+    def from_file(cls, path: str) -> "Gazetteer":
+        names = {}
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                canonical, *aliases = [part.strip() for part in line.split("|")]
+                for alias in [canonical] + aliases:
+                    names[alias] = canonical
+        return cls(names)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def find_all(self, text: str) -> List[str]:
+        """Canonical names mentioned in ``text``, longest match first at each position."""
+        words = _words(text)
+        found = []
+        i = 0
+        while i < len(words):
+            for size in range(min(self._max_words, len(words) - i), 0, -1):
+                canonical = self._names.get(" ".join(words[i:i + size]))
+                if canonical is not None:
+                    found.append(canonical)
+                    i += size
+                    break
+            else:
+                i += 1
+        return found
+
+    def find(self, text: str) -> Optional[str]:
+        found = self.find_all(text)
+        return found[0] if found else None
+
+
+@functools.lru_cache(maxsize=None)
+def get_city_gazetteer(path: str = CITIES_PATH) -> Gazetteer:
+    return Gazetteer.from_file(path)
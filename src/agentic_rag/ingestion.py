@@ -0,0 +1,170 @@
+import time
+import queue
+import random
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Any, Dict, Optional, Callable, Iterable, Iterator, Tuple
+from tracing import span
+from startup import LazyModule
+
+qdrant_client = LazyModule("qdrant_client")
+
+
+# (done, total); total is None when chunks are streamed and the count is unknown
+ProgressCallback = Callable[[int, Optional[int]], None]
+Batch = Tuple[List[str], List[str], List[Dict[str, Any]]]
+EmbeddedBatch = Tuple[List[str], List[str], List[Dict[str, Any]], List[List[float]]]
+
+_RATE_LIMIT_MARKERS = ("429", "rate limit", "ratelimit", "resource exhausted", "resource_exhausted", "quota")
+
+
+def is_rate_limit_error(exc: Exception) -> bool:
+    if getattr(exc, "status_code", None) == 429 or getattr(exc, "code", None) == 429:
+        return True
+    text = f"{type(exc).__name__} {exc}".lower()
+    return any(marker in text for marker in _RATE_LIMIT_MARKERS)
+
+
+def embed_with_retry(embeddings: Any, texts: List[str], max_retries: int = 5, base_delay: float = 1.0, max_delay: float = 30.0) -> List[List[float]]:
+    attempt = 0
+    while True:
+        try:
+            return embeddings.embed_documents(texts)
+        except Exception as e:
+            if attempt >= max_retries or not is_rate_limit_error(e):
+                raise
+            delay = min(max_delay, base_delay * (2 ** attempt))
+            time.sleep(delay + random.uniform(0, delay / 2))
+            attempt += 1
+
+
+def batched(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def chunk_batches(chunks: Iterable[Tuple[str, str, Dict[str, Any]]], batch_size: int) -> Iterator[Batch]:
+    """Group a stream of (text, id, metadata) triples into column batches."""
+    for batch in batched(chunks, batch_size):
+        texts, ids, metadatas = zip(*batch)
+        yield list(texts), list(ids), list(metadatas)
+
+
+def embed_batches(
+    embeddings: Any,
+    batches: Iterable[Batch],
+    max_workers: int = 4,
+    queue_size: int = 8,
+    max_retries: int = 5,
+) -> Iterator[EmbeddedBatch]:
+    """Lazily embed a stream of batches, yielding them in completion order.
+
+    Up to ``max_workers`` batches are embedded concurrently; batches are only
+    pulled from ``batches`` while fewer than ``max_workers + queue_size`` are
+    embedded but not yet consumed, so a slow consumer stalls the upstream
+    stages instead of letting them buffer the whole corpus.
+    """
+    embedded: "queue.Queue[Tuple[Any, ...]]" = queue.Queue()
+    pending = iter(batches)
+    in_flight = 0
+
+    def embed_worker(batch_texts, batch_ids, batch_metadatas):
+        try:
+            vectors = embed_with_retry(embeddings, batch_texts, max_retries=max_retries)
+            embedded.put((batch_texts, batch_ids, batch_metadatas, vectors, None))
+        except Exception as e:
+            embedded.put((batch_texts, batch_ids, batch_metadatas, None, e))
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="embed") as pool:
+        try:
+            while True:
+                while in_flight < max_workers + queue_size:
+                    batch = next(pending, None)
+                    if batch is None:
+                        break
+                    pool.submit(embed_worker, *batch)
+                    in_flight += 1
+                if in_flight == 0:
+                    return
+
+                batch_texts, batch_ids, batch_metadatas, vectors, error = embedded.get()
+                in_flight -= 1
+                if error is not None:
+                    raise error
+                yield batch_texts, batch_ids, batch_metadatas, vectors
+        except BaseException:
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+
+
+def ingest_batches(
+    client: Any,
+    collection_name: str,
+    embeddings: Any,
+    batches: Iterable[Batch],
+    max_workers: int = 4,
+    queue_size: int = 8,
+    max_retries: int = 5,
+    progress_callback: Optional[ProgressCallback] = None,
+    total: Optional[int] = None,
+) -> int:
+    """Embed and upsert a stream of batches.
+
+    The calling thread upserts each embedded batch while the pool embeds the
+    next ones, so embedding batch N+1 overlaps the upsert of batch N. Batches
+    upserted before a failure stay in the collection. Payloads use the
+    LangChain Qdrant layout (``page_content``/``metadata``) so
+    ``Qdrant.as_retriever`` reads them.
+    """
+    done = 0
+    for batch_texts, batch_ids, batch_metadatas, vectors in embed_batches(
+        embeddings, batches, max_workers=max_workers, queue_size=queue_size, max_retries=max_retries
+    ):
+        with span("qdrant.upsert", "vectorstore", points=len(batch_ids)):
+            client.upsert(
+                collection_name=collection_name,
+                points=[
+                    qdrant_client.http.models.PointStruct(
+                        id=point_id,
+                        vector=vector,
+                        payload={"page_content": text, "metadata": metadata},
+                    )
+                    for text, point_id, metadata, vector in zip(batch_texts, batch_ids, batch_metadatas, vectors)
+                ],
+            )
+        done += len(batch_ids)
+        if progress_callback:
+            progress_callback(done, total)
+    return done
+
+
+def ingest_chunks(
+    client: Any,
+    collection_name: str,
+    embeddings: Any,
+    texts: List[str],
+    ids: List[str],
+    metadatas: Optional[List[Dict[str, Any]]] = None,
+    batch_size: int = 64,
+    max_workers: int = 4,
+    queue_size: int = 8,
+    max_retries: int = 5,
+    progress_callback: Optional[ProgressCallback] = None,
+) -> int:
+    metadatas = metadatas if metadatas is not None else [{} for _ in texts]
+    return ingest_batches(
+        client,
+        collection_name,
+        embeddings,
+        chunk_batches(zip(texts, ids, metadatas), batch_size),
+        max_workers=max_workers,
+        queue_size=queue_size,
+        max_retries=max_retries,
+        progress_callback=progress_callback,
+        total=len(texts),
+    )
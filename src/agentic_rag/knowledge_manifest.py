@@ -0,0 +1,97 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Iterable, List, Optional, Tuple
+
+DIGEST_BLOCK_SIZE = 1 << 20
+
+Entry = Tuple[str, str]  # (file name, sha256 of its bytes)
+
+
+def streaming_digest(uploaded_file: Any, block_size: int = DIGEST_BLOCK_SIZE) -> str:
+    """sha256 of the raw bytes, hashed block by block: the same value as ``parsers.file_digest``."""
+    digest = hashlib.sha256()
+    # BytesIO-backed uploads (Streamlit's UploadedFile) expose their buffer without a copy
+    buffer = uploaded_file.getbuffer() if hasattr(uploaded_file, "getbuffer") else memoryview(uploaded_file.getvalue())
+    with buffer:
+        for start in range(0, len(buffer), block_size):
+            with buffer[start:start + block_size] as block:
+                digest.update(block)
+    return digest.hexdigest()
+
+
+class FileDigestCache:
+    """Per-file digests memoized by upload identity and size.
+
+    Streamlit hands every rerun the same ``UploadedFile`` records, each with
+    a stable ``file_id``, so only new uploads are read. Files without a
+    ``file_id`` are digested every time.
+    """
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._digests: "OrderedDict[Tuple[str, str, int], str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(uploaded_file: Any) -> Optional[Tuple[str, str, int]]:
+        file_id = getattr(uploaded_file, "file_id", None)
+        size = getattr(uploaded_file, "size", None)
+        if file_id is None or size is None:
+            return None
+        return str(file_id), uploaded_file.name, int(size)
+
+    def digest(self, uploaded_file: Any) -> str:
+        key = self._key(uploaded_file)
+        if key is not None:
+            with self._lock:
+                digest = self._digests.get(key)
+                if digest is not None:
+                    self._digests.move_to_end(key)
+                    self.hits += 1
+                    return digest
+        digest = streaming_digest(uploaded_file)
+        with self._lock:
+            self.misses += 1
+            if key is not None:
+                self._digests[key] = digest
+                while len(self._digests) > self.max_entries:
+                    self._digests.popitem(last=False)
+        return digest
+
+
+class KnowledgeManifest:
+    """The uploaded knowledge as a sorted list of (name, digest).
+
+    ``hash`` does not depend on upload order; ``diff`` names what changed
+    against an earlier manifest.
+    """
+
+    def __init__(self, entries: Iterable[Entry]):
+        self.entries: List[Entry] = sorted(entries)
+        manifest = hashlib.sha256()
+        for name, digest in self.entries:
+            manifest.update(f"{digest} {name}\n".encode())
+        self.hash = manifest.hexdigest()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def diff(self, previous: Optional["KnowledgeManifest"]) -> Tuple[List[Entry], List[Entry]]:
+        """(added, removed) entries relative to ``previous``; a changed file shows up in both."""
+        before = set(previous.entries) if previous is not None else set()
+        after = set(self.entries)
+        return sorted(after - before), sorted(before - after)
+
+
+_SHARED_DIGESTS = FileDigestCache()
+
+
+def get_file_digest(uploaded_file: Any) -> str:
+    return _SHARED_DIGESTS.digest(uploaded_file)
+
+
+def build_manifest(uploaded_files: Iterable[Any]) -> KnowledgeManifest:
+    return KnowledgeManifest((uploaded_file.name, get_file_digest(uploaded_file)) for uploaded_file in uploaded_files)
@@ -0,0 +1,272 @@
+import os
+import asyncio
+import re
+import json
+import math
+import threading
+import contextvars
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Any, Dict, Optional, Iterable, Tuple
+import numpy as np
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from local_index import MetadataFilter, matches_filter, saved_version
+from tracing import span
+
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+class BM25Index:
+    """Incrementally updated BM25 index with CSR-style integer postings.
+
+    New documents go to small pending segments; the first search after a
+    change merges them (and drops deleted rows) into three flat arrays:
+    ``offsets`` per term id, ``post_docs`` (int32 row) and ``post_tfs``
+    (int32 term frequency). Only the vocabulary and payloads are Python
+    objects.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._vocab: Dict[str, int] = {}
+        self._ids: List[Optional[str]] = []
+        self._payloads: List[Optional[Dict[str, Any]]] = []
+        self._rows: Dict[str, int] = {}
+        self._lengths = array("i")
+        self._alive = bytearray()
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._post_docs = np.zeros(0, dtype=np.int32)
+        self._post_tfs = np.zeros(0, dtype=np.int32)
+        self._pending: List[Tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+        self._dirty = False
+        self._version: Optional[int] = None
+        self._unsaved = False
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, point_id: str) -> bool:
+        return point_id in self._rows
+
+    def ids(self) -> List[str]:
+        return list(self._rows)
+
+    def add(self, point_id: str, text: str, metadata: Optional[Dict[str, Any]] = None) -> None:
+        with self._lock:
+            if point_id in self._rows:
+                self.delete([point_id])
+            term_ids = np.fromiter(
+                (self._vocab.setdefault(token, len(self._vocab)) for token in tokenize(text)),
+                dtype=np.int32,
+            )
+            terms, tfs = np.unique(term_ids, return_counts=True)
+            row = len(self._ids)
+            self._rows[point_id] = row
+            self._ids.append(point_id)
+            self._payloads.append({"page_content": text, "metadata": metadata or {}})
+            self._lengths.append(len(term_ids))
+            self._alive.append(1)
+            self._pending.append((terms.astype(np.int32), np.full(len(terms), row, dtype=np.int32), tfs.astype(np.int32)))
+            self._dirty = True
+            self._unsaved = True
+
+    def delete(self, point_ids: Iterable[str]) -> None:
+        with self._lock:
+            for point_id in point_ids:
+                row = self._rows.pop(point_id, None)
+                if row is not None:
+                    self._alive[row] = 0
+                    self._ids[row] = None
+                    self._payloads[row] = None
+                    self._dirty = True
+                    self._unsaved = True
+
+    def _compact(self) -> None:
+        if not self._dirty:
+            return
+        vocab_size = len(self._vocab)
+        current_terms = np.repeat(np.arange(len(self._offsets) - 1, dtype=np.int32), np.diff(self._offsets))
+        terms = np.concatenate([current_terms] + [p[0] for p in self._pending])
+        docs = np.concatenate([self._post_docs] + [p[1] for p in self._pending])
+        tfs = np.concatenate([self._post_tfs] + [p[2] for p in self._pending])
+
+        # drop deleted rows and renumber the survivors densely
+        alive = np.frombuffer(bytes(self._alive), dtype=np.uint8).astype(bool)
+        new_rows = np.cumsum(alive, dtype=np.int64) - 1
+        keep = alive[docs]
+        terms, docs, tfs = terms[keep], new_rows[docs[keep]].astype(np.int32), tfs[keep]
+        if not alive.all():
+            survivors = np.flatnonzero(alive)
+            self._ids = [self._ids[row] for row in survivors]
+            self._payloads = [self._payloads[row] for row in survivors]
+            self._lengths = array("i", np.asarray(self._lengths, dtype=np.int32)[survivors].tobytes())
+            self._alive = bytearray(b"\x01" * len(survivors))
+            self._rows = {point_id: row for row, point_id in enumerate(self._ids)}
+
+        order = np.argsort(terms, kind="stable")
+        self._post_docs = docs[order]
+        self._post_tfs = tfs[order]
+        self._offsets = np.concatenate([[0], np.cumsum(np.bincount(terms, minlength=vocab_size))]).astype(np.int64)
+        self._pending = []
+        self._dirty = False
+
+    def search(self, query: str, k: int = 4, filter: Optional[MetadataFilter] = None) -> List[Tuple[str, float, Dict[str, Any]]]:
+        with self._lock:
+            self._compact()
+            n_docs = len(self._ids)
+            if not n_docs:
+                return []
+            lengths = np.frombuffer(self._lengths, dtype=np.int32)
+            avg_length = float(lengths.mean()) or 1.0
+            scores = np.zeros(n_docs, dtype=np.float32)
+            for term in set(tokenize(query)):
+                term_id = self._vocab.get(term)
+                if term_id is None or term_id + 1 >= len(self._offsets):
+                    continue
+                start, end = self._offsets[term_id], self._offsets[term_id + 1]
+                if start == end:
+                    continue
+                docs = self._post_docs[start:end]
+                tfs = self._post_tfs[start:end].astype(np.float32)
+                df = end - start
+                idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                norm = self.k1 * (1 - self.b + self.b * lengths[docs] / avg_length)
+                scores[docs] += idf * tfs * (self.k1 + 1) / (tfs + norm)
+
+            candidates = np.flatnonzero(scores > 0)
+            if filter:
+                candidates = np.array(
+                    [row for row in candidates if matches_filter(self._payloads[row]["metadata"], filter)], dtype=np.int64
+                )
+            if not len(candidates):
+                return []
+            k = min(k, len(candidates))
+            top = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+            top = top[np.argsort(-scores[top], kind="stable")]
+            return [(self._ids[row], float(scores[row]), self._payloads[row]) for row in top]
+
+    def nbytes(self) -> int:
+        """Approximate memory held: posting arrays, document lengths and chunk texts."""
+        with self._lock:
+            arrays = self._offsets.nbytes + self._post_docs.nbytes + self._post_tfs.nbytes
+            arrays += sum(part.nbytes for block in self._pending for part in block)
+            texts = sum(len(payload["page_content"]) for payload in self._payloads if payload is not None)
+            return int(arrays) + len(self._lengths) * self._lengths.itemsize + texts
+
+    def save(self, path: str) -> None:
+        os.makedirs(path, exist_ok=True)
+        with self._lock:
+            self._compact()
+            np.savez(
+                os.path.join(path, "lexical.tmp.npz"),
+                offsets=self._offsets,
+                post_docs=self._post_docs,
+                post_tfs=self._post_tfs,
+                lengths=np.frombuffer(self._lengths, dtype=np.int32),
+            )
+            with open(os.path.join(path, "lexical.tmp.json"), "w", encoding="utf-8") as f:
+                json.dump({"k1": self.k1, "b": self.b, "vocab": list(self._vocab), "ids": self._ids, "payloads": self._payloads}, f)
+            os.replace(os.path.join(path, "lexical.tmp.npz"), os.path.join(path, "lexical.npz"))
+            os.replace(os.path.join(path, "lexical.tmp.json"), os.path.join(path, "lexical.json"))
+            self._version = saved_version(path, "lexical.json")
+            self._unsaved = False
+
+    def _read(self, path: str) -> None:
+        if not os.path.exists(os.path.join(path, "lexical.npz")):
+            return
+        with open(os.path.join(path, "lexical.json"), encoding="utf-8") as f:
+            data = json.load(f)
+        arrays = np.load(os.path.join(path, "lexical.npz"))
+        with self._lock:
+            self.k1, self.b = data["k1"], data["b"]
+            self._vocab = {term: term_id for term_id, term in enumerate(data["vocab"])}
+            self._ids = data["ids"]
+            self._payloads = data["payloads"]
+            self._rows = {point_id: row for row, point_id in enumerate(self._ids)}
+            self._offsets = arrays["offsets"]
+            self._post_docs = arrays["post_docs"]
+            self._post_tfs = arrays["post_tfs"]
+            self._lengths = array("i", arrays["lengths"].tobytes())
+            self._alive = bytearray(b"\x01" * len(self._ids))
+            self._pending = []
+            self._dirty = False
+            self._version = saved_version(path, "lexical.json")
+            self._unsaved = False
+
+    def refresh(self, path: str) -> bool:
+        """Reload from ``path`` if it was saved since this copy was; unsaved changes are kept."""
+        version = saved_version(path, "lexical.json")
+        if self._unsaved or version is None or version == self._version:
+            return False
+        self._read(path)
+        return True
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        index = cls()
+        index._read(path)
+        return index
+
+
+def _doc_key(doc: Document) -> str:
+    return str(doc.metadata.get("_id") or doc.page_content)
+
+
+def reciprocal_rank_fusion(rankings: List[List[Document]], k: int, rrf_k: int = 60) -> List[Document]:
+    scores: Dict[str, float] = {}
+    docs: Dict[str, Document] = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking):
+            key = _doc_key(doc)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank + 1)
+            docs.setdefault(key, doc)
+    ordered = sorted(scores, key=scores.get, reverse=True)[:k]
+    return [docs[key] for key in ordered]
+
+
+_SEARCH_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="hybrid-search")
+
+
+class HybridRetriever(BaseRetriever):
+    """Runs dense and BM25 retrieval concurrently and fuses them with RRF."""
+
+    vector_retriever: BaseRetriever
+    lexical_index: Any
+    k: int = 4
+    candidates: int = 20
+    rrf_k: int = 60
+
+    def _lexical_documents(self, query: str, sources: Optional[List[str]] = None) -> List[Document]:
+        with span("bm25.search", "vectorstore", filtered=bool(sources)) as current:
+            docs = [
+                Document(page_content=payload["page_content"], metadata={**payload["metadata"], "_id": point_id})
+                for point_id, _, payload in self.lexical_index.search(
+                    query, k=self.candidates, filter={"source": list(sources)} if sources else None
+                )
+            ]
+            current.set(documents=len(docs))
+        return docs
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun, sources: Optional[List[str]] = None) -> List[Document]:
+        # the copied context keeps the BM25 span under the calling node's span
+        lexical = _SEARCH_POOL.submit(contextvars.copy_context().run, self._lexical_documents, query, sources)
+        dense_kwargs = {"sources": sources} if sources else {}
+        dense = self.vector_retriever.invoke(query, config={"callbacks": run_manager.get_child()}, **dense_kwargs)
+        return reciprocal_rank_fusion([dense, lexical.result()], k=self.k, rrf_k=self.rrf_k)
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun, sources: Optional[List[str]] = None) -> List[Document]:
+        dense_kwargs = {"sources": sources} if sources else {}
+        dense, lexical = await asyncio.gather(
+            self.vector_retriever.ainvoke(query, config={"callbacks": run_manager.get_child()}, **dense_kwargs),
+            asyncio.get_running_loop().run_in_executor(_SEARCH_POOL, contextvars.copy_context().run, self._lexical_documents, query, sources),
+        )
+        return reciprocal_rank_fusion([dense, lexical], k=self.k, rrf_k=self.rrf_k)
@@ -0,0 +1,40 @@
+import os
+import functools
+from typing import TYPE_CHECKING
+import httpx
+from langchain_core.prompts import ChatPromptTemplate
+from config import SECRETS, LLM_MODEL, PROMPTS_DIR
+from tracing import LLMTracingHandler
+from startup import LazyImports, timed
+
+_lazy = LazyImports(globals(), ChatGroq="langchain_groq:ChatGroq")
+__getattr__ = _lazy
+if TYPE_CHECKING:
+    from langchain_groq import ChatGroq
+
+
+@functools.lru_cache(maxsize=None)
+def _http_client() -> httpx.Client:
+    # shared by every Groq client so keep-alive connections are reused across models
+    return httpx.Client(limits=httpx.Limits(max_connections=32, max_keepalive_connections=16), timeout=60.0)
+
+
+@functools.lru_cache(maxsize=16)
+def get_chat_model(temperature: float = 0.0, model_name: str = LLM_MODEL) -> "ChatGroq":
+    """One client per (model, temperature) for the life of the process."""
+    ChatGroq = _lazy.get("ChatGroq")
+    with timed(f"chat model {model_name}"):
+        return ChatGroq(
+            temperature=temperature,
+            model_name=model_name,
+            groq_api_key=SECRETS["GROQ_API_KEY"],
+            http_client=_http_client(),
+            callbacks=[LLMTracingHandler()],
+        )
+
+
+@functools.lru_cache(maxsize=None)
+def get_prompt(name: str, prompts_dir: str = PROMPTS_DIR) -> ChatPromptTemplate:
+    """Prompt templates ship with the package as ``<name>.txt`` and are read once."""
+    with open(os.path.join(prompts_dir, f"{name}.txt"), encoding="utf-8") as f:
+        return ChatPromptTemplate.from_messages([("human", f.read())])
@@ -0,0 +1,227 @@
+import os
+import json
+import threading
+from typing import List, Any, Dict, Optional, Iterable, Tuple, Callable
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+
+MetadataFilter = Dict[str, Any]
+
+
+def saved_version(path: str, filename: str) -> Optional[int]:
+    # the file written last by ``save``; its mtime identifies one saved state
+    try:
+        return os.stat(os.path.join(path, filename)).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def matches_filter(metadata: Dict[str, Any], filter: Optional[MetadataFilter]) -> bool:
+    if not filter:
+        return True
+    for key, expected in filter.items():
+        value = metadata.get(key)
+        if isinstance(expected, (list, tuple, set)):
+            if value not in expected:
+                return False
+        elif value != expected:
+            return False
+    return True
+
+
+class NumpyVectorStore(VectorStore):
+    """In-process vector index over a contiguous float32 matrix.
+
+    Rows are L2-normalised on insert so cosine similarity is a single
+    matrix-vector product; top-k uses ``argpartition``. ``save``/``load``
+    persist the matrix as ``vectors.npy`` (loaded memory-mapped) next to a
+    JSON file of point IDs and payloads. ``refresh`` re-reads the saved
+    index when another process has replaced it.
+    """
+
+    def __init__(self, embeddings: Embeddings, dim: Optional[int] = None):
+        self._embeddings = embeddings
+        self._matrix = np.zeros((0, dim or 0), dtype=np.float32)
+        self._size = 0
+        self._ids: List[str] = []
+        self._payloads: List[Dict[str, Any]] = []
+        self._rows: Dict[str, int] = {}
+        self._version: Optional[int] = None
+        self._unsaved = False
+        self._lock = threading.RLock()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embeddings
+
+    def __len__(self) -> int:
+        return self._size
+
+    def ids(self) -> List[str]:
+        return list(self._ids)
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._matrix[:self._size]
+
+    def nbytes(self) -> int:
+        """Approximate memory held: the vector matrix plus chunk texts."""
+        with self._lock:
+            return int(self._matrix.nbytes) + sum(len(payload["page_content"]) for payload in self._payloads)
+
+    def _reserve(self, rows: int, dim: int) -> None:
+        if self._matrix.shape[1] != dim:
+            if self._size:
+                raise ValueError(f"Vector dimension {dim} does not match index dimension {self._matrix.shape[1]}")
+            self._matrix = np.zeros((0, dim), dtype=np.float32)
+        needed = self._size + rows
+        if needed > self._matrix.shape[0] or not self._matrix.flags.writeable:
+            capacity = max(needed, 2 * self._matrix.shape[0], 64)
+            grown = np.zeros((capacity, dim), dtype=np.float32)
+            grown[:self._size] = self._matrix[:self._size]
+            self._matrix = grown
+
+    def add_vectors(self, vectors: Iterable[List[float]], texts: Iterable[str], metadatas: Optional[Iterable[Dict[str, Any]]] = None, ids: Optional[Iterable[str]] = None) -> List[str]:
+        block = np.asarray(list(vectors), dtype=np.float32)
+        if block.ndim != 2 or not len(block):
+            return []
+        texts = list(texts)
+        metadatas = list(metadatas) if metadatas is not None else [{} for _ in texts]
+        ids = [str(i) for i in ids] if ids is not None else [str(self._size + n) for n in range(len(texts))]
+        norms = np.linalg.norm(block, axis=1, keepdims=True)
+        block /= np.where(norms == 0, 1, norms)
+
+        with self._lock:
+            self._reserve(len(block), block.shape[1])
+            for vector, text, metadata, point_id in zip(block, texts, metadatas, ids):
+                payload = {"page_content": text, "metadata": metadata or {}}
+                row = self._rows.get(point_id)
+                if row is None:
+                    row = self._size
+                    self._rows[point_id] = row
+                    self._ids.append(point_id)
+                    self._payloads.append(payload)
+                    self._size += 1
+                else:
+                    self._payloads[row] = payload
+                self._matrix[row] = vector
+            self._unsaved = True
+        return ids
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None, ids: Optional[List[str]] = None, **kwargs: Any) -> List[str]:
+        texts = list(texts)
+        return self.add_vectors(self.embeddings.embed_documents(texts), texts, metadatas, ids)
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        if not ids:
+            return True
+        with self._lock:
+            self._reserve(0, self._matrix.shape[1])
+            for point_id in ids:
+                row = self._rows.pop(str(point_id), None)
+                if row is None:
+                    continue
+                # swap-remove keeps the matrix contiguous
+                last = self._size - 1
+                if row != last:
+                    self._matrix[row] = self._matrix[last]
+                    self._ids[row] = self._ids[last]
+                    self._payloads[row] = self._payloads[last]
+                    self._rows[self._ids[row]] = row
+                self._ids.pop()
+                self._payloads.pop()
+                self._size -= 1
+                self._unsaved = True
+        return True
+
+    def _top_k(self, query_vector: List[float], k: int, filter: Optional[MetadataFilter] = None, score_threshold: Optional[float] = None) -> List[Tuple[int, float]]:
+        with self._lock:
+            if not self._size:
+                return []
+            query = np.asarray(query_vector, dtype=np.float32)
+            norm = np.linalg.norm(query)
+            scores = self.vectors @ (query / norm if norm else query)
+            if filter:
+                mask = np.fromiter((matches_filter(p["metadata"], filter) for p in self._payloads), dtype=bool, count=self._size)
+                scores = np.where(mask, scores, -np.inf)
+            k = min(k, self._size)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [
+                (int(row), float(scores[row]))
+                for row in top
+                if np.isfinite(scores[row]) and (score_threshold is None or scores[row] >= score_threshold)
+            ]
+
+    def similarity_search_with_score_by_vector(self, embedding: List[float], k: int = 4, filter: Optional[MetadataFilter] = None, score_threshold: Optional[float] = None, **kwargs: Any) -> List[Tuple[Document, float]]:
+        results = []
+        for row, score in self._top_k(embedding, k, filter, score_threshold):
+            payload = self._payloads[row]
+            metadata = {**payload["metadata"], "_id": self._ids[row]}
+            results.append((Document(page_content=payload["page_content"], metadata=metadata), score))
+        return results
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k, **kwargs)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(self.embeddings.embed_query(query), k, **kwargs)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, **kwargs)]
+
+    def _select_relevance_score_fn(self) -> Callable[[float], float]:
+        # scores are already cosine similarities, as with the Qdrant backend
+        return lambda score: score
+
+    def save(self, path: str) -> None:
+        os.makedirs(path, exist_ok=True)
+        with self._lock:
+            vectors_tmp = os.path.join(path, "vectors.tmp.npy")
+            payloads_tmp = os.path.join(path, "payloads.tmp.json")
+            np.save(vectors_tmp, np.ascontiguousarray(self.vectors))
+            with open(payloads_tmp, "w", encoding="utf-8") as f:
+                json.dump({"ids": self._ids, "payloads": self._payloads}, f)
+            os.replace(vectors_tmp, os.path.join(path, "vectors.npy"))
+            os.replace(payloads_tmp, os.path.join(path, "payloads.json"))
+            self._version = saved_version(path, "payloads.json")
+            self._unsaved = False
+
+    def _read(self, path: str, mmap: bool = True) -> None:
+        vectors_path = os.path.join(path, "vectors.npy")
+        if not os.path.exists(vectors_path):
+            return
+        with open(os.path.join(path, "payloads.json"), encoding="utf-8") as f:
+            data = json.load(f)
+        with self._lock:
+            # a read-only mmap is copied into memory on the first write (see _reserve)
+            self._matrix = np.load(vectors_path, mmap_mode="r" if mmap else None)
+            self._size = self._matrix.shape[0]
+            self._ids = data["ids"]
+            self._payloads = data["payloads"]
+            self._rows = {point_id: row for row, point_id in enumerate(self._ids)}
+            self._version = saved_version(path, "payloads.json")
+            self._unsaved = False
+
+    def refresh(self, path: str) -> bool:
+        """Reload from ``path`` if it was saved since this copy was; unsaved changes are kept."""
+        version = saved_version(path, "payloads.json")
+        if self._unsaved or version is None or version == self._version:
+            return False
+        self._read(path)
+        return True
+
+    @classmethod
+    def load(cls, path: str, embeddings: Embeddings, mmap: bool = True) -> "NumpyVectorStore":
+        store = cls(embeddings)
+        store._read(path, mmap=mmap)
+        return store
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None, ids: Optional[List[str]] = None, **kwargs: Any) -> "NumpyVectorStore":
+        store = cls(embedding)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
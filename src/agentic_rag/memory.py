@@ -0,0 +1,60 @@
+from collections import deque
+from typing import List, Optional
+from langchain_core.messages import BaseMessage
+from config import CONVERSATION_WINDOW, CONVERSATION_SUMMARY_TOKENS
+from tokenizer import Tokenizer, get_tokenizer
+
+
+class ConversationMemory:
+    """Bounded view of a chat session for the agent graph.
+
+    The last ``window`` messages are kept verbatim. Older messages are
+    folded, one at a time as they leave the window, into a rolling summary
+    of one compact line each; the oldest lines are dropped once the summary
+    exceeds ``summary_tokens``. Nothing here grows with the session length.
+    """
+
+    def __init__(self, window: int = CONVERSATION_WINDOW, summary_tokens: int = CONVERSATION_SUMMARY_TOKENS, line_tokens: int = 40, tokenizer: Optional[Tokenizer] = None):
+        self.window = window
+        self.summary_tokens = summary_tokens
+        self.line_tokens = line_tokens
+        self.tokenizer = tokenizer or get_tokenizer()
+        self.total_messages = 0
+        self._recent: deque = deque()
+        self._summary: deque = deque()
+        self._summary_used = 0
+
+    def add(self, message: BaseMessage) -> None:
+        self.total_messages += 1
+        self._recent.append(message)
+        while len(self._recent) > self.window:
+            self._fold(self._recent.popleft())
+
+    def _fold(self, message: BaseMessage) -> None:
+        content = " ".join(str(message.content).split())
+        line = f"{message.type}: {self.tokenizer.truncate(content, self.line_tokens)}"
+        cost = self.tokenizer.count(line)
+        self._summary.append((line, cost))
+        self._summary_used += cost
+        while self._summary_used > self.summary_tokens and self._summary:
+            _, dropped = self._summary.popleft()
+            self._summary_used -= dropped
+
+    def messages(self) -> List[BaseMessage]:
+        return list(self._recent)
+
+    @property
+    def summary(self) -> str:
+        return "\n".join(line for line, _ in self._summary)
+
+    def clear(self) -> None:
+        self.total_messages = 0
+        self._recent.clear()
+        self._summary.clear()
+        self._summary_used = 0
+
+
+def format_history(messages: List[BaseMessage], summary: str = "") -> str:
+    lines = [f"Earlier in the conversation:\n{summary}"] if summary else []
+    lines.extend(f"{m.type}: {m.content}" for m in messages)
+    return "\n".join(lines)
@@ -0,0 +1,72 @@
+import io
+import os
+import hashlib
+from typing import List, Optional, Tuple
+from langchain_core.documents import Document
+
+# Kept free of Streamlit and vector-store imports: worker processes only
+# import this module.
+
+SUPPORTED_EXTENSIONS = (".txt", ".pdf", ".docx")
+
+
+class UnsupportedFileType(ValueError):
+    pass
+
+
+class UploadedBytes:
+    """The slice of Streamlit's ``UploadedFile`` that ingestion uses."""
+
+    def __init__(self, name: str, data: bytes):
+        self.name = name
+        self._data = data
+
+    def getvalue(self) -> bytes:
+        return self._data
+
+
+def file_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_extension(name: str) -> str:
+    return os.path.splitext(name)[1].lower()
+
+
+def pdf_page_count(data: bytes) -> int:
+    from pypdf import PdfReader
+    return len(PdfReader(io.BytesIO(data)).pages)
+
+
+def parse_bytes(name: str, data: bytes, page_range: Optional[Tuple[int, int]] = None, digest: Optional[str] = None) -> List[Document]:
+    """Parse an uploaded file from memory; ``page_range`` is a half-open PDF page span."""
+    digest = digest or file_digest(data)
+    ext = file_extension(name)
+    if ext == ".txt":
+        return [Document(page_content=data.decode("utf-8"), metadata={"source": name, "file_digest": digest})]
+    if ext == ".docx":
+        import docx2txt
+        text = docx2txt.process(io.BytesIO(data))
+        return [Document(page_content=text, metadata={"source": name, "file_digest": digest})]
+    if ext == ".pdf":
+        from pypdf import PdfReader
+        reader = PdfReader(io.BytesIO(data))
+        total_pages = len(reader.pages)
+        start, end = page_range or (0, total_pages)
+        return [
+            Document(
+                page_content=reader.pages[page].extract_text() or "",
+                metadata={"source": name, "file_digest": digest, "page": page, "total_pages": total_pages},
+            )
+            for page in range(start, min(end, total_pages))
+        ]
+    raise UnsupportedFileType(f"Unsupported file type: {name}")
+
+
+def parse_task(name: str, data: bytes, page_range: Optional[Tuple[int, int]], digest: str) -> Tuple[List[Document], Optional[str]]:
+    # Process-pool entry point: errors come back as strings so one bad file
+    # does not abort the whole map.
+    try:
+        return parse_bytes(name, data, page_range, digest), None
+    except Exception as e:
+        return [], f"{type(e).__name__}: {e}"
@@ -0,0 +1,153 @@
+import re
+import threading
+from typing import List, Any, Dict, Optional, Tuple
+import numpy as np
+from gazetteer import Gazetteer, get_city_gazetteer
+from config import ROUTER_CONFIDENCE
+
+
+ROUTES = ("retrieve", "weather_search")
+DEFAULT_ROUTE = "retrieve"
+
+WEATHER_TERMS = {
+    "weather", "forecast", "temperature", "temperatures", "rain", "raining", "rainy", "rainfall",
+    "snow", "snowing", "sunny", "cloudy", "humidity", "humid", "windy", "storm", "stormy",
+    "climate", "celsius", "fahrenheit", "drizzle", "thunderstorm", "foggy", "umbrella", "monsoon",
+}
+DOCUMENT_TERMS = {
+    "resume", "cv", "document", "documents", "file", "pdf", "uploaded", "experience", "skills",
+    "skill", "project", "projects", "education", "degree", "internship", "certification",
+    "according", "summarize", "summary", "candidate", "knowledge",
+}
+
+LABELLED_EXAMPLES: Dict[str, List[str]] = {
+    "weather_search": [
+        "What's the weather like in Delhi today?",
+        "Will it rain in Mumbai tomorrow?",
+        "How hot is it in Dubai right now?",
+        "Current temperature in London",
+        "Is it snowing in Shimla?",
+        "Do I need an umbrella in Bangalore?",
+        "How humid is Chennai this afternoon?",
+        "Give me the forecast for Tokyo",
+        "Is it cold outside in Toronto?",
+        "What are the wind conditions in Chicago?",
+    ],
+    "retrieve": [
+        "What skills are listed in the resume?",
+        "Summarize the uploaded document",
+        "Which projects has the candidate worked on?",
+        "What is Riyanshu's educational background?",
+        "List the programming languages mentioned",
+        "What experience does the candidate have with LangChain?",
+        "Where did he do his internship?",
+        "What certifications are mentioned in the file?",
+        "Explain the main idea of the report",
+        "Who is the author and what do they work on?",
+    ],
+}
+
+_WORD_RE = re.compile(r"[a-z]+")
+
+
+def normalize_route(decision: Optional[str]) -> str:
+    """Map free-form router output onto ROUTES, defaulting to retrieval."""
+    text = (decision or "").strip().strip("\"'`.").lower().replace("-", "_").replace(" ", "_")
+    if text in ROUTES:
+        return text
+    if "weather" in text:
+        return "weather_search"
+    return DEFAULT_ROUTE
+
+
+class FastRouter:
+    """Local keyword/gazetteer rules plus an embedding nearest-centroid model.
+
+    ``classify`` returns ``(route, confidence, tier)``; callers fall back to
+    the LLM when confidence is below their threshold.
+    """
+
+    def __init__(self, embeddings: Any = None, gazetteer: Optional[Gazetteer] = None, examples: Optional[Dict[str, List[str]]] = None, margin_scale: float = 10.0):
+        self.embeddings = embeddings
+        self.gazetteer = gazetteer if gazetteer is not None else get_city_gazetteer()
+        self.examples = examples or LABELLED_EXAMPLES
+        self.margin_scale = margin_scale
+        self._centroids: Optional[np.ndarray] = None
+        self._centroid_routes: List[str] = []
+        self._lock = threading.Lock()
+        self.counts: Dict[str, int] = {"rules": 0, "centroid": 0, "llm": 0}
+
+    def classify_rules(self, query: str) -> Tuple[Optional[str], float]:
+        words = set(_WORD_RE.findall(query.lower()))
+        weather_hits = len(words & WEATHER_TERMS)
+        document_hits = len(words & DOCUMENT_TERMS)
+        if weather_hits and not document_hits:
+            # without a city there is nothing to look up: "the climate section" may be about a document
+            confidence = 0.97 if self.gazetteer.find(query) else 0.6
+            return "weather_search", confidence
+        if document_hits and not weather_hits:
+            return "retrieve", 0.9
+        return None, 0.0
+
+    def _ensure_centroids(self) -> bool:
+        if self._centroids is not None:
+            return True
+        if self.embeddings is None:
+            return False
+        with self._lock:
+            if self._centroids is None:
+                routes, centroids = [], []
+                for route, texts in self.examples.items():
+                    vectors = np.asarray(self.embeddings.embed_documents(texts), dtype=np.float32)
+                    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+                    centroid = vectors.mean(axis=0)
+                    centroids.append(centroid / np.linalg.norm(centroid))
+                    routes.append(route)
+                self._centroid_routes = routes
+                self._centroids = np.vstack(centroids)
+        return True
+
+    def classify_centroid(self, query: str, query_embedding: Optional[List[float]] = None) -> Tuple[Optional[str], float]:
+        try:
+            if not self._ensure_centroids():
+                return None, 0.0
+            if query_embedding is None:
+                query_embedding = self.embeddings.embed_query(query)
+        except Exception:
+            return None, 0.0
+        vector = np.asarray(query_embedding, dtype=np.float32)
+        scores = self._centroids @ (vector / (np.linalg.norm(vector) or 1.0))
+        order = np.argsort(-scores)
+        margin = float(scores[order[0]] - scores[order[1]]) if len(order) > 1 else 1.0
+        # squash the margin between the two centroids into a 0.5..1 confidence
+        confidence = 0.5 + 0.5 * float(np.tanh(self.margin_scale * margin))
+        return self._centroid_routes[order[0]], confidence
+
+    def classify(self, query: str, query_embedding: Optional[List[float]] = None, threshold: float = ROUTER_CONFIDENCE) -> Tuple[str, float, str]:
+        route, confidence = self.classify_rules(query)
+        if route is not None and confidence >= threshold:
+            return route, confidence, "rules"
+        centroid_route, centroid_confidence = self.classify_centroid(query, query_embedding)
+        if centroid_route is not None and centroid_confidence >= threshold:
+            return centroid_route, centroid_confidence, "centroid"
+        return route or centroid_route or DEFAULT_ROUTE, max(confidence, centroid_confidence), "llm"
+
+    def record(self, tier: str) -> None:
+        with self._lock:
+            self.counts[tier] = self.counts.get(tier, 0) + 1
+
+    def stats(self) -> Dict[str, float]:
+        total = sum(self.counts.values())
+        fast = total - self.counts.get("llm", 0)
+        return {**self.counts, "total": total, "fast_path_rate": fast / total if total else 0.0}
+
+
+_SHARED_ROUTER: Optional[FastRouter] = None
+
+
+def get_fast_router(embeddings: Any = None) -> FastRouter:
+    # one router per process so the example centroids are only embedded once
+    global _SHARED_ROUTER
+    if _SHARED_ROUTER is None:
+        _SHARED_ROUTER = FastRouter(embeddings)
+    return _SHARED_ROUTER
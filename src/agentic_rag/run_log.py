@@ -0,0 +1,28 @@
+import logging
+import contextlib
+import contextvars
+from typing import Callable, Iterator, List, Optional, Union
+
+logger = logging.getLogger("agentic_rag")
+
+# Per-run destination for workflow log lines. Context variables follow the
+# graph into its executor threads and asyncio tasks, so concurrent queries in
+# one process each collect their own lines.
+_SINK: contextvars.ContextVar[Optional[Callable[[str], None]]] = contextvars.ContextVar("agentic_rag_log_sink", default=None)
+
+
+def log(message: str) -> None:
+    logger.info(message)
+    sink = _SINK.get()
+    if sink is not None:
+        sink(message)
+
+
+@contextlib.contextmanager
+def log_to(sink: Union[List[str], Callable[[str], None]]) -> Iterator[None]:
+    """Send ``log`` lines from this context to ``sink`` (a list or a callable)."""
+    token = _SINK.set(sink.append if isinstance(sink, list) else sink)
+    try:
+        yield
+    finally:
+        _SINK.reset(token)
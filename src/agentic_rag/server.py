@@ -0,0 +1,213 @@
+"""Headless ASGI entry point for the agent graph.
+
+Run several workers behind a load balancer, e.g.
+
+    uvicorn server:app --workers 4 --port 8000
+
+Each worker builds its own graph on first use, attached to the shared vector
+index as it is: only ``/ingest`` syncs the index to new documents. Workers
+share one index (Qdrant by design, the local backend through a file lock and
+reload-on-change, see ``vectorstore.refresh_local_indexes``) and one knowledge
+version, a file next to the index under ``LOCAL_INDEX_DIR``. A worker that sees
+a newer version than its graph was built for rebuilds the graph before
+answering, so answers cached for older documents are never served. Workers on
+different hosts need ``LOCAL_INDEX_DIR`` on shared storage.
+"""
+import json
+import base64
+import asyncio
+from typing import Any, Dict, List, Mapping, Optional
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+from langchain_core.messages import HumanMessage, AIMessage, BaseMessage
+import config
+from config import AgentState, LOCAL_INDEX_DIR
+from app import initialize_system, astream_graph, _StreamCollector
+from parsers import UploadedBytes
+from vectorstore import calculate_knowledge_hash, refresh_local_indexes, read_knowledge_version, write_knowledge_version
+from run_log import log, log_to
+from tracing import TRACER, span
+
+
+def _history(messages: List[Mapping[str, str]]) -> List[BaseMessage]:
+    return [
+        AIMessage(content=m["content"]) if m.get("role") in ("ai", "assistant") else HumanMessage(content=m["content"])
+        for m in messages
+    ]
+
+
+def _agent_state(body: Dict[str, Any]) -> AgentState:
+    query = body["query"]
+    return AgentState(
+        messages=[HumanMessage(content=query)],
+        chat_history=_history(body.get("chat_history") or []),
+        conversation_summary=body.get("conversation_summary") or "",
+        current_query=query,
+        source_filter=body.get("source_filter") or [],
+    )
+
+
+class AgentService:
+    """One worker's graph over the shared index, rebuilt when the shared knowledge version changes."""
+
+    def __init__(self, initialize_system_fn=initialize_system, collection_name: str = "agentic_collection", index_dir: str = LOCAL_INDEX_DIR, **system_kwargs: Any):
+        self.initialize_system_fn = initialize_system_fn
+        self.collection_name = collection_name
+        self.index_dir = index_dir
+        self.system_kwargs = system_kwargs
+        self.graph = None
+        self.knowledge_hash = ""
+        self._lock = asyncio.Lock()
+
+    def knowledge_version(self) -> Dict[str, Any]:
+        return read_knowledge_version(self.collection_name, self.index_dir)
+
+    async def _build(self, uploaded_files: List[Any], knowledge_hash: str, errors: List[str], sync: bool) -> None:
+        # building is blocking (parsing, embedding, index reads and writes)
+        self.graph = (await asyncio.to_thread(
+            self.initialize_system_fn,
+            uploaded_files=uploaded_files,
+            knowledge_hash=knowledge_hash,
+            on_error=errors.append,
+            sync=sync,
+            **self.system_kwargs,
+        ))[0]
+        self.knowledge_hash = knowledge_hash
+
+    async def get_graph(self):
+        # the version is re-read per query: another worker may have ingested since
+        knowledge_hash = (await asyncio.to_thread(self.knowledge_version))["knowledge_hash"]
+        if self.graph is None or knowledge_hash != self.knowledge_hash:
+            async with self._lock:
+                if self.graph is None or knowledge_hash != self.knowledge_hash:
+                    errors: List[str] = []
+                    await self._build([], knowledge_hash, errors, sync=False)
+                    for error in errors:
+                        log(error)
+        else:
+            await asyncio.to_thread(refresh_local_indexes)
+        return self.graph
+
+    async def ingest(self, uploaded_files: List[Any]) -> Dict[str, Any]:
+        errors: List[str] = []
+        knowledge_hash = calculate_knowledge_hash(uploaded_files)
+        async with self._lock:
+            await self._build(uploaded_files, knowledge_hash, errors, sync=True)
+            await asyncio.to_thread(
+                write_knowledge_version, knowledge_hash, [f.name for f in uploaded_files], self.collection_name, self.index_dir
+            )
+        return {"knowledge_hash": knowledge_hash, "files": [f.name for f in uploaded_files], "errors": errors}
+
+
+async def _json_body(request: Request) -> Dict[str, Any]:
+    try:
+        body = await request.json()
+    except ValueError:
+        body = None
+    if not isinstance(body, dict) or not body.get("query"):
+        raise ValueError("expected a JSON object with a non-empty 'query'")
+    return body
+
+
+def create_app(secrets: Optional[Mapping[str, str]] = None, initialize_system_fn=initialize_system, **system_kwargs: Any) -> Starlette:
+    """Build the ASGI app. ``secrets`` override the environment before anything is built."""
+    if secrets:
+        config.configure(secrets)
+    service = AgentService(initialize_system_fn, **system_kwargs)
+
+    async def health(request: Request) -> JSONResponse:
+        # the version every worker serves, not just what this one last built
+        version = await asyncio.to_thread(service.knowledge_version)
+        return JSONResponse({"status": "ok", "ready": service.graph is not None, "knowledge_hash": version["knowledge_hash"], "files": version["files"]})
+
+    async def query(request: Request) -> JSONResponse:
+        try:
+            body = await _json_body(request)
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        graph = await service.get_graph()
+        logs = [f"New query: {body['query']}"]
+        with log_to(logs):
+            updates, metrics = await astream_graph(graph, _agent_state(body))
+        return JSONResponse({
+            "answer": updates.get("generated_answer"),
+            "route": updates.get("next_step"),
+            "cache_hit": updates.get("cache_hit", False),
+            "logs": logs,
+            "metrics": metrics,
+            "spans": [s.to_dict() for s in TRACER.spans(metrics["trace_id"])],
+        })
+
+    async def query_stream(request: Request):
+        try:
+            body = await _json_body(request)
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        graph = await service.get_graph()
+
+        async def events():
+            # one JSON object per line: node completions, answer tokens, then a summary
+            logs: List[str] = []
+            collector = _StreamCollector()
+            with log_to(logs), span("query", "graph") as root:
+                collector.trace_id = root.trace_id
+                async for mode, payload in graph.astream(_agent_state(body), stream_mode=["updates", "messages"]):
+                    collector.add(mode, payload)
+                    if mode == "messages":
+                        chunk, metadata = payload
+                        if metadata.get("langgraph_node") in collector.token_nodes and chunk.content:
+                            yield json.dumps({"event": "token", "text": chunk.content}) + "\n"
+                    else:
+                        for node in payload:
+                            yield json.dumps({"event": "node", "node": node}) + "\n"
+            updates, metrics = collector.result()
+            yield json.dumps({
+                "event": "done",
+                "answer": updates.get("generated_answer"),
+                "route": updates.get("next_step"),
+                "logs": logs,
+                "metrics": metrics,
+            }) + "\n"
+
+        return StreamingResponse(events(), media_type="application/x-ndjson")
+
+    async def ingest(request: Request) -> JSONResponse:
+        if request.headers.get("content-type", "").startswith("multipart/form-data"):
+            form = await request.form()
+            uploaded_files = [
+                UploadedBytes(upload.filename, await upload.read())
+                for upload in form.getlist("files")
+                if hasattr(upload, "filename")
+            ]
+        else:
+            # {"files": [{"name": ..., "content_base64": ...}]}
+            try:
+                body = await request.json()
+                uploaded_files = [UploadedBytes(f["name"], base64.b64decode(f["content_base64"])) for f in body["files"]]
+            except (ValueError, KeyError, TypeError):
+                return JSONResponse({"error": "expected multipart 'files' or JSON {'files': [{'name', 'content_base64'}]}"}, status_code=400)
+        return JSONResponse(await service.ingest(uploaded_files))
+
+    async def metrics(request: Request) -> PlainTextResponse:
+        # per-worker histograms; Prometheus scrapes each worker, or use TRACE_EXPORT_PATH for offline analysis
+        return PlainTextResponse(TRACER.prometheus(), media_type="text/plain; version=0.0.4")
+
+    app = Starlette(routes=[
+        Route("/health", health, methods=["GET"]),
+        Route("/query", query, methods=["POST"]),
+        Route("/query/stream", query_stream, methods=["POST"]),
+        Route("/ingest", ingest, methods=["POST"]),
+        Route("/metrics", metrics, methods=["GET"]),
+    ])
+    app.state.service = service
+    return app
+
+
+def __getattr__(name: str) -> Any:
+    # ``uvicorn server:app`` builds the app on first access, not at import
+    if name == "app":
+        globals()["app"] = create_app()
+        return globals()["app"]
+    raise AttributeError(name)
@@ -0,0 +1,124 @@
+import time
+import asyncio
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="speculation")
+
+
+class SpeculationStats:
+    """Process-wide counters for branches started before the router decided."""
+
+    def __init__(self):
+        self.launched = 0
+        self.used = 0
+        self.cancelled = 0
+        self.wasted = 0
+        self.wasted_ms = 0.0
+        self.saved_ms = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, **counts: float) -> None:
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "launched": self.launched,
+            "used": self.used,
+            "cancelled": self.cancelled,
+            "wasted": self.wasted,
+            "wasted_ms": self.wasted_ms,
+            "saved_ms": self.saved_ms,
+            "hit_rate": self.used / self.launched if self.launched else 0.0,
+        }
+
+
+SPECULATION_STATS = SpeculationStats()
+
+
+class Speculation:
+    """Branches started alongside the router.
+
+    ``start`` runs a callable on a worker thread and ``start_task`` schedules a
+    coroutine on the running loop. Once the route is known, ``result`` /
+    ``aresult`` hand back the winning branch and every other branch is
+    cancelled, or left to finish with its result dropped and its run time
+    counted as wasted.
+    """
+
+    def __init__(self, stats: SpeculationStats = SPECULATION_STATS):
+        self.stats = stats
+        self.started = time.perf_counter()
+        self._branches: Dict[str, Any] = {}
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._branches
+
+    @staticmethod
+    def _timed(fn: Callable, *args: Any) -> Tuple[Any, float]:
+        return fn(*args), time.perf_counter()
+
+    @staticmethod
+    async def _atimed(coro: Any) -> Tuple[Any, float]:
+        return await coro, time.perf_counter()
+
+    def start(self, name: str, fn: Callable, *args: Any) -> None:
+        # run in the caller's context so per-query logging follows the branch
+        context = contextvars.copy_context()
+        self._branches[name] = (_POOL.submit(context.run, self._timed, fn, *args), time.perf_counter())
+        self.stats.add(launched=1)
+
+    def start_task(self, name: str, coro: Any) -> None:
+        self._branches[name] = (asyncio.ensure_future(self._atimed(coro)), time.perf_counter())
+        self.stats.add(launched=1)
+
+    def discard(self, winner: Optional[str] = None) -> None:
+        """Cancel or drop every branch except ``winner``."""
+        for name, (future, started) in self._branches.items():
+            if name == winner:
+                continue
+            if future.done():
+                if not future.cancelled():
+                    future.exception()  # mark any failure as seen
+                self.stats.add(wasted=1, wasted_ms=(time.perf_counter() - started) * 1000)
+            elif isinstance(future, asyncio.Future):
+                # a cancelled task stops at its next await
+                future.cancel()
+                self.stats.add(cancelled=1, wasted_ms=(time.perf_counter() - started) * 1000)
+            elif future.cancel():
+                self.stats.add(cancelled=1)
+            else:
+                # already running on a worker thread: let it finish, drop the result
+                self.stats.add(wasted=1)
+                future.add_done_callback(
+                    lambda _, started=started: self.stats.add(wasted_ms=(time.perf_counter() - started) * 1000)
+                )
+
+    def _use(self, winner: str, decided_at: float, timed: Tuple[Any, float]) -> Any:
+        result, finished_at = timed
+        started = self._branches[winner][1]
+        # the overlap with the router is latency taken off the critical path
+        self.stats.add(used=1, saved_ms=max(0.0, min(decided_at, finished_at) - started) * 1000)
+        return result
+
+    def result(self, winner: Optional[str]) -> Any:
+        """Result of the winning branch, or None if it was not speculated."""
+        decided_at = time.perf_counter()
+        self.discard(winner)
+        if winner not in self._branches:
+            return None
+        return self._use(winner, decided_at, self._branches[winner][0].result())
+
+    async def aresult(self, winner: Optional[str]) -> Any:
+        decided_at = time.perf_counter()
+        self.discard(winner)
+        if winner not in self._branches:
+            return None
+        future = self._branches[winner][0]
+        timed = await (future if isinstance(future, asyncio.Future) else asyncio.wrap_future(future))
+        return self._use(winner, decided_at, timed)
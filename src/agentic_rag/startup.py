@@ -0,0 +1,162 @@
+"""Lazy imports and startup profiling.
+
+Heavy client libraries (Qdrant, Google GenAI, Groq, Streamlit) are imported
+on first use through ``LazyImports`` / ``LazyModule``. With
+``STARTUP_PROFILE=1`` every lazy import and every component timed with
+``timed`` is reported on stderr when the process exits. For import time per
+module, run
+
+    python startup.py app server evaluate
+"""
+import os
+import sys
+import time
+import atexit
+import importlib
+import threading
+import contextlib
+import subprocess
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+PROFILE = os.getenv("STARTUP_PROFILE", "").lower() in ("1", "true", "yes")
+_STARTED = time.perf_counter()
+_TIMINGS: List[Tuple[str, str, float, float]] = []
+_LOCK = threading.Lock()
+
+
+def record(kind: str, name: str, seconds: float) -> None:
+    with _LOCK:
+        _TIMINGS.append((kind, name, time.perf_counter() - _STARTED - seconds, seconds))
+
+
+@contextlib.contextmanager
+def timed(name: str, kind: str = "init") -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(kind, name, time.perf_counter() - started)
+
+
+def timings() -> List[Dict[str, Any]]:
+    with _LOCK:
+        return [{"kind": kind, "name": name, "at_s": at, "seconds": seconds} for kind, name, at, seconds in _TIMINGS]
+
+
+def report() -> str:
+    lines = [f"startup profile ({time.perf_counter() - _STARTED:.2f} s since startup.py was imported)"]
+    for entry in sorted(timings(), key=lambda entry: entry["at_s"]):
+        lines.append(f"  {entry['kind']:<6} {entry['seconds'] * 1000:8.1f} ms  at {entry['at_s']:6.2f} s  {entry['name']}")
+    return "\n".join(lines)
+
+
+if PROFILE:
+    atexit.register(lambda: print(report(), file=sys.stderr))
+
+
+def _import(target: str) -> Any:
+    module, _, attr = target.partition(":")
+    with timed(target, kind="import"):
+        value = importlib.import_module(module)
+        return getattr(value, attr) if attr else value
+
+
+class LazyModule:
+    """Stands in for ``import <name>`` until an attribute is first used."""
+
+    def __init__(self, name: str):
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_module", None)
+
+    def _load(self) -> Any:
+        module = object.__getattribute__(self, "_module")
+        if module is None:
+            module = _import(object.__getattribute__(self, "_name"))
+            object.__setattr__(self, "_module", module)
+        return module
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr: str, value: Any) -> None:
+        setattr(self._load(), attr, value)
+
+    def __delattr__(self, attr: str) -> None:
+        delattr(self._load(), attr)
+
+
+class LazyImports:
+    """Module-level names imported on first use.
+
+    Assign an instance to the module's ``__getattr__`` (PEP 562) so
+    ``module.Name`` works from outside, and call ``get`` inside functions.
+    Names already in the module namespace (imported before, or patched in
+    tests) are returned as they are.
+    """
+
+    def __init__(self, namespace: Dict[str, Any], **targets: str):
+        self.namespace = namespace
+        self.targets = targets
+
+    def __call__(self, name: str) -> Any:
+        if name not in self.targets:
+            raise AttributeError(f"module {self.namespace.get('__name__')!r} has no attribute {name!r}")
+        return self.get(name)
+
+    def get(self, *names: str) -> Any:
+        values = []
+        for name in names:
+            if name not in self.namespace:
+                self.namespace[name] = _import(self.targets[name])
+            values.append(self.namespace[name])
+        return values[0] if len(values) == 1 else tuple(values)
+
+
+def import_times(module: str, top: int = 15) -> Dict[str, Any]:
+    """Import ``module`` in a fresh interpreter under ``-X importtime``.
+
+    Returns the total, this package's modules (self and cumulative ms) and
+    the slowest third-party packages. Package times are cumulative, so a
+    package imported by another one counts towards both.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    local = {os.path.splitext(name)[0] for name in os.listdir(here) if name.endswith(".py")}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=here, capture_output=True, text=True, env={**os.environ, "STARTUP_PROFILE": ""},
+    )
+    own, packages, total = {}, {}, 0.0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        self_ms, cumulative_ms = int(self_us) / 1000, int(cumulative_us) / 1000
+        if name == module:
+            total = cumulative_ms
+        if name in local:
+            own[name] = {"self_ms": self_ms, "cumulative_ms": cumulative_ms}
+        elif "." not in name and not name.startswith("_") and name not in sys.stdlib_module_names:
+            packages[name] = max(packages.get(name, 0.0), cumulative_ms)
+    slowest = dict(sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top])
+    return {"module": module, "total_ms": total, "own": own, "packages": slowest, "error": result.stderr.strip().splitlines()[-1] if result.returncode else None}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    for module in (argv if argv is not None else sys.argv[1:]) or ["app"]:
+        times = import_times(module)
+        if times["error"]:
+            print(f"import {module} failed: {times['error']}")
+            continue
+        print(f"import {module}: {times['total_ms']:.0f} ms")
+        for name, entry in sorted(times["own"].items(), key=lambda item: item[1]["cumulative_ms"], reverse=True):
+            print(f"  {name:<20} {entry['cumulative_ms']:8.1f} ms cumulative  {entry['self_ms']:8.1f} ms self")
+        print("  slowest packages:")
+        for name, cumulative_ms in times["packages"].items():
+            print(f"  {name:<20} {cumulative_ms:8.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,228 @@
+import time
+import weakref
+import threading
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from config import SYSTEM_CACHE_MAX_ENTRIES, SYSTEM_CACHE_MAX_MB, SYSTEM_CACHE_IDLE_SECONDS
+from vectorstore import drop_collection
+from run_log import log
+
+
+# (knowledge hash, chunk_size, k, temperature)
+SystemKey = Tuple[str, int, int, float]
+
+
+def system_collection(knowledge_hash: str, chunk_size: int) -> str:
+    # one index per knowledge base and split: a build never deletes points another system serves
+    return f"agentic_{knowledge_hash[:16]}_{chunk_size}"
+
+
+def system_nbytes(system: Tuple[Any, ...]) -> int:
+    """Approximate in-process memory of an ``initialize_system`` result: its local indexes.
+
+    Remote (Qdrant) indexes count as zero; the compiled graph is small next
+    to either.
+    """
+    retriever, total = system[1], 0
+    lexical_index = getattr(retriever, "lexical_index", None)
+    if lexical_index is not None:
+        total += lexical_index.nbytes()
+        retriever = retriever.vector_retriever
+    store = getattr(retriever, "vectorstore", None)
+    if hasattr(store, "nbytes"):
+        total += store.nbytes()
+    return total
+
+
+class _Entry:
+    def __init__(self, system: Any, nbytes: int):
+        self.system = system
+        self.nbytes = nbytes
+        self.refs = 0
+        self.last_used = time.time()
+
+
+class SystemLease:
+    """One session's hold on a shared system; released explicitly or when garbage collected."""
+
+    def __init__(self, registry: "SystemRegistry", key: SystemKey, entry: _Entry):
+        self.key = key
+        self.system = entry.system
+        self._entry = entry
+        self._registry = registry
+        # the finalizer may run inside the registry's lock during GC, so it only queues the release
+        self._finalizer = weakref.finalize(self, registry._released.append, entry)
+
+    def release(self) -> None:
+        self._finalizer()
+        self._registry.evict_idle()
+
+
+class SystemRegistry:
+    """Built systems shared by every session in the process.
+
+    ``acquire`` returns a lease on the system for a key, building it at most
+    once: concurrent callers for a key being built wait for that build, and
+    a failed build is raised to every waiter and not cached. Systems no
+    lease holds are evicted once idle for ``idle_seconds``, or least
+    recently used first while there are more than ``max_entries`` or their
+    estimated size exceeds ``max_bytes``. Held systems are never evicted.
+
+    Keys with the same ``collection_fn`` (the same knowledge hash and
+    chunk_size) share one index, and builds on it run one after another.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 8,
+        max_bytes: Optional[int] = None,
+        idle_seconds: float = 3600.0,
+        size_fn: Callable[[Any], int] = system_nbytes,
+        on_evict: Optional[Callable[[SystemKey, Any], None]] = None,
+        collection_fn: Callable[[SystemKey], Any] = lambda key: system_collection(key[0], key[1]),
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.idle_seconds = idle_seconds
+        self.size_fn = size_fn
+        self.on_evict = on_evict
+        self.collection_fn = collection_fn
+        self.builds = 0
+        self.hits = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self._entries: Dict[SystemKey, _Entry] = {}
+        # collection -> (key being built, its future)
+        self._inflight: Dict[Any, Tuple[SystemKey, Future]] = {}
+        self._released: deque = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self, key: SystemKey, build: Callable[[], Any]) -> SystemLease:
+        collection = self.collection_fn(key)
+        waited = False
+        while True:
+            with self._lock:
+                self._apply_releases()
+                entry = self._entries.get(key)
+                if entry is not None:
+                    if not waited:
+                        self.hits += 1
+                    return self._lease(key, entry)
+                inflight = self._inflight.get(collection)
+                leader = inflight is None
+                if leader:
+                    self.builds += 1
+                    future = Future()
+                    self._inflight[collection] = (key, future)
+                else:
+                    future = inflight[1]
+                    if not waited and inflight[0] == key:
+                        self.coalesced += 1
+            if leader:
+                break
+            # raises the leader's error if it built this key; otherwise look again
+            try:
+                future.result()
+            except BaseException:
+                if inflight[0] == key:
+                    raise
+            waited = True
+
+        try:
+            system = build()
+            nbytes = self.size_fn(system)
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(collection, None)
+            future.set_exception(e)
+            raise
+        with self._lock:
+            self._inflight.pop(collection, None)
+            self._apply_releases()
+            entry = self._entries[key] = _Entry(system, nbytes)
+            lease = self._lease(key, entry)
+            evicted = self._evict()
+        future.set_result(None)
+        self._notify(evicted)
+        return lease
+
+    def _lease(self, key: SystemKey, entry: _Entry) -> SystemLease:
+        entry.refs += 1
+        entry.last_used = time.time()
+        return SystemLease(self, key, entry)
+
+    def _apply_releases(self) -> None:
+        while self._released:
+            entry = self._released.popleft()
+            entry.refs -= 1
+            entry.last_used = time.time()
+
+    def _evict(self) -> List[Tuple[SystemKey, Any]]:
+        now = time.time()
+        idle = sorted((entry.last_used, key) for key, entry in self._entries.items() if entry.refs <= 0)
+        evicted = []
+        for last_used, key in idle:
+            over_size = self.max_bytes is not None and sum(entry.nbytes for entry in self._entries.values()) > self.max_bytes
+            if now - last_used < self.idle_seconds and len(self._entries) <= self.max_entries and not over_size:
+                break
+            evicted.append((key, self._entries.pop(key).system))
+        self.evictions += len(evicted)
+        return evicted
+
+    def _notify(self, evicted: List[Tuple[SystemKey, Any]]) -> None:
+        for key, system in evicted:
+            log(f"Evicted shared system {key}")
+            if self.on_evict is not None:
+                self.on_evict(key, system)
+
+    def evict_idle(self) -> int:
+        with self._lock:
+            self._apply_releases()
+            evicted = self._evict()
+        self._notify(evicted)
+        return len(evicted)
+
+    def keys(self) -> List[SystemKey]:
+        with self._lock:
+            return list(self._entries)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            self._apply_releases()
+            return {
+                "builds": self.builds,
+                "hits": self.hits,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "in_use": sum(1 for entry in self._entries.values() if entry.refs > 0),
+                "bytes": sum(entry.nbytes for entry in self._entries.values()),
+            }
+
+
+def _release_collection(key: SystemKey, system: Any) -> None:
+    # systems that differ only in k or temperature share a collection, and a build may be syncing it
+    collection = system_collection(key[0], key[1])
+    if any(other[:2] == key[:2] for other in _SHARED_REGISTRY.keys()) or collection in _SHARED_REGISTRY._inflight:
+        return
+    # nothing else serves it; the knowledge base is rebuilt from its files if it is used again
+    try:
+        drop_collection(collection)
+    except Exception as e:
+        log(f"Failed to drop collection {collection}: {e}")
+
+
+_SHARED_REGISTRY: Optional[SystemRegistry] = None
+
+
+def get_system_registry() -> SystemRegistry:
+    global _SHARED_REGISTRY
+    if _SHARED_REGISTRY is None:
+        _SHARED_REGISTRY = SystemRegistry(
+            max_entries=SYSTEM_CACHE_MAX_ENTRIES,
+            max_bytes=int(SYSTEM_CACHE_MAX_MB * 1024 * 1024),
+            idle_seconds=SYSTEM_CACHE_IDLE_SECONDS,
+            on_evict=_release_collection,
+        )
+    return _SHARED_REGISTRY
@@ -0,0 +1,92 @@
+# tests/test_answer_cache.py
+from types import SimpleNamespace
+
+import agents
+from answer_cache import QUERY_EMBEDDINGS, QueryEmbeddings, SemanticAnswerCache
+from config import AgentState
+
+def test_lookup_matches_paraphrases_within_threshold_and_scope():
+    cache = SemanticAnswerCache(max_entries=4, similarity_threshold=0.9)
+    cache.store([1.0, 0.0], "kb1", "answer", route="retrieve")
+    assert cache.lookup([0.99, 0.05], "kb1")["answer"] == "answer"
+    assert cache.lookup([0.0, 1.0], "kb1") is None
+    # a new knowledge hash never sees old answers
+    assert cache.lookup([1.0, 0.0], "kb2") is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+def test_route_specific_ttl_expires_weather_answers(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("answer_cache.time.time", lambda: now[0])
+    cache = SemanticAnswerCache(ttl_seconds=3600, route_ttls={"weather_search": 60})
+    cache.store([1.0, 0.0], "kb", "sunny", route="weather_search")
+    cache.store([0.0, 1.0], "kb", "resume answer", route="retrieve")
+    now[0] += 120
+    assert cache.lookup([1.0, 0.0], "kb") is None
+    assert cache.lookup([0.0, 1.0], "kb")["answer"] == "resume answer"
+
+def test_lru_eviction_when_full():
+    cache = SemanticAnswerCache(max_entries=2)
+    cache.store([1.0, 0.0, 0.0], "kb", "a")
+    cache.store([0.0, 1.0, 0.0], "kb", "b")
+    cache.lookup([1.0, 0.0, 0.0], "kb")
+    cache.store([0.0, 0.0, 1.0], "kb", "c")
+    assert cache.lookup([0.0, 1.0, 0.0], "kb") is None
+    assert cache.lookup([1.0, 0.0, 0.0], "kb")["answer"] == "a"
+    assert len(cache) == 2
+
+def test_cache_nodes_short_circuit_on_hit():
+    cache = SemanticAnswerCache()
+    embeddings = SimpleNamespace(embed_query=lambda q: [1.0, 0.0] if "resume" in q else [0.0, 1.0])
+    state = AgentState(current_query="what is on the resume?")
+
+    miss = agents.answer_cache_agent(state, cache, embeddings, scope="kb")
+    assert agents.cache_decision(state.model_copy(update=miss)) == "miss"
+    # the state only carries a key to the vector
+    assert "query_embedding" not in AgentState.model_fields
+    assert QUERY_EMBEDDINGS.get(miss["query_embedding_key"]) == [1.0, 0.0]
+
+    answered = state.model_copy(update={**miss, "retrieved_docs": [{"content": "x"}],
+                                        "generated_answer": "Python", "next_step": "retrieve"})
+    agents.remember_answer_agent(answered, cache, scope="kb")
+
+    hit = agents.answer_cache_agent(AgentState(current_query="resume skills?"), cache, embeddings, scope="kb")
+    assert hit["cache_hit"] and hit["generated_answer"] == "Python"
+    assert agents.cache_decision(AgentState(**hit)) == "hit"
+
+def test_answers_without_context_are_not_cached():
+    cache = SemanticAnswerCache()
+    state = AgentState(current_query="q", query_embedding_key=QUERY_EMBEDDINGS.put("q", [1.0]), generated_answer="I don't know")
+    agents.remember_answer_agent(state, cache, scope="kb")
+    assert len(cache) == 0
+
+def test_query_embeddings_keep_only_recent_runs():
+    vectors = QueryEmbeddings(max_entries=2)
+    first = vectors.put("a", [1.0])
+    vectors.put("b", [2.0])
+    vectors.put("c", [3.0])
+    assert vectors.get(first) is None and vectors.get("c") == [3.0] and vectors.get(None) is None
+
+def test_cities_names_and_numbers_keep_similar_queries_apart():
+    cache = SemanticAnswerCache(similarity_threshold=0.9)
+    # both cities embed identically: only the scope tells them apart
+    embeddings = SimpleNamespace(embed_query=lambda q: [1.0, 0.0])
+    paris = AgentState(current_query="What is the weather in Paris?")
+    miss = agents.answer_cache_agent(paris, cache, embeddings, scope="kb")
+    agents.remember_answer_agent(paris.model_copy(update={**miss, "retrieved_docs": [{"content": "x"}],
+                                                          "generated_answer": "Sunny in Paris", "next_step": "weather_search"}), cache, scope="kb")
+
+    assert not agents.answer_cache_agent(AgentState(current_query="What is the weather in Prague?"), cache, embeddings, scope="kb")["cache_hit"]
+    assert agents.answer_cache_agent(AgentState(current_query="what's the weather in paris"), cache, embeddings, scope="kb")["cache_hit"]
+    assert agents._query_entities("Did Riyanshu work at Acme in 2021?") == ["2021", "acme", "riyanshu"]
+    assert agents._query_entities("What did Riyanshu's team ship in 2020?") == ["2020", "riyanshu"]
+
+def test_follow_up_questions_skip_the_cache():
+    from langchain_core.messages import HumanMessage
+
+    cache = SemanticAnswerCache()
+    cache.store([1.0, 0.0], agents._cache_scope(AgentState(current_query="and before that?"), "kb"), "cached")
+    embeddings = SimpleNamespace(embed_query=lambda q: [1.0, 0.0])
+    follow_up = AgentState(current_query="and before that?", chat_history=[HumanMessage(content="where did he work?")])
+    result = agents.answer_cache_agent(follow_up, cache, embeddings, scope="kb")
+    assert result == {"cache_hit": False}
+    assert agents.answer_cache_agent(AgentState(current_query="and before that?"), cache, embeddings, scope="kb")["cache_hit"]
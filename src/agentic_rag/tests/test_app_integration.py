@@ -2,16 +2,20 @@
 import types
 import pytest
 from unittest.mock import MagicMock
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langgraph.graph import START, END, StateGraph
 
+import agents
 import app
 from config import AgentState
+from router import FastRouter
 
 def make_fake_build_vectorstore(expected_texts_container):
     """
     Return a fake build_vectorstore_fn that asserts add_texts contents and returns
     a fake retriever + tool.
     """
-    def _fake_build(doc_splits, google_api_key, qdrant_url, qdrant_api, collection_name="agentic_collection"):
+    def _fake_build(doc_splits, google_api_key, qdrant_url, qdrant_api, collection_name="agentic_collection", **kwargs):
         # ensure doc_splits content is forwarded as text list
         texts = [d.page_content for d in doc_splits]
         expected_texts_container.extend(texts)
@@ -40,19 +44,28 @@ class FakeStateGraphClass:
 
 def test_initialize_system_with_injected_dependencies(tmp_default_pdf):
     # Prepare injectable functions
-    def fake_load_uploaded_docs(uploads):
+    def fake_load_uploaded_docs(uploads, on_error=None):
         # simulate that uploads list is empty to force default PDF fallback branch
+        on_error("loader problem")
         return []
 
-    def fake_split_documents(docs, chunk_size=250):
+    indexes = []
+    def fake_split_documents(docs, chunk_size=250, index=None):
+        indexes.append(index)
         # return simple doc_splits with page_content for verification
         return [types.SimpleNamespace(page_content="chunked text 1")]
 
-    collected_texts = []
+    collected_texts, errors = [], []
     fake_build_fn = make_fake_build_vectorstore(collected_texts)
 
     # Inject fake OpenWeatherMap wrapper and stategraph class
     fake_weather_cls = lambda: MagicMock(name="weather_tool")
+    # query embeddings and the answer cache are injected too, so no Google client is built
+    fake_embeddings = MagicMock(name="query_embeddings")
+    embedding_keys = []
+    def fake_query_embeddings(google_api_key):
+        embedding_keys.append(google_api_key)
+        return fake_embeddings
     # Call initialize_system injecting our test doubles and point default_pdf_path to tmp_default_pdf
     compiled_graph, retriever, weather_tool, temperature, retriever_tool = app.initialize_system(
         uploaded_files=[],
@@ -64,7 +77,11 @@ def test_initialize_system_with_injected_dependencies(tmp_default_pdf):
         build_vectorstore_fn=fake_build_fn,
         weather_api_wrapper_cls=fake_weather_cls,
         stategraph_cls=FakeStateGraphClass,
-        default_pdf_path=tmp_default_pdf
+        default_pdf_path=tmp_default_pdf,
+        answer_cache_fn=lambda: MagicMock(name="answer_cache"),
+        query_embeddings_fn=fake_query_embeddings,
+        fast_router=FastRouter(embeddings=fake_embeddings),
+        on_error=errors.append,
     )
 
     # Assert compiled graph is our FakeCompiledGraph (has stream)
@@ -73,8 +90,14 @@ def test_initialize_system_with_injected_dependencies(tmp_default_pdf):
     assert temperature == 0.3
     # ensure build_vectorstore received our doc chunks
     assert "chunked text 1" in collected_texts
+    # chunks are recorded in an index the generate node reads token counts from
+    assert isinstance(indexes[0], app.ChunkIndex)
     # Ensure weather tool was created via injected class
     assert weather_tool is not None
+    # loader problems go to the caller's on_error, not to Streamlit
+    assert "loader problem" in errors
+    # the answer cache node asked the injected factory for its embeddings
+    assert len(embedding_keys) == 1
 
 def test_workflow_stream_outputs_generated_answer():
     # Use the FakeStateGraphClass that yields a generated_answer
@@ -83,3 +106,36 @@ def test_workflow_stream_outputs_generated_answer():
     outputs = list(compiled_graph.stream(state))
     # last output should include generate step with 'generated_answer'
     assert any("generated_answer" in v for o in outputs for v in o.values())
+
+def test_stream_graph_forwards_generation_tokens_and_records_ttft(monkeypatch):
+    monkeypatch.setattr(agents, "get_chat_model", lambda temperature: FakeListChatModel(responses=["streamed answer"]))
+    workflow = StateGraph(AgentState)
+    workflow.add_node("generate", lambda state: agents.generate_agent(state, temperature=0.0))
+    workflow.add_edge(START, "generate")
+    workflow.add_edge("generate", END)
+
+    tokens, nodes = [], []
+    state = AgentState(current_query="q", retrieved_docs=[{"content": "ctx", "metadata": {}}])
+    updates, metrics = app.stream_graph(workflow.compile(), state, on_token=tokens.append, on_node=nodes.append)
+
+    assert "".join(tokens) == "streamed answer" and len(tokens) > 1
+    assert nodes == ["generate"]
+    assert updates["generated_answer"] == "streamed answer"
+    assert 0 <= metrics["ttft_ms"] <= metrics["total_ms"]
+    assert "generation_ttft_ms" in metrics
+
+def test_graph_dot_draws_only_the_compiled_nodes_and_edges():
+    workflow = StateGraph(AgentState)
+    workflow.add_node("router", lambda state: {})
+    workflow.add_node("retrieve", lambda state: {})
+    workflow.add_node("weather_search", lambda state: {})
+    workflow.add_edge(START, "router")
+    workflow.add_conditional_edges("router", agents.route_decision, {"retrieve": "retrieve", "weather_search": "weather_search"})
+    workflow.add_conditional_edges("retrieve", agents.cache_decision, {"hit": END, "miss": "weather_search"})
+    workflow.add_edge("weather_search", END)
+
+    dot = app.graph_dot(workflow.compile())
+    assert '"start" -> "router"' in dot
+    assert '"router" -> "retrieve" [style=dashed]' in dot
+    assert '"retrieve" -> "end" [style=dashed, label="hit"]' in dot
+    assert "answer_cache" not in dot and "generate" not in dot
@@ -0,0 +1,27 @@
+# tests/test_benchmark.py
+import copy
+
+import benchmark
+from parsers import parse_bytes
+
+def test_synthetic_pdf_pages_parse_back_to_text():
+    corpus = benchmark.make_corpus(1, pages_per_file=3, words_per_page=20)
+    pages = parse_bytes(corpus[0].name, corpus[0].getvalue())
+    assert len(pages) == 3 and all(len(page.page_content.split()) >= 20 for page in pages)
+
+def test_fake_chat_model_follows_the_repo_prompts():
+    llm = benchmark.FakeChatModel()
+    assert llm.invoke("Current Question: weather in Paris? Only respond with the action word.").content == "weather_search"
+    assert llm.invoke("extract the city name from it. Question: Is it raining in Paris?").content == "Paris"
+    assert "".join(c.content for c in llm.stream("Question: q Context: alpha beta")) == "alpha beta"
+
+def test_run_reports_throughput_latency_and_detects_regressions():
+    results = benchmark.run([3], pages_per_file=2, words_per_page=60, queries=4, llm_ms=0, token_ms=0, embed_ms=0, embed_text_ms=0, weather_ms=0, fmt="txt", parallel_load=False)
+    run = results["runs"][0]
+    assert run["ingestion"]["pages"] == 3 and run["ingestion"]["chunks"] >= 3
+    assert run["query"]["end_to_end_ms"]["count"] == 4
+    assert {"node:generate_agent", "llm:FakeChatModel", "vectorstore:numpyvectorstore.search"} <= set(run["query"]["spans_ms"])
+    assert benchmark.compare(results, results) == []
+    slower = copy.deepcopy(results)
+    slower["runs"][0]["query"]["end_to_end_ms"]["p95"] *= 2
+    assert [r["metric"] for r in benchmark.compare(results, slower)] == ["query.end_to_end_ms.p95"]
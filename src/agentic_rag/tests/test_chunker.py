@@ -0,0 +1,43 @@
+# tests/test_chunker.py
+from langchain_core.documents import Document
+
+from chunker import ChunkIndex, chunk_overlap, iter_chunks
+from tokenizer import get_tokenizer
+
+def _pages(count, words=400):
+    return [
+        Document(page_content=" ".join(f"word{(page * 7 + n) % 97}." for n in range(words)), metadata={"source": f"f{page % 3}.pdf", "page": page})
+        for page in range(count)
+    ]
+
+def test_overlap_scales_with_chunk_size():
+    assert chunk_overlap(250, ratio=0.2) == 50
+    assert chunk_overlap(1000, ratio=0.2) == 200
+    assert chunk_overlap(10, ratio=1.5) == 9
+
+def test_chunks_carry_exact_token_counts_and_are_indexed():
+    index = ChunkIndex()
+    chunks = list(iter_chunks(_pages(4), chunk_size=100, overlap=10, parallel=False, index=index))
+    tokenizer = get_tokenizer()
+    assert len(index) == len(chunks) > 4
+    assert all(c.metadata["token_count"] == tokenizer.count(c.page_content) <= 100 for c in chunks)
+    row = index[len(chunks) - 1]
+    last = chunks[-1].metadata
+    assert row == {"source": last["source"], "page": last["page"], "start_index": last["start_index"], "token_count": last["token_count"]}
+    assert index.total_tokens() == sum(index.tokens_by_source().values()) == sum(c.metadata["token_count"] for c in chunks)
+    assert index.nbytes() == len(chunks) * 20
+
+def test_index_looks_up_token_counts_by_source_page_and_offset():
+    index = ChunkIndex()
+    chunks = list(iter_chunks(_pages(4), chunk_size=100, overlap=10, parallel=False, index=index))
+    for chunk in chunks:
+        metadata = chunk.metadata
+        assert index.token_count(metadata["source"], metadata["page"], metadata["start_index"]) == metadata["token_count"]
+    assert index.token_count("f0.pdf", 0, 1) is None
+    assert index.token_count("missing.pdf", 0, 0) is None
+
+def test_parallel_split_matches_serial_split_in_order():
+    pages = _pages(6)
+    serial = list(iter_chunks(pages, chunk_size=80, overlap=8, parallel=False))
+    parallel = list(iter_chunks(pages, chunk_size=80, overlap=8, parallel=True, max_workers=2, pages_per_task=1))
+    assert [(c.page_content, c.metadata) for c in parallel] == [(c.page_content, c.metadata) for c in serial]
@@ -0,0 +1,62 @@
+# tests/test_context_packer.py
+from chunker import ChunkIndex
+from context_packer import merge_passages, pack_context
+from tokenizer import Tokenizer
+
+PAGE = "Riyanshu builds retrieval systems. He uses LangChain and Qdrant. He also writes Streamlit apps for demos."
+
+def chunk(start, end, rank_source="cv.pdf", page=0):
+    return {"content": PAGE[start:end], "metadata": {"source": rank_source, "page": page, "start_index": start}}
+
+def test_overlapping_and_adjacent_chunks_are_merged():
+    docs = [chunk(35, 80), chunk(0, 50), chunk(80, len(PAGE))]
+    passages = merge_passages(docs)
+    assert len(passages) == 1
+    assert passages[0]["content"] == PAGE
+    assert passages[0]["rank"] == 0
+
+def test_distinct_pages_stay_separate_and_duplicates_are_dropped():
+    docs = [
+        chunk(0, 35),
+        chunk(35, 80, page=1),
+        {"content": "He uses LangChain", "metadata": {}},
+        {"content": "Riyanshu  builds retrieval systems.", "metadata": {}},
+    ]
+    passages = merge_passages(docs)
+    # adjacent spans on different pages are not merged; text seen in a better passage is dropped
+    assert [p["metadata"].get("page") for p in passages] == [0, 1]
+
+def test_budget_is_filled_in_relevance_order_and_savings_reported():
+    tokenizer = Tokenizer()
+    docs = [chunk(0, 50), chunk(35, 80), {"content": "unrelated filler " * 50, "metadata": {"source": "other.txt"}}]
+    context, stats = pack_context(docs, token_budget=40, tokenizer=tokenizer)
+    assert context.startswith("[cv.pdf, page 1]\nRiyanshu builds retrieval systems.")
+    assert "filler" not in context
+    assert stats["context_tokens"] == tokenizer.count(context) <= 40
+    assert stats["dropped_passages"] == 1
+    assert stats["tokens_saved"] == stats["raw_tokens"] - stats["context_tokens"]
+
+def test_oversized_best_passage_is_truncated_not_dropped():
+    tokenizer = Tokenizer()
+    context, stats = pack_context([{"content": "word " * 100, "metadata": {}}], token_budget=10, tokenizer=tokenizer)
+    assert tokenizer.count(context) == 10
+    assert stats["passages"] == 1
+
+def test_indexed_chunks_are_packed_without_re_tokenizing():
+    tokenizer = Tokenizer()
+    index = ChunkIndex()
+    docs = [chunk(0, 35), chunk(81, len(PAGE), page=1)]
+    for doc in docs:
+        index.add({**doc["metadata"], "token_count": tokenizer.count(doc["content"])})
+    expected = pack_context(docs, token_budget=100, tokenizer=tokenizer)
+
+    counted = []
+    class CountingTokenizer(Tokenizer):
+        def count(self, text):
+            counted.append(text)
+            return super().count(text)
+
+    context, stats = pack_context(docs, token_budget=100, tokenizer=CountingTokenizer(), chunk_index=index)
+    assert (context, stats) == expected and stats["context_tokens"] == tokenizer.count(context)
+    # only the separator and the short source headers are counted
+    assert not any(doc["content"] in text for doc in docs for text in counted)
@@ -0,0 +1,57 @@
+# tests/test_embedding_cache.py
+from unittest.mock import MagicMock
+
+from embedding_cache import CachedEmbeddings
+
+def make_underlying():
+    underlying = MagicMock()
+    underlying.embed_documents.side_effect = lambda texts: [[float(len(t)), 1.0] for t in texts]
+    underlying.embed_query.side_effect = lambda text: [float(len(text)), 2.0]
+    return underlying
+
+def test_rebuild_of_unchanged_corpus_makes_no_api_calls(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    first = CachedEmbeddings(make_underlying(), "m", path)
+    vectors = first.embed_documents(["alpha", "beta", "alpha"])
+    assert first.underlying.embed_documents.call_args.args[0] == ["alpha", "beta"]
+    assert first.stats()["misses"] == 2
+
+    # a new wrapper over the same file simulates a fresh session
+    second = CachedEmbeddings(make_underlying(), "m", path)
+    assert second.embed_documents(["alpha", "  beta\n", "alpha"]) == vectors
+    second.underlying.embed_documents.assert_not_called()
+    assert second.stats() == {"hits": 3, "misses": 0, "hit_rate": 1.0}
+
+def test_query_and_document_vectors_are_cached_separately(tmp_path):
+    cache = CachedEmbeddings(make_underlying(), "m", str(tmp_path / "cache.sqlite3"))
+    assert cache.embed_documents(["q"]) == [[1.0, 1.0]]
+    assert cache.embed_query("q") == [1.0, 2.0]
+    assert cache.embed_query("q") == [1.0, 2.0]
+    assert cache.underlying.embed_query.call_count == 1
+
+def test_lru_eviction_keeps_recently_used_entries(tmp_path):
+    cache = CachedEmbeddings(make_underlying(), "m", str(tmp_path / "cache.sqlite3"), max_entries=2)
+    cache.embed_documents(["a"])
+    cache.embed_documents(["bb"])
+    cache.embed_documents(["a"])     # touch "a" so "bb" is the oldest
+    cache.embed_documents(["ccc"])
+    cache.underlying.embed_documents.reset_mock()
+
+    cache.embed_documents(["a", "ccc"])
+    cache.underlying.embed_documents.assert_not_called()
+    cache.embed_documents(["bb"])
+    cache.underlying.embed_documents.assert_called_once_with(["bb"])
+
+def test_misses_are_traced_by_characters_and_counted_across_threads(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+    from tracing import TRACER, span
+
+    cache = CachedEmbeddings(make_underlying(), "m", str(tmp_path / "cache.sqlite3"))
+    with span("build", "graph") as root:
+        cache.embed_documents(["alpha", "beta"])
+    embed_span = next(s for s in TRACER.spans(root.trace_id) if s.name == "embed_document")
+    assert embed_span.attributes["input_chars"] == 9
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda i: cache.embed_documents(["alpha", f"new {i}"]), range(40)))
+    assert cache.stats()["hits"] + cache.stats()["misses"] == 82
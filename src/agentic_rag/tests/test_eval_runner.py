@@ -0,0 +1,84 @@
+# tests/test_eval_runner.py
+import json
+import asyncio
+
+import evaluate
+from custom_evaluater import check_contains_reference, check_retrieval_presence
+from eval_runner import load_checkpoint, run_local_eval
+
+EXAMPLES = [
+    {"id": f"ex-{i}", "input": {"current_query": f"question {i}"}, "output": f"answer {i}"}
+    for i in range(6)
+]
+
+def test_importing_evaluate_builds_nothing():
+    assert evaluate.get_app_graph.cache_info().currsize == 0
+
+def test_eval_graph_attaches_without_caching_or_syncing(monkeypatch):
+    calls = []
+    monkeypatch.setattr(evaluate, "load_secrets_from_streamlit", lambda: {})
+    monkeypatch.setattr(evaluate, "initialize_system", lambda **kwargs: calls.append(kwargs) or ("graph",))
+    try:
+        assert evaluate.get_app_graph() == "graph"
+    finally:
+        evaluate.get_app_graph.cache_clear()
+    assert calls == [{"uploaded_files": [], "answer_cache_fn": None, "sync": False}]
+
+def test_runs_with_bounded_concurrency_and_scores_each_example(tmp_path):
+    in_flight, peak = 0, 0
+
+    async def predictor(example):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.02)
+        in_flight -= 1
+        i = example["id"].split("-")[1]
+        return {"output": f"The answer {i}.", "retrieved_docs": 2, "metrics": {"ttft_ms": 5.0, "input_tokens": 10, "output_tokens": 3}}
+
+    summary = asyncio.run(run_local_eval(
+        EXAMPLES, predictor, [check_contains_reference, check_retrieval_presence],
+        checkpoint_path=str(tmp_path / "results.jsonl"), max_concurrency=2,
+    ))
+    assert peak == 2
+    assert summary["examples"] == 6 and summary["errors"] == 0
+    assert summary["scores"] == {"contains_reference": 1.0, "retrieval_present": 1.0}
+    assert summary["tokens"]["input_tokens"] == 60 and summary["ttft_ms"]["p95"] == 5.0
+
+def test_interrupted_run_resumes_and_retries_only_failures(tmp_path):
+    checkpoint = tmp_path / "results.jsonl"
+    calls, failed = [], set()
+
+    async def flaky(example):
+        calls.append(example["id"])
+        if example["id"] in ("ex-1", "ex-4") and example["id"] not in failed:
+            failed.add(example["id"])
+            raise TimeoutError("slow backend")
+        return {"output": example["output"]}
+
+    first = asyncio.run(run_local_eval(EXAMPLES, flaky, checkpoint_path=str(checkpoint)))
+    assert first["errors"] == 2
+    # a half-written last line from a killed run is ignored
+    with open(checkpoint, "a") as f:
+        f.write('{"id": "ex-')
+    calls.clear()
+    second = asyncio.run(run_local_eval(EXAMPLES, flaky, checkpoint_path=str(checkpoint)))
+    assert sorted(calls) == ["ex-1", "ex-4"]
+    assert second["examples"] == 6 and second["errors"] == 0
+    assert load_checkpoint(str(checkpoint))["ex-4"]["error"] is None
+    assert json.loads(checkpoint.read_text().splitlines()[-1])["error"] is None
+
+def test_evaluator_failure_becomes_an_error_row(tmp_path):
+    def broken(run, example):
+        raise KeyError("reference")
+
+    async def predictor(example):
+        return {"output": example["output"], "retrieved_docs": 1}
+
+    summary = asyncio.run(run_local_eval(
+        EXAMPLES[:2], predictor, [check_retrieval_presence, broken], checkpoint_path=str(tmp_path / "results.jsonl"),
+    ))
+    assert summary["examples"] == 2 and summary["errors"] == 2
+    assert summary["scores"] == {"retrieval_present": 1.0}
+    record = load_checkpoint(str(tmp_path / "results.jsonl"))["ex-0"]
+    assert record["error"] == "broken: KeyError: 'reference'"
@@ -0,0 +1,73 @@
+# tests/test_ingestion.py
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from ingestion import ingest_chunks, is_rate_limit_error
+
+class RecordingEmbeddings:
+    def __init__(self, fail_first=0, delay=0.0):
+        self.fail_first = fail_first
+        self.delay = delay
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def embed_documents(self, texts):
+        with self.lock:
+            self.calls += 1
+            should_fail = self.calls <= self.fail_first
+        if should_fail:
+            raise RuntimeError("429 Resource has been exhausted (e.g. check quota).")
+        time.sleep(self.delay)
+        return [[float(len(t))] for t in texts]
+
+def test_ingest_chunks_upserts_every_batch_with_payload_and_progress():
+    client = MagicMock()
+    progress = []
+    texts = [f"t{i}" for i in range(10)]
+    ids = [str(i) for i in range(10)]
+
+    done = ingest_chunks(client, "c", RecordingEmbeddings(delay=0.01), texts, ids,
+                         metadatas=[{"source": "a"}] * 10, batch_size=3, max_workers=2, queue_size=1,
+                         progress_callback=lambda d, t: progress.append((d, t)))
+
+    assert done == 10
+    points = [p for call in client.upsert.call_args_list for p in call.kwargs["points"]]
+    assert sorted(p.id for p in points) == sorted(ids)
+    assert points[0].payload["metadata"] == {"source": "a"}
+    assert "page_content" in points[0].payload
+    assert len(progress) == 4 and progress[-1] == (10, 10)
+
+def test_ingest_chunks_retries_rate_limited_batches(monkeypatch):
+    monkeypatch.setattr("ingestion.time.sleep", lambda s: None)
+    client = MagicMock()
+    embeddings = RecordingEmbeddings(fail_first=2)
+    assert ingest_chunks(client, "c", embeddings, ["a", "b"], ["1", "2"], batch_size=1, max_workers=1) == 2
+    assert embeddings.calls == 4
+
+def test_ingest_chunks_raises_non_rate_limit_errors():
+    embeddings = MagicMock()
+    embeddings.embed_documents.side_effect = ValueError("bad input")
+    with pytest.raises(ValueError):
+        ingest_chunks(MagicMock(), "c", embeddings, ["a"], ["1"])
+
+def test_is_rate_limit_error():
+    assert is_rate_limit_error(RuntimeError("HTTP 429 Too Many Requests"))
+    assert not is_rate_limit_error(RuntimeError("connection refused"))
+
+def test_embed_batches_pulls_upstream_lazily():
+    from ingestion import embed_batches
+    pulled = []
+
+    def upstream():
+        for i in range(100):
+            pulled.append(i)
+            yield [f"t{i}"], [str(i)], [{}]
+
+    stream = embed_batches(RecordingEmbeddings(), upstream(), max_workers=2, queue_size=1)
+    next(stream)
+    # only max_workers + queue_size batches may be outstanding
+    assert len(pulled) <= 4
+    stream.close()
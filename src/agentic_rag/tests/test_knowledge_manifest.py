@@ -0,0 +1,38 @@
+# tests/test_knowledge_manifest.py
+import io
+
+from knowledge_manifest import FileDigestCache, KnowledgeManifest, build_manifest, streaming_digest
+from parsers import UploadedBytes, file_digest
+
+class FakeUploadedFile(io.BytesIO):
+    """Like Streamlit's UploadedFile: a BytesIO with a stable file_id and size."""
+    def __init__(self, file_id, name, data):
+        super().__init__(data)
+        self.file_id = file_id
+        self.name = name
+        self.size = len(data)
+
+def test_block_digest_matches_whole_file_digest_for_binary_data():
+    data = bytes(range(256)) * 1000
+    assert streaming_digest(FakeUploadedFile("1", "a.pdf", data), block_size=4096) == file_digest(data)
+    assert streaming_digest(UploadedBytes("a.pdf", data), block_size=7) == file_digest(data)
+
+def test_digests_are_memoized_by_file_id_and_size():
+    cache = FileDigestCache()
+    upload = FakeUploadedFile("1", "a.txt", b"hello")
+    assert cache.digest(upload) == cache.digest(upload) == file_digest(b"hello")
+    assert (cache.hits, cache.misses) == (1, 1)
+    # a file without a file_id is always read
+    bare = UploadedBytes("a.txt", b"hello")
+    cache.digest(bare)
+    cache.digest(bare)
+    assert cache.misses == 3
+
+def test_manifest_hash_ignores_order_and_reports_changes():
+    a, b, c = (FakeUploadedFile(str(i), f"{name}.txt", name.encode()) for i, name in enumerate("abc"))
+    before = build_manifest([a, b])
+    assert before.hash == build_manifest([b, a]).hash != build_manifest([a]).hash
+    after = build_manifest([b, c])
+    added, removed = after.diff(before)
+    assert [name for name, _ in added] == ["c.txt"] and [name for name, _ in removed] == ["a.txt"]
+    assert KnowledgeManifest([]).diff(None) == ([], [])
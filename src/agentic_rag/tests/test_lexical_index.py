@@ -0,0 +1,65 @@
+# tests/test_lexical_index.py
+import asyncio
+from typing import List
+
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from lexical_index import BM25Index, HybridRetriever, reciprocal_rank_fusion
+
+def make_index():
+    index = BM25Index()
+    index.add("1", "Riyanshu Garg resume: Python, LangChain, Qdrant")
+    index.add("2", "The weather in Delhi is hot and humid")
+    index.add("3", "Python developer with experience in Streamlit and Python tooling")
+    return index
+
+def test_bm25_ranks_exact_terms():
+    results = make_index().search("python", k=3)
+    assert [point_id for point_id, _, _ in results] == ["3", "1"]
+    assert make_index().search("riyanshu", k=3)[0][0] == "1"
+    assert make_index().search("nonexistent", k=3) == []
+
+def test_postings_are_flat_integer_arrays():
+    index = make_index()
+    index.search("python")
+    assert index._post_docs.dtype.kind == "i" and index._post_tfs.dtype.kind == "i"
+    assert len(index._offsets) == len(index._vocab) + 1
+
+def test_incremental_add_delete_and_persistence(tmp_path):
+    index = make_index()
+    index.search("python")
+    index.delete(["3"])
+    index.add("4", "Qdrant product code QX-42")
+    assert {p for p, _, _ in index.search("python qx", k=5)} == {"1", "4"}
+
+    index.save(str(tmp_path))
+    loaded = BM25Index.load(str(tmp_path))
+    assert sorted(loaded.ids()) == ["1", "2", "4"]
+    assert loaded.search("delhi")[0][0] == "2"
+    assert loaded.search("delhi")[0][2]["page_content"].startswith("The weather")
+
+def test_reciprocal_rank_fusion_prefers_documents_ranked_by_both():
+    a = Document(page_content="a", metadata={"_id": "a"})
+    b = Document(page_content="b", metadata={"_id": "b"})
+    c = Document(page_content="c", metadata={"_id": "c"})
+    fused = reciprocal_rank_fusion([[a, b], [b, c]], k=3)
+    assert [d.page_content for d in fused] == ["b", "a", "c"]
+
+class StaticRetriever(BaseRetriever):
+    docs: List[Document]
+
+    def _get_relevant_documents(self, query, *, run_manager):
+        return self.docs
+
+def test_hybrid_retriever_fuses_dense_and_lexical_results():
+    dense = StaticRetriever(docs=[Document(page_content="The weather in Delhi is hot and humid", metadata={"_id": "2"})])
+    retriever = HybridRetriever(vector_retriever=dense, lexical_index=make_index(), k=2)
+    docs = retriever.invoke("riyanshu")
+    assert {d.metadata["_id"] for d in docs} == {"1", "2"}
+
+def test_hybrid_retriever_async_matches_sync():
+    dense = StaticRetriever(docs=[Document(page_content="The weather in Delhi is hot and humid", metadata={"_id": "2"})])
+    retriever = HybridRetriever(vector_retriever=dense, lexical_index=make_index(), k=2)
+    docs = asyncio.run(retriever.ainvoke("riyanshu"))
+    assert [d.metadata["_id"] for d in docs] == [d.metadata["_id"] for d in retriever.invoke("riyanshu")]
@@ -0,0 +1,26 @@
+# tests/test_llm.py
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+import agents
+import llm
+from config import AgentState
+
+def test_chat_models_are_built_once_per_model_and_temperature():
+    llm.get_chat_model.cache_clear()
+    first = llm.get_chat_model(0.0)
+    assert llm.get_chat_model(0.0) is first
+    assert llm.get_chat_model(0.5) is not first
+    # every client shares one pooled HTTP client
+    assert first.http_client is llm.get_chat_model(0.5).http_client
+
+def test_bundled_prompts_load_offline():
+    rag = llm.get_prompt("rag")
+    assert set(rag.input_variables) == {"context", "question"}
+    assert llm.get_prompt("rag") is rag
+    assert set(llm.get_prompt("router").input_variables) == {"history", "question"}
+    assert llm.get_prompt("city_extraction").input_variables == ["question"]
+
+def test_generate_agent_uses_local_prompt(monkeypatch):
+    monkeypatch.setattr(agents, "get_chat_model", lambda temperature: FakeListChatModel(responses=["Paris"]))
+    state = AgentState(current_query="Where?", retrieved_docs=[{"content": "The office is in Paris.", "metadata": {}}])
+    assert agents.generate_agent(state, temperature=0.0)["generated_answer"] == "Paris"
@@ -0,0 +1,103 @@
+# tests/test_local_index.py
+from types import SimpleNamespace
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from local_index import NumpyVectorStore
+
+class KeywordEmbeddings(Embeddings):
+    """One dimension per keyword, so similarity is predictable."""
+    VOCAB = ["python", "weather", "resume", "qdrant"]
+
+    def _vec(self, text):
+        return [float(text.lower().count(w)) + 0.01 for w in self.VOCAB]
+
+    def embed_documents(self, texts):
+        return [self._vec(t) for t in texts]
+
+    def embed_query(self, text):
+        return self._vec(text)
+
+def make_store():
+    store = NumpyVectorStore(KeywordEmbeddings())
+    store.add_texts(
+        ["python python developer", "weather in paris", "resume of riyanshu", "qdrant vector search"],
+        metadatas=[{"source": "a.txt"}, {"source": "b.txt"}, {"source": "a.txt"}, {"source": "c.txt"}],
+        ids=["p", "w", "r", "q"],
+    )
+    return store
+
+def test_top_k_is_sorted_by_cosine_similarity():
+    results = make_store().similarity_search_with_score("python python resume", k=2)
+    assert [d.page_content for d, _ in results] == ["python python developer", "resume of riyanshu"]
+    assert results[0][1] >= results[1][1]
+
+def test_filter_and_score_threshold():
+    store = make_store()
+    docs = store.similarity_search("weather", k=4, filter={"source": "a.txt"})
+    assert {d.metadata["source"] for d in docs} == {"a.txt"}
+    assert len(store.similarity_search("weather", k=4, score_threshold=0.9)) == 1
+
+def test_delete_and_upsert_keep_matrix_contiguous():
+    store = make_store()
+    store.delete(["p"])
+    store.add_texts(["qdrant qdrant"], ids=["q"])
+    assert len(store) == 3
+    assert sorted(store.ids()) == ["q", "r", "w"]
+    assert store.vectors.flags.c_contiguous
+    assert store.similarity_search("qdrant", k=1)[0].page_content == "qdrant qdrant"
+
+def test_save_and_memory_mapped_load(tmp_path):
+    store = make_store()
+    store.save(str(tmp_path))
+    loaded = NumpyVectorStore.load(str(tmp_path), KeywordEmbeddings())
+    assert isinstance(loaded.vectors, np.memmap) or not loaded.vectors.flags.writeable
+    assert loaded.similarity_search("weather", k=1)[0].page_content == "weather in paris"
+    # writes copy the mapped matrix into memory first
+    loaded.add_texts(["more python"], ids=["m"])
+    assert len(loaded) == 5
+
+def test_refresh_picks_up_another_writers_save(tmp_path):
+    make_store().save(str(tmp_path))
+    reader = NumpyVectorStore.load(str(tmp_path), KeywordEmbeddings())
+    assert not reader.refresh(str(tmp_path))
+    writer = NumpyVectorStore.load(str(tmp_path), KeywordEmbeddings())
+    writer.add_texts(["python weather"], ids=["pw"])
+    writer.save(str(tmp_path))
+    assert reader.refresh(str(tmp_path)) and len(reader) == 5
+    # a copy with unsaved changes is never overwritten
+    reader.delete(["pw"])
+    writer.add_texts(["resume qdrant"], ids=["rq"])
+    writer.save(str(tmp_path))
+    assert not reader.refresh(str(tmp_path)) and len(reader) == 4
+
+def test_retriever_interface_matches_retrieve_agent_usage():
+    retriever = make_store().as_retriever(search_kwargs={"k": 1})
+    docs = retriever.invoke("weather")
+    assert docs[0].page_content == "weather in paris"
+
+def test_build_local_vectorstore_is_incremental(monkeypatch, tmp_path):
+    import vectorstore
+    embeddings = KeywordEmbeddings()
+    calls = []
+    original = embeddings.embed_documents
+    monkeypatch.setattr(embeddings, "embed_documents", lambda texts: calls.append(list(texts)) or original(texts))
+    monkeypatch.setattr(vectorstore, "get_embeddings", lambda key: embeddings)
+    monkeypatch.setattr(vectorstore, "_LOCAL_STORES", {})
+
+    def chunk(text, digest):
+        return SimpleNamespace(page_content=text, metadata={"file_digest": digest, "chunk_size": 250})
+
+    vectorstore.build_local_vectorstore([chunk("python", "a"), chunk("weather", "b")], "g", index_dir=str(tmp_path))
+    retriever, _ = vectorstore.build_local_vectorstore([chunk("python", "a"), chunk("qdrant", "c")], "g", index_dir=str(tmp_path))
+
+    assert calls == [["python", "weather"], ["qdrant"]]
+    assert sorted(d.page_content for d in retriever.vectorstore.similarity_search("x", k=5)) == ["python", "qdrant"]
+    assert (tmp_path / "agentic_collection" / "vectors.npy").exists()
+
+def test_source_scoped_retriever_pushes_filter_into_local_search():
+    from vectorstore import SourceScopedRetriever
+    retriever = SourceScopedRetriever(vectorstore=make_store(), search_kwargs={"k": 4})
+    docs = retriever.invoke("weather python", sources=["a.txt"])
+    assert docs and {d.metadata["source"] for d in docs} == {"a.txt"}
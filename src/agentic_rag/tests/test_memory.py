@@ -0,0 +1,38 @@
+# tests/test_memory.py
+from langchain_core.messages import AIMessage, HumanMessage
+
+from config import AgentState
+from memory import ConversationMemory, format_history
+from tokenizer import Tokenizer
+
+def test_window_stays_fixed_and_old_turns_move_into_summary():
+    memory = ConversationMemory(window=4, summary_tokens=1000, tokenizer=Tokenizer())
+    for i in range(10):
+        memory.add(HumanMessage(content=f"question {i}"))
+        memory.add(AIMessage(content=f"answer {i}"))
+    assert [m.content for m in memory.messages()] == ["question 8", "answer 8", "question 9", "answer 9"]
+    assert memory.summary.splitlines()[0] == "human: question 0"
+    assert memory.summary.splitlines()[-1] == "ai: answer 7"
+    assert memory.total_messages == 20
+
+def test_summary_is_token_bounded_and_lines_are_compacted():
+    tokenizer = Tokenizer()
+    memory = ConversationMemory(window=2, summary_tokens=30, line_tokens=5, tokenizer=tokenizer)
+    for i in range(200):
+        memory.add(HumanMessage(content=f"a long question number {i} with many extra words"))
+    assert tokenizer.count(memory.summary) <= 30
+    assert all(tokenizer.count(line) <= 7 for line in memory.summary.splitlines())
+    assert len(memory.messages()) == 2
+
+def test_agent_state_size_is_flat_for_long_sessions():
+    memory = ConversationMemory(window=6, summary_tokens=100, tokenizer=Tokenizer())
+    sizes = []
+    for i in range(300):
+        memory.add(HumanMessage(content=f"turn {i}"))
+        state = AgentState(chat_history=memory.messages(), conversation_summary=memory.summary, current_query=f"turn {i}")
+        sizes.append(len(state.chat_history))
+    assert max(sizes) == 6
+
+def test_format_history_separates_messages_and_includes_summary():
+    text = format_history([HumanMessage(content="hi"), AIMessage(content="hello")], summary="human: earlier")
+    assert text == "Earlier in the conversation:\nhuman: earlier\nhuman: hi\nai: hello"
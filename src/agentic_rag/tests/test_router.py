@@ -0,0 +1,70 @@
+# tests/test_router.py
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import agents
+from config import AgentState
+from gazetteer import Gazetteer
+from router import FastRouter, normalize_route
+
+class KeywordEmbeddings:
+    """Two-dimensional toy embedding: (weather-ness, document-ness)."""
+
+    def _vector(self, text):
+        text = text.lower()
+        weather = sum(word in text for word in ("hot", "cold", "outside", "rain", "forecast", "wind", "humid", "snow", "umbrella", "weather", "temperature"))
+        docs = sum(word in text for word in ("skills", "resume", "projects", "education", "languages", "experience", "internship", "certifications", "report", "author", "document", "background"))
+        return [weather + 0.01, docs + 0.01]
+
+    def embed_documents(self, texts):
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text):
+        return self._vector(text)
+
+def test_normalize_route_maps_free_form_output():
+    assert normalize_route("weather_search") == "weather_search"
+    assert normalize_route('"Weather Search".') == "weather_search"
+    assert normalize_route("RETRIEVE") == "retrieve"
+    assert normalize_route("I am not sure") == "retrieve"
+    assert normalize_route(None) == "retrieve"
+
+def test_rules_route_keywords_and_boost_city_mentions():
+    router = FastRouter(gazetteer=Gazetteer({"Delhi": "Delhi"}))
+    assert router.classify_rules("What is the weather in Delhi?") == ("weather_search", 0.97)
+    assert router.classify_rules("Is it going to rain in Delhi?")[0] == "weather_search"
+    assert router.classify_rules("List the skills on the resume")[0] == "retrieve"
+    # mixed or keyword-free queries are left to the next tier
+    assert router.classify_rules("Does the resume mention weather apps?") == (None, 0.0)
+
+def test_weather_words_without_a_city_are_left_to_the_next_tier():
+    router = FastRouter(KeywordEmbeddings(), gazetteer=Gazetteer({"Delhi": "Delhi"}))
+    query = "What does the climate and temperature section say?"
+    route, confidence = router.classify_rules(query)
+    assert route == "weather_search" and confidence < 0.85
+    # the centroid or LLM tier decides
+    assert router.classify(query, threshold=0.85)[2] != "rules"
+
+def test_centroid_tier_handles_queries_without_keywords():
+    router = FastRouter(KeywordEmbeddings(), gazetteer=Gazetteer({}))
+    route, confidence, tier = router.classify("How cold is it outside?", threshold=0.8)
+    assert (route, tier) == ("weather_search", "centroid")
+    assert confidence >= 0.8
+
+def test_router_agent_skips_llm_on_fast_path(monkeypatch):
+    chat = MagicMock()
+    monkeypatch.setattr(agents, "get_chat_model", chat)
+    router = FastRouter(gazetteer=Gazetteer({"Delhi": "Delhi"}))
+    result = agents.router_agent(AgentState(current_query="weather forecast for tomorrow in Delhi"), temperature=0.0, fast_router=router)
+    assert result == {"next_step": "weather_search"}
+    chat.assert_not_called()
+    assert router.stats()["rules"] == 1 and router.stats()["fast_path_rate"] == 1.0
+
+def test_router_agent_falls_back_to_llm_and_validates_output(monkeypatch):
+    chat = MagicMock()
+    chat.return_value.invoke.return_value = SimpleNamespace(content="  Weather_Search\n")
+    monkeypatch.setattr(agents, "get_chat_model", chat)
+    router = FastRouter(gazetteer=Gazetteer({}))
+    result = agents.router_agent(AgentState(current_query="hello there"), temperature=0.0, fast_router=router)
+    assert result == {"next_step": "weather_search"}
+    assert router.stats()["llm"] == 1
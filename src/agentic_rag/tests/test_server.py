@@ -0,0 +1,107 @@
+# tests/test_server.py
+import json
+import base64
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langgraph.graph import START, END, StateGraph
+from starlette.testclient import TestClient
+
+import server
+from vectorstore import iter_uploaded_docs
+from config import AgentState, SECRETS
+from run_log import log, log_to
+from tracing import traced
+
+def fake_initialize_system(calls, syncs=None):
+    syncs = [] if syncs is None else syncs
+
+    def generate(state):
+        log(f"answering {state.current_query}")
+        chunks = FakeListChatModel(responses=[f"echo {state.current_query}"]).stream("q")
+        return {"generated_answer": "".join(chunk.content for chunk in chunks), "next_step": "retrieve"}
+
+    def initialize(uploaded_files, on_error, load_uploaded_docs_fn=iter_uploaded_docs, **kwargs):
+        calls.append([f.name for f in uploaded_files])
+        syncs.append(kwargs.get("sync", True))
+        list(load_uploaded_docs_fn(uploaded_files, parallel=False, on_error=on_error))
+        workflow = StateGraph(AgentState)
+        workflow.add_node("generate", traced(generate))
+        workflow.add_edge(START, "generate")
+        workflow.add_edge("generate", END)
+        return workflow.compile(), None, None, 0.0, None
+    return initialize
+
+@pytest.fixture
+def make_client(tmp_path):
+    def make(calls, syncs=None, **kwargs):
+        kwargs.setdefault("index_dir", str(tmp_path))
+        return TestClient(server.create_app(initialize_system_fn=fake_initialize_system(calls, syncs), **kwargs))
+    return make
+
+def test_query_builds_graph_once_and_returns_answer_with_logs(make_client):
+    calls, syncs = [], []
+    client = make_client(calls, syncs)
+    assert client.get("/health").json()["ready"] is False
+    for _ in range(2):
+        body = client.post("/query", json={"query": "hello", "chat_history": [{"role": "user", "content": "hi"}]}).json()
+        assert body["answer"] == "echo hello" and body["route"] == "retrieve"
+        assert "answering hello" in body["logs"]
+        assert {(s["name"], s["kind"]) for s in body["spans"]} == {("query", "graph"), ("generate", "node")}
+    # attached to the index as it is: nothing synced, nothing deleted
+    assert calls == [[]] and syncs == [False]
+    assert client.post("/query", json={}).status_code == 400
+
+def test_ingest_publishes_the_knowledge_version_to_other_workers(make_client):
+    first_calls, second_calls, second_syncs = [], [], []
+    first = make_client(first_calls)
+    second = make_client(second_calls, second_syncs)
+    second.post("/query", json={"query": "hello"})
+    body = first.post("/ingest", files=[("files", ("notes.txt", b"some notes", "text/plain"))]).json()
+    assert second.get("/health").json()["knowledge_hash"] == body["knowledge_hash"]
+    assert second.get("/health").json()["files"] == ["notes.txt"]
+    # the other worker rebuilds for the new version before answering, without syncing
+    second.post("/query", json={"query": "hello"})
+    second.post("/query", json={"query": "hello"})
+    assert second_syncs == [False, False]
+    assert second.app.state.service.knowledge_hash == body["knowledge_hash"]
+
+def test_query_stream_emits_ndjson_events(make_client):
+    client = make_client([])
+    response = client.post("/query/stream", json={"query": "hello"})
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert {"event": "node", "node": "generate"} in events
+    assert events[-1]["event"] == "done" and events[-1]["answer"] == "echo hello"
+
+def test_ingest_accepts_multipart_and_base64_and_reports_errors(make_client):
+    calls = []
+    client = make_client(calls)
+    body = client.post("/ingest", files=[("files", ("notes.txt", b"some notes", "text/plain")), ("files", ("empty.txt", b"", "text/plain"))]).json()
+    assert calls == [["notes.txt", "empty.txt"]]
+    assert body["knowledge_hash"] and body["errors"] == ["Uploaded file empty.txt is empty and was skipped."]
+    payload = {"files": [{"name": "a.csv", "content_base64": base64.b64encode(b"a,b").decode()}]}
+    assert client.post("/ingest", json=payload).json()["errors"] == ["Unsupported file type: a.csv"]
+    assert client.post("/ingest", json={"files": "nope"}).status_code == 400
+
+def test_metrics_exposes_span_histograms(make_client):
+    client = make_client([])
+    client.post("/query", json={"query": "hello"})
+    text = client.get("/metrics").text
+    assert 'agentic_rag_span_duration_seconds_count{kind="node",name="generate"}' in text
+
+def test_create_app_configures_secrets(monkeypatch):
+    monkeypatch.setitem(SECRETS, "GROQ_API_KEY", "old")
+    monkeypatch.setitem(SECRETS, "QDRANT_URL", "kept")
+    server.create_app(secrets={"GROQ_API_KEY": "new", "QDRANT_URL": None}, initialize_system_fn=fake_initialize_system([]))
+    # merged, not replaced
+    assert SECRETS["GROQ_API_KEY"] == "new" and SECRETS["QDRANT_URL"] == "kept"
+
+def test_log_to_collects_lines_per_context():
+    first, second = [], []
+    with log_to(first):
+        log("one")
+        with log_to(second):
+            log("two")
+        log("three")
+    log("nowhere")
+    assert first == ["one", "three"] and second == ["two"]
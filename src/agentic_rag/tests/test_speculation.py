@@ -0,0 +1,76 @@
+# tests/test_speculation.py
+import asyncio
+import time
+from types import SimpleNamespace
+from typing import List
+from unittest.mock import MagicMock
+
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+import agents
+from config import AgentState
+from gazetteer import Gazetteer
+from speculation import Speculation, SpeculationStats
+
+class SlowRetriever(BaseRetriever):
+    def _get_relevant_documents(self, query, *, run_manager, sources=None) -> List[Document]:
+        time.sleep(0.2)
+        return [Document(page_content="resume text", metadata={"source": "cv.pdf"})]
+
+    async def _aget_relevant_documents(self, query, *, run_manager, sources=None) -> List[Document]:
+        await asyncio.sleep(0.2)
+        return [Document(page_content="resume text", metadata={"source": "cv.pdf"})]
+
+def slow_router(decision):
+    def invoke(messages):
+        time.sleep(0.2)
+        return SimpleNamespace(content=decision)
+
+    async def ainvoke(messages):
+        await asyncio.sleep(0.2)
+        return SimpleNamespace(content=decision)
+
+    return lambda temperature: SimpleNamespace(invoke=invoke, ainvoke=ainvoke)
+
+def test_winner_result_is_used_and_losers_cancelled():
+    stats = SpeculationStats()
+    speculation = Speculation(stats)
+    speculation.start("retrieve", lambda: time.sleep(0.05) or "docs")
+    speculation.start("weather_search", time.sleep, 0.2)
+    time.sleep(0.1)
+    assert speculation.result("retrieve") == "docs"
+    time.sleep(0.25)
+    s = stats.stats()
+    assert s["launched"] == 2 and s["used"] == 1
+    assert s["wasted"] + s["cancelled"] == 1
+    assert s["saved_ms"] > 0
+
+def test_speculative_router_overlaps_router_and_retrieval(monkeypatch):
+    monkeypatch.setattr(agents, "get_chat_model", slow_router("retrieve"))
+    state = AgentState(current_query="tell me about this person")
+    started = time.perf_counter()
+    result = agents.speculative_router_agent(state, temperature=0.0, retriever_instance=SlowRetriever())
+    # max(router, retrieval) rather than their sum
+    assert time.perf_counter() - started < 0.35
+    assert result["speculative_route"] == "retrieve"
+    assert result["retrieved_docs"][0]["content"] == "resume text"
+    assert agents.speculative_route_decision(AgentState(**result)) == "generate"
+
+def test_losing_retrieval_is_discarded_for_weather_route(monkeypatch):
+    monkeypatch.setattr(agents, "get_chat_model", slow_router("weather_search"))
+    tool = MagicMock()
+    tool.run.return_value = "Weather in Paris: clear"
+    state = AgentState(current_query="should I pack a coat for Paris")
+    result = asyncio.run(agents.aspeculative_router_agent(
+        state, temperature=0.0, retriever_instance=SlowRetriever(),
+        weather_search_tool=tool, gazetteer=Gazetteer({"Paris": "Paris"}),
+    ))
+    assert result["speculative_route"] == "weather_search"
+    assert result["retrieved_docs"] == [{"content": "Weather in Paris: clear", "metadata": {"source": "weather_search"}}]
+
+def test_route_without_speculated_branch_runs_regular_node(monkeypatch):
+    monkeypatch.setattr(agents, "get_chat_model", slow_router("weather_search"))
+    result = agents.speculative_router_agent(AgentState(current_query="coat weather?"), temperature=0.0, retriever_instance=SlowRetriever())
+    assert "speculative_route" not in result
+    assert agents.speculative_route_decision(AgentState(**result)) == "weather_search"
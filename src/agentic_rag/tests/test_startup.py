@@ -0,0 +1,38 @@
+# tests/test_startup.py
+import os
+import sys
+import json
+import subprocess
+
+import startup
+from config import LazySecrets
+from startup import LazyImports, LazyModule
+
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_importing_the_app_loads_no_clients_and_reads_no_secrets():
+    code = (
+        "import os, sys, json; os.environ.pop('LANGCHAIN_ENDPOINT', None)\n"
+        "import app, server, evaluate\n"
+        "heavy = ['streamlit', 'qdrant_client', 'langchain_groq', 'langchain_google_genai', 'langchain_community']\n"
+        "print(json.dumps({'loaded': [m for m in heavy if m in sys.modules], 'env': 'LANGCHAIN_ENDPOINT' in os.environ}))"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=HERE, capture_output=True, text=True, check=True)
+    assert json.loads(result.stdout.splitlines()[-1]) == {"loaded": [], "env": False}
+
+def test_lazy_names_import_once_and_respect_patches():
+    namespace = {"__name__": "fake"}
+    lazy = LazyImports(namespace, dumps="json:dumps", patched="json:loads")
+    namespace["patched"] = "stand-in"
+    assert lazy("dumps") is json.dumps and namespace["dumps"] is json.dumps
+    assert lazy.get("patched") == "stand-in"
+    proxy = LazyModule("json")
+    assert proxy.dumps is json.dumps
+    assert any(entry["kind"] == "import" and entry["name"] == "json:dumps" for entry in startup.timings())
+
+def test_secrets_load_on_first_access():
+    calls = []
+    secrets = LazySecrets(lambda: calls.append(1) or {"GROQ_API_KEY": "k"})
+    assert calls == []
+    secrets.update({"GOOGLE_API_KEY": "g"})
+    assert dict(secrets) == {"GROQ_API_KEY": "k", "GOOGLE_API_KEY": "g"} and calls == [1]
@@ -0,0 +1,109 @@
+# tests/test_system_registry.py
+import gc
+import time
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+import system_registry
+from system_registry import SystemRegistry, system_collection, system_nbytes
+from vectorstore import SourceScopedRetriever
+from lexical_index import BM25Index, HybridRetriever
+from tests.test_local_index import make_store
+
+def test_concurrent_sessions_share_one_build():
+    registry = SystemRegistry(size_fn=lambda system: 0)
+    builds = []
+
+    def build():
+        builds.append(1)
+        time.sleep(0.1)
+        return ("graph",)
+
+    leases = []
+    threads = [threading.Thread(target=lambda: leases.append(registry.acquire(("h", 250, 3, 0.0), build))) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(builds) == 1 and {lease.system for lease in leases} == {("graph",)}
+    stats = registry.stats()
+    assert stats["builds"] == 1 and stats["hits"] + stats["coalesced"] == 19 and stats["in_use"] == 1
+
+def test_failed_build_reaches_the_caller_and_is_not_cached():
+    registry = SystemRegistry(size_fn=lambda system: 0)
+    with pytest.raises(RuntimeError):
+        registry.acquire(("h", 250, 3, 0.0), lambda: (_ for _ in ()).throw(RuntimeError("qdrant down")))
+    assert registry.acquire(("h", 250, 3, 0.0), lambda: ("graph",)).system == ("graph",)
+
+def test_only_released_systems_are_evicted_least_recently_used_first():
+    evicted = []
+    registry = SystemRegistry(max_entries=2, size_fn=lambda system: 0, on_evict=lambda key, system: evicted.append(key[0]))
+    a = registry.acquire(("a", 250, 3, 0.0), lambda: ("a",))
+    b = registry.acquire(("b", 250, 3, 0.0), lambda: ("b",))
+    b.release()
+    c = registry.acquire(("c", 250, 3, 0.0), lambda: ("c",))
+    assert evicted == ["b"]
+    # a dropped session (its lease garbage collected) frees its system too
+    del a
+    gc.collect()
+    assert registry.stats()["in_use"] == 1
+    registry.acquire(("d", 250, 3, 0.0), lambda: ("d",))
+    assert evicted == ["b", "a"] and registry.keys() == [("c", 250, 3, 0.0), ("d", 250, 3, 0.0)]
+    assert c.system == ("c",)
+
+def test_memory_cap_and_idle_time_evict(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("system_registry.time.time", lambda: now[0])
+    registry = SystemRegistry(max_bytes=150, idle_seconds=60, size_fn=lambda system: system[0])
+    registry.acquire(("a", 250, 3, 0.0), lambda: (100,)).release()
+    now[0] += 1
+    registry.acquire(("b", 250, 3, 0.0), lambda: (100,)).release()
+    assert registry.keys() == [("b", 250, 3, 0.0)]
+    now[0] += 61
+    assert registry.evict_idle() == 1 and registry.stats()["size"] == 0
+
+def test_system_size_counts_local_indexes():
+    store = make_store()
+    lexical = BM25Index()
+    lexical.add("p", "python python developer", {"source": "a.txt"})
+    retriever = HybridRetriever(vector_retriever=SourceScopedRetriever(vectorstore=store), lexical_index=lexical)
+    size = system_nbytes((None, retriever))
+    assert size == store.nbytes() + lexical.nbytes() and store.nbytes() >= store.vectors.nbytes > 0
+    assert system_nbytes((None, SimpleNamespace(vectorstore=object()))) == 0
+
+def test_evicting_the_last_system_on_a_collection_drops_it(monkeypatch):
+    dropped = []
+    monkeypatch.setattr(system_registry, "drop_collection", dropped.append)
+    registry = SystemRegistry(max_entries=1, size_fn=lambda system: 0, on_evict=system_registry._release_collection)
+    monkeypatch.setattr(system_registry, "_SHARED_REGISTRY", registry)
+    # other knowledge bases get their own collections, so building one never touches another
+    assert system_collection("a" * 64, 250) != system_collection("b" * 64, 250) != system_collection("a" * 64, 500)
+    held = registry.acquire(("a", 250, 3, 0.0), lambda: ("a",))
+    registry.acquire(("a", 250, 5, 0.0), lambda: ("a, k=5",)).release()
+    # the k=5 system went, but its collection still serves the held one
+    assert dropped == []
+    held.release()
+    registry.acquire(("b", 250, 3, 0.0), lambda: ("b",))
+    assert dropped == [system_collection("a", 250)]
+
+def test_builds_on_one_collection_never_overlap():
+    registry = SystemRegistry(size_fn=lambda system: 0)
+    running, overlaps = [], []
+
+    def build(name):
+        def run():
+            overlaps.append(len(running))
+            running.append(name)
+            time.sleep(0.05)
+            running.remove(name)
+            return (name,)
+        return run
+
+    threads = [threading.Thread(target=registry.acquire, args=(("kb", 250, k, 0.0), build(k))) for k in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert overlaps == [0, 0, 0, 0]
@@ -0,0 +1,63 @@
+# tests/test_tracing.py
+import json
+import asyncio
+
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from tracing import TRACER, LLMTracingHandler, Tracer, span, traced
+
+def test_spans_nest_and_record_errors():
+    tracer = Tracer()
+    with span("query", "graph", tracer=tracer) as root:
+        with span("router_agent", "node", tracer=tracer) as node:
+            node.set(documents=3)
+        with pytest.raises(ValueError):
+            with span("openweathermap", "weather", tracer=tracer):
+                raise ValueError("boom")
+    spans = {s.name: s for s in tracer.spans(root.trace_id)}
+    assert spans["router_agent"].parent_id == root.span_id and spans["router_agent"].attributes == {"documents": 3}
+    assert spans["openweathermap"].error == "ValueError: boom"
+    assert all(s.duration_ms >= 0 for s in spans.values())
+
+def test_traced_sync_and_async_agents_record_state_counts():
+    def retrieve_agent(state):
+        return {"retrieved_docs": [{}, {}], "next_step": "generate"}
+
+    async def aretrieve_agent(state):
+        return {"retrieved_docs": [{}]}
+
+    with span("query", "graph") as root:
+        traced(retrieve_agent)(None)
+        asyncio.run(traced(aretrieve_agent, name="retrieve_agent")(None))
+    nodes = [s for s in TRACER.spans(root.trace_id) if s.kind == "node"]
+    assert [s.attributes["documents"] for s in nodes] == [2, 1]
+    assert nodes[0].attributes["next_step"] == "generate"
+    assert all(s.parent_id == root.span_id for s in nodes)
+
+def test_llm_handler_records_model_calls_under_the_current_span():
+    model = FakeListChatModel(responses=["hi"], callbacks=[LLMTracingHandler()])
+    with span("generate_agent", "node") as node:
+        model.invoke("hello")
+    llm = [s for s in TRACER.spans(node.trace_id) if s.kind == "llm"]
+    assert len(llm) == 1 and llm[0].parent_id == node.span_id and llm[0].error is None
+
+def test_prometheus_histograms_are_cumulative_and_jsonl_round_trips(tmp_path):
+    tracer = Tracer()
+    for tokens in (10, 20):
+        with span("embed_query", "embeddings", tracer=tracer, input_tokens=tokens):
+            pass
+    text = tracer.prometheus()
+    assert 'agentic_rag_span_duration_seconds_bucket{kind="embeddings",name="embed_query",le="+Inf"} 2' in text
+    assert 'agentic_rag_tokens_total{kind="embeddings",name="embed_query",direction="input"} 30' in text
+    assert tracer.summary()[0]["count"] == 2
+    path = tmp_path / "spans.jsonl"
+    assert tracer.export_jsonl(str(path)) == 2
+    assert [json.loads(line)["attributes"]["input_tokens"] for line in path.read_text().splitlines()] == [10, 20]
+
+def test_export_path_appends_every_span(tmp_path):
+    path = tmp_path / "live.jsonl"
+    tracer = Tracer(export_path=str(path))
+    with span("qdrant.search", "vectorstore", tracer=tracer):
+        pass
+    assert json.loads(path.read_text())["name"] == "qdrant.search"
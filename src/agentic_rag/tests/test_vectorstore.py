@@ -3,7 +3,12 @@ import hashlib
 import pytest
 from unittest.mock import MagicMock, patch
 
-from vectorstore import calculate_knowledge_hash, split_documents, build_qdrant_vectorstore
+from types import SimpleNamespace
+
+from langchain_core.documents import Document
+
+from chunker import chunk_overlap, get_splitter
+from vectorstore import calculate_knowledge_hash, split_documents, build_qdrant_vectorstore, chunk_id, read_knowledge_version, write_knowledge_version, drop_collection
 
 class DummyUploaded:
     def __init__(self, name, content: bytes):
@@ -15,27 +20,33 @@ class DummyUploaded:
 def test_calculate_knowledge_hash_single_file():
     f = DummyUploaded("a.txt", b"abc123")
     h = calculate_knowledge_hash([f])
-    expected = hashlib.md5(f.getvalue().decode(errors="ignore").encode()).hexdigest()
+    expected = hashlib.sha256(f"{hashlib.sha256(b'abc123').hexdigest()} a.txt\n".encode()).hexdigest()
     assert h == expected
 
-@patch("vectorstore.RecursiveCharacterTextSplitter")
-def test_split_documents_calls_text_splitter(mock_splitter_class):
-    # Prepare fake documents
-    docs = [type("D", (), {"page_content": "x" * 1000})()]
-    mock_splitter = MagicMock()
-    mock_splitter.split_documents.return_value = ["chunk1", "chunk2"]
-    mock_splitter_class.from_tiktoken_encoder.return_value = mock_splitter
+@patch("chunker.RecursiveCharacterTextSplitter")
+def test_split_documents_reuses_one_text_splitter(mock_splitter_class):
+    get_splitter.cache_clear()
+    try:
+        docs = [type("D", (), {"page_content": "x" * 1000, "metadata": {"source": "a.txt"}})()]
+        mock_splitter_class.return_value.create_documents.side_effect = lambda texts, metadatas: [
+            Document(page_content=f"chunk{n}", metadata=dict(metadatas[0])) for n in (1, 2)
+        ]
 
-    res = split_documents(docs, chunk_size=250)
-    assert res == ["chunk1", "chunk2"]
-    mock_splitter_class.from_tiktoken_encoder.assert_called_once()
+        res = split_documents(docs, chunk_size=250)
+        split_documents(docs, chunk_size=250)
+        assert [d.page_content for d in res] == ["chunk1", "chunk2"]
+        assert res[0].metadata == {"source": "a.txt", "chunk_size": 250, "chunk_overlap": chunk_overlap(250), "token_count": 1}
+        mock_splitter_class.assert_called_once()
+        assert mock_splitter_class.call_args.kwargs["chunk_overlap"] == chunk_overlap(250)
+    finally:
+        get_splitter.cache_clear()
 
-def test_build_qdrant_vectorstore_handles_qdrant_recreate_exception(monkeypatch, tmp_path):
-    # Simulate a QdrantClient that raises on recreate_collection
+def test_build_qdrant_vectorstore_handles_qdrant_collection_exception(monkeypatch, tmp_path):
+    # Simulate a QdrantClient that raises when the collection is looked up
     class BadClient:
         def __init__(self, *a, **k):
             pass
-        def recreate_collection(self, *a, **k):
+        def collection_exists(self, *a, **k):
             raise RuntimeError("qdrant unavailable")
 
     monkeypatch.setenv("GOOGLE_API_KEY", "fake")
@@ -47,6 +58,153 @@ def test_build_qdrant_vectorstore_handles_qdrant_recreate_exception(monkeypatch,
     monkeypatch.setattr("vectorstore.qdrant_client.http.models.VectorParams", lambda **k: object())
     monkeypatch.setattr("vectorstore.qdrant_client.http.models.Distance", type("D", (), {"COSINE": "cos"}) )
 
-    # Calling build_qdrant_vectorstore should raise the runtime error from recreate_collection
+    # Calling build_qdrant_vectorstore should raise the runtime error from collection_exists
     with pytest.raises(RuntimeError):
         build_qdrant_vectorstore([], google_api_key="g", qdrant_url="u", qdrant_api="a")
+
+
+def _chunk(text, digest, start_index, chunk_size=250):
+    return SimpleNamespace(
+        page_content=text,
+        metadata={"file_digest": digest, "chunk_size": chunk_size, "page": 0, "start_index": start_index},
+    )
+
+def test_chunk_id_is_deterministic_and_depends_on_chunk_size():
+    a = _chunk("hello", "d1", 0)
+    assert chunk_id(a) == chunk_id(_chunk("other text", "d1", 0))
+    assert chunk_id(a) != chunk_id(_chunk("hello", "d1", 0, chunk_size=500))
+    overlapped = _chunk("hello", "d1", 0)
+    overlapped.metadata["chunk_overlap"] = 50
+    assert chunk_id(a) != chunk_id(overlapped)
+    assert chunk_id(a) != chunk_id(_chunk("hello", "d2", 0))
+
+def test_build_qdrant_vectorstore_only_embeds_delta(monkeypatch):
+    kept, removed = _chunk("kept", "d1", 0), _chunk("removed", "d0", 0)
+    added = _chunk("added", "d2", 0)
+
+    client = MagicMock()
+    client.collection_exists.return_value = True
+    client.scroll.return_value = ([SimpleNamespace(id=chunk_id(kept)), SimpleNamespace(id=chunk_id(removed))], None)
+    fake_store = MagicMock()
+    ingested = []
+
+    monkeypatch.setattr("vectorstore.QdrantClient", lambda url, api_key: client)
+    monkeypatch.setattr("vectorstore.GoogleGenerativeAIEmbeddings", lambda **k: MagicMock())
+    monkeypatch.setattr("vectorstore.Qdrant", lambda **k: fake_store)
+    monkeypatch.setattr("vectorstore._retriever_and_tool", lambda *a, **k: (MagicMock(), MagicMock()))
+    monkeypatch.setattr("vectorstore.ingest_batches",
+                        lambda client, name, embeddings, batches, **k: ingested.extend(batches))
+
+    build_qdrant_vectorstore([kept, added], google_api_key="g", qdrant_url="u", qdrant_api="a")
+
+    client.create_collection.assert_not_called()
+    deleted = client.delete.call_args.kwargs["points_selector"].points
+    assert deleted == [chunk_id(removed)]
+    assert ingested == [(["added"], [chunk_id(added)], [{"page": 0, "start_index": 0}])]
+
+def test_build_qdrant_vectorstore_keeps_existing_points_when_ingestion_fails(monkeypatch):
+    client = MagicMock()
+    client.collection_exists.return_value = True
+    client.scroll.return_value = ([SimpleNamespace(id="old-point")], None)
+
+    def failing_ingest(client, name, embeddings, batches, **k):
+        next(iter(batches))
+        raise RuntimeError("embedding provider down")
+
+    monkeypatch.setattr("vectorstore.QdrantClient", lambda url, api_key: client)
+    monkeypatch.setattr("vectorstore.GoogleGenerativeAIEmbeddings", lambda **k: MagicMock())
+    monkeypatch.setattr("vectorstore.Qdrant", lambda **k: MagicMock())
+    monkeypatch.setattr("vectorstore.ingest_batches", failing_ingest)
+
+    chunks = (_chunk(f"text {i}", "d1", i) for i in range(3))
+    with pytest.raises(RuntimeError):
+        build_qdrant_vectorstore(chunks, google_api_key="g", qdrant_url="u", qdrant_api="a")
+    client.delete.assert_not_called()
+
+def test_build_qdrant_vectorstore_attaches_without_sync(monkeypatch):
+    client = MagicMock()
+    client.collection_exists.return_value = True
+    monkeypatch.setattr("vectorstore.QdrantClient", lambda url, api_key: client)
+    monkeypatch.setattr("vectorstore.GoogleGenerativeAIEmbeddings", lambda **k: MagicMock())
+    monkeypatch.setattr("vectorstore.Qdrant", lambda **k: MagicMock())
+    monkeypatch.setattr("vectorstore._retriever_and_tool", lambda *a, **k: (MagicMock(), MagicMock()))
+    monkeypatch.setattr("vectorstore.ingest_batches", lambda *a, **k: pytest.fail("attaching must not ingest"))
+
+    build_qdrant_vectorstore([], google_api_key="g", qdrant_url="u", qdrant_api="a", sync=False)
+    client.scroll.assert_not_called()
+    client.delete.assert_not_called()
+
+def test_knowledge_version_round_trips_next_to_the_index(tmp_path):
+    assert read_knowledge_version("c", str(tmp_path)) == {"knowledge_hash": "", "files": []}
+    write_knowledge_version("abc", ["a.pdf"], "c", str(tmp_path))
+    assert read_knowledge_version("c", str(tmp_path)) == {"knowledge_hash": "abc", "files": ["a.pdf"]}
+
+def test_drop_collection_deletes_the_remote_collection_and_local_files(monkeypatch, tmp_path):
+    client = MagicMock()
+    monkeypatch.setattr("vectorstore.QdrantClient", lambda url, api_key: client)
+    (tmp_path / "c").mkdir()
+    (tmp_path / "c" / "vectors.npy").write_bytes(b"")
+    drop_collection("c", backend="qdrant", qdrant_url="u", qdrant_api="a", index_dir=str(tmp_path))
+    client.delete_collection.assert_called_once_with(collection_name="c")
+    assert not (tmp_path / "c").exists()
+
+def _blank_pdf(pages):
+    import io
+    from pypdf import PdfWriter
+    writer = PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(width=72, height=72)
+    buf = io.BytesIO()
+    writer.write(buf)
+    return buf.getvalue()
+
+def test_load_uploaded_docs_parses_from_memory_and_reports_per_file(monkeypatch, dummy_txt_upload, dummy_empty_upload):
+    errors = []
+    monkeypatch.setattr("vectorstore.st.error", errors.append)
+    broken = DummyUploaded("broken.pdf", b"not a pdf")
+
+    from vectorstore import load_uploaded_docs
+    docs = load_uploaded_docs([dummy_txt_upload, dummy_empty_upload, broken], parallel=False)
+
+    assert [d.page_content for d in docs] == ["hello world from test"]
+    assert docs[0].metadata["source"] == "example.txt"
+    assert docs[0].metadata["file_digest"] == hashlib.sha256(b"hello world from test").hexdigest()
+    assert len(errors) == 2 and "empty.txt" in errors[0] and "broken.pdf" in errors[1]
+
+def test_load_uploaded_docs_splits_pdfs_into_page_range_tasks_in_process_pool(dummy_txt_upload):
+    from vectorstore import load_uploaded_docs
+    pdf = DummyUploaded("big.pdf", _blank_pdf(5))
+    docs = load_uploaded_docs([pdf, dummy_txt_upload], parallel=True, max_workers=2, pages_per_task=2, min_parallel_bytes=0)
+    assert [d.metadata.get("page") for d in docs] == [0, 1, 2, 3, 4, None]
+    assert {d.metadata["source"] for d in docs} == {"big.pdf", "example.txt"}
+
+def test_load_uploaded_docs_parses_small_uploads_in_process(monkeypatch, dummy_txt_upload):
+    import vectorstore
+    monkeypatch.setattr(vectorstore, "_get_load_pool", lambda max_workers: pytest.fail("small uploads must not start a pool"))
+    pdf = DummyUploaded("small.pdf", _blank_pdf(3))
+    docs = vectorstore.load_uploaded_docs([pdf, dummy_txt_upload], parallel=True, max_workers=2, pages_per_task=1)
+    assert [d.metadata.get("page") for d in docs] == [0, 1, 2, None]
+
+def test_build_qdrant_vectorstore_indexes_payload_and_honours_k(monkeypatch):
+    from langchain_community.vectorstores import Qdrant
+    from qdrant_client import QdrantClient
+    client = MagicMock(spec=QdrantClient)
+    client.collection_exists.return_value = False
+    client.scroll.return_value = ([], None)
+    monkeypatch.setattr("vectorstore.QdrantClient", lambda url, api_key: client)
+    monkeypatch.setattr("vectorstore.GoogleGenerativeAIEmbeddings", lambda **k: MagicMock())
+    monkeypatch.setattr("vectorstore.ingest_batches", lambda *a, **k: 0)
+
+    retriever, _ = build_qdrant_vectorstore([], google_api_key="g", qdrant_url="u", qdrant_api="a",
+                                            retrieval_mode="dense", k=7, score_threshold=0.5)
+
+    indexed = {call.kwargs["field_name"] for call in client.create_payload_index.call_args_list}
+    assert indexed == {"metadata.source", "metadata.page"}
+    assert retriever.search_kwargs == {"k": 7, "score_threshold": 0.5}
+
+    # a source restriction becomes a native Qdrant filter on the indexed field
+    with patch.object(Qdrant, "similarity_search", return_value=[]) as search:
+        retriever.invoke("question", sources=["a.pdf", "b.txt"])
+    pushed = search.call_args.kwargs["filter"].must[0]
+    assert pushed.key == "metadata.source" and pushed.match.any == ["a.pdf", "b.txt"]
+    assert search.call_args.kwargs["k"] == 7
@@ -0,0 +1,67 @@
+# tests/test_weather_cache.py
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+import agents
+from config import AgentState
+from gazetteer import get_city_gazetteer
+from weather_cache import WeatherCache
+
+def test_bundled_gazetteer_finds_cities_and_aliases():
+    gazetteer = get_city_gazetteer()
+    assert gazetteer.find("What's the weather in new york city today?") == "New York"
+    assert gazetteer.find("Is it raining in Bombay?") == "Mumbai"
+    assert gazetteer.find("Summarize the resume") is None
+
+def test_ttl_cache_hits_until_expiry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("weather_cache.time.time", lambda: now[0])
+    cache = WeatherCache(ttl_seconds=60)
+    fetch = MagicMock(side_effect=lambda city: f"sunny in {city}")
+    assert cache.get("Delhi", fetch) == "sunny in Delhi"
+    assert cache.get(" delhi ", fetch) == "sunny in Delhi"
+    now[0] += 61
+    cache.get("Delhi", fetch)
+    assert fetch.call_count == 2
+    assert cache.stats()["hits"] == 1
+
+def test_concurrent_lookups_are_coalesced():
+    cache = WeatherCache()
+    calls = []
+
+    def slow_fetch(city):
+        calls.append(city)
+        time.sleep(0.1)
+        return "rainy"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get("Pune", slow_fetch))) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == ["rainy"] * 5
+    assert len(calls) == 1
+    assert cache.stats()["coalesced"] == 4
+
+def test_failures_are_not_cached():
+    cache = WeatherCache()
+    with pytest.raises(RuntimeError):
+        cache.get("Paris", MagicMock(side_effect=RuntimeError("down")))
+    assert cache.get("Paris", lambda city: "clear") == "clear"
+
+def test_weather_agent_skips_llm_when_city_is_known(monkeypatch):
+    chat = MagicMock()
+    monkeypatch.setattr(agents, "get_chat_model", chat)
+    tool = MagicMock()
+    tool.run.return_value = "Weather in London: 12C"
+    cache = WeatherCache()
+    state = AgentState(current_query="How warm is London right now?")
+    for _ in range(2):
+        result = agents.weather_search_agent(state, weather_search_tool=tool, temperature=0.0, weather_cache=cache)
+    assert result["retrieved_docs"][0]["content"] == "Weather in London: 12C"
+    tool.run.assert_called_once_with("London")
+    chat.assert_not_called()
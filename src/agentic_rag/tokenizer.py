@@ -0,0 +1,45 @@
+import re
+import functools
+from typing import Any, Optional
+from config import TOKENIZER_ENCODING
+
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+
+class Tokenizer:
+    """Token counting/truncation over a tiktoken encoding.
+
+    Without an encoding (tiktoken missing, or its vocabulary cannot be
+    downloaded) words and punctuation marks are counted instead, which
+    tracks BPE counts closely enough for budgeting.
+    """
+
+    def __init__(self, encoding: Optional[Any] = None):
+        self.encoding = encoding
+        self.name = encoding.name if encoding is not None else "approximate"
+
+    def count(self, text: str) -> int:
+        if self.encoding is not None:
+            return len(self.encoding.encode(text, disallowed_special=()))
+        return sum(1 for _ in _TOKEN_RE.finditer(text))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        if max_tokens <= 0:
+            return ""
+        if self.encoding is not None:
+            tokens = self.encoding.encode(text, disallowed_special=())
+            return text if len(tokens) <= max_tokens else self.encoding.decode(tokens[:max_tokens])
+        for n, match in enumerate(_TOKEN_RE.finditer(text), 1):
+            if n == max_tokens:
+                return text[:match.end()]
+        return text
+
+
+@functools.lru_cache(maxsize=None)
+def get_tokenizer(encoding_name: str = TOKENIZER_ENCODING) -> Tokenizer:
+    try:
+        import tiktoken
+        return Tokenizer(tiktoken.get_encoding(encoding_name))
+    except Exception:
+        return Tokenizer()
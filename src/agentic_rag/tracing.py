@@ -0,0 +1,264 @@
+import json
+import time
+import uuid
+import asyncio
+import threading
+import contextlib
+import contextvars
+import functools
+from bisect import bisect_left
+from collections import deque
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from langchain_core.callbacks import BaseCallbackHandler
+from config import TRACE_BUFFER_SIZE, TRACE_EXPORT_PATH
+
+
+# seconds; the upper bounds of the Prometheus histogram buckets
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_CURRENT: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("agentic_rag_span", default=None)
+
+
+class Span:
+    """One timed operation: a graph node or a call to the LLM, embeddings, vector store or weather API.
+
+    ``attributes`` holds counts such as ``input_tokens``, ``output_tokens``
+    and ``documents``; ``error`` is set when the operation raised.
+    """
+
+    def __init__(self, name: str, kind: str, trace_id: Optional[str] = None, parent_id: Optional[str] = None, **attributes: Any):
+        self.name = name
+        self.kind = kind
+        self.span_id = uuid.uuid4().hex[:16]
+        self.trace_id = trace_id or uuid.uuid4().hex
+        self.parent_id = parent_id
+        self.start_time = time.time()
+        self.duration_ms: Optional[float] = None
+        self.attributes: Dict[str, Any] = dict(attributes)
+        self.error: Optional[str] = None
+        self._started = time.perf_counter()
+
+    def set(self, **attributes: Any) -> "Span":
+        self.attributes.update(attributes)
+        return self
+
+    def finish(self, error: Optional[BaseException] = None) -> "Span":
+        self.duration_ms = (time.perf_counter() - self._started) * 1000
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_time": self.start_time,
+            "duration_ms": self.duration_ms,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class _Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.errors = 0
+        self.tokens = {"input": 0, "output": 0}
+
+    def observe(self, span: Span) -> None:
+        seconds = span.duration_ms / 1000
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.errors += span.error is not None
+        self.tokens["input"] += int(span.attributes.get("input_tokens") or 0)
+        self.tokens["output"] += int(span.attributes.get("output_tokens") or 0)
+
+
+class Tracer:
+    """Process-wide span sink.
+
+    Finished spans feed per-(kind, name) histograms for the whole process
+    life, are kept in a ring buffer of the last ``buffer_size`` for
+    percentiles and per-query views, and are appended to ``export_path`` as
+    JSON lines when it is set.
+    """
+
+    def __init__(self, buffer_size: int = TRACE_BUFFER_SIZE, export_path: str = TRACE_EXPORT_PATH):
+        self.export_path = export_path
+        self._spans: deque = deque(maxlen=buffer_size)
+        self._histograms: Dict[Tuple[str, str], _Histogram] = {}
+        self._lock = threading.Lock()
+
+    def record(self, span: Span) -> None:
+        with self._lock:
+            self._spans.append(span)
+            self._histograms.setdefault((span.kind, span.name), _Histogram()).observe(span)
+            if self.export_path:
+                with open(self.export_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(span.to_dict(), default=str) + "\n")
+
+    def spans(self, trace_id: Optional[str] = None) -> List[Span]:
+        with self._lock:
+            return [span for span in self._spans if trace_id is None or span.trace_id == trace_id]
+
+    def export_jsonl(self, path: str, trace_id: Optional[str] = None) -> int:
+        spans = self.spans(trace_id)
+        with open(path, "w", encoding="utf-8") as f:
+            for span in spans:
+                f.write(json.dumps(span.to_dict(), default=str) + "\n")
+        return len(spans)
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """Count, p50, p95 and max latency per (kind, name) over the buffered spans, slowest p95 first."""
+        durations: Dict[Tuple[str, str], List[float]] = {}
+        errors: Dict[Tuple[str, str], int] = {}
+        for span in self.spans():
+            key = (span.kind, span.name)
+            durations.setdefault(key, []).append(span.duration_ms)
+            errors[key] = errors.get(key, 0) + (span.error is not None)
+        rows = []
+        for (kind, name), values in durations.items():
+            values.sort()
+            rows.append({
+                "kind": kind,
+                "name": name,
+                "count": len(values),
+                "p50_ms": values[int(0.50 * (len(values) - 1))],
+                "p95_ms": values[int(0.95 * (len(values) - 1))],
+                "max_ms": values[-1],
+                "errors": errors[(kind, name)],
+            })
+        return sorted(rows, key=lambda row: row["p95_ms"], reverse=True)
+
+    def prometheus(self, prefix: str = "agentic_rag") -> str:
+        """Histograms in the Prometheus text exposition format."""
+        lines = [
+            f"# HELP {prefix}_span_duration_seconds Wall time of graph nodes and external calls.",
+            f"# TYPE {prefix}_span_duration_seconds histogram",
+        ]
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            for (kind, name), histogram in histograms:
+                labels = f'kind="{kind}",name="{name}"'
+                cumulative = 0
+                for bound, count in zip(BUCKETS + (float("inf"),), histogram.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'{prefix}_span_duration_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+                lines.append(f"{prefix}_span_duration_seconds_sum{{{labels}}} {histogram.sum:.6f}")
+                lines.append(f"{prefix}_span_duration_seconds_count{{{labels}}} {cumulative}")
+            lines += [f"# HELP {prefix}_span_errors_total Spans that ended in an error.", f"# TYPE {prefix}_span_errors_total counter"]
+            for (kind, name), histogram in histograms:
+                lines.append(f'{prefix}_span_errors_total{{kind="{kind}",name="{name}"}} {histogram.errors}')
+            lines += [f"# HELP {prefix}_tokens_total Tokens sent to and received from models.", f"# TYPE {prefix}_tokens_total counter"]
+            for (kind, name), histogram in histograms:
+                for direction, count in histogram.tokens.items():
+                    if count:
+                        lines.append(f'{prefix}_tokens_total{{kind="{kind}",name="{name}",direction="{direction}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def clear(self) -> None:
+        with self._lock:
+            self._spans.clear()
+            self._histograms.clear()
+
+
+TRACER = Tracer()
+
+
+def current_span() -> Optional[Span]:
+    return _CURRENT.get()
+
+
+@contextlib.contextmanager
+def span(name: str, kind: str, tracer: Optional[Tracer] = None, **attributes: Any) -> Iterator[Span]:
+    """Time the block as a child of the current span (or as a new trace)."""
+    parent = _CURRENT.get()
+    current = Span(name, kind, parent.trace_id if parent else None, parent.span_id if parent else None, **attributes)
+    token = _CURRENT.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.finish(e)
+        raise
+    else:
+        current.finish()
+    finally:
+        _CURRENT.reset(token)
+        (tracer or TRACER).record(current)
+
+
+def _result_attributes(result: Any) -> Dict[str, Any]:
+    # node outputs are partial AgentState dicts
+    if not isinstance(result, dict):
+        return {}
+    attributes = {}
+    if "retrieved_docs" in result:
+        attributes["documents"] = len(result["retrieved_docs"] or [])
+    if "next_step" in result:
+        attributes["next_step"] = result["next_step"]
+    if result.get("cache_hit"):
+        attributes["cache_hit"] = True
+    attributes.update({key: value for key, value in (result.get("generation_metrics") or {}).items() if key.endswith("tokens")})
+    return attributes
+
+
+def traced(fn: Callable, name: Optional[str] = None, kind: str = "node") -> Callable:
+    """Wrap a sync or async agent so each call is a span named after it."""
+    name = name or getattr(fn, "__name__", None) or getattr(getattr(fn, "func", None), "__name__", "node")
+    if asyncio.iscoroutinefunction(getattr(fn, "func", fn)):
+        @functools.wraps(fn)
+        async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+            with span(name, kind) as current:
+                result = await fn(*args, **kwargs)
+                current.set(**_result_attributes(result))
+                return result
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        with span(name, kind) as current:
+            result = fn(*args, **kwargs)
+            current.set(**_result_attributes(result))
+            return result
+    return wrapper
+
+
+class LLMTracingHandler(BaseCallbackHandler):
+    """LangChain callback that records every chat model call as an ``llm`` span with token usage."""
+
+    # inline, so the current span is still the calling node's
+    run_inline = True
+
+    def __init__(self, tracer: Optional[Tracer] = None):
+        self.tracer = tracer
+        self._open: Dict[Any, Span] = {}
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[Any]], *, run_id: Any, **kwargs: Any) -> None:
+        parent = _CURRENT.get()
+        params = kwargs.get("invocation_params") or {}
+        model = params.get("model") or params.get("model_name") or (kwargs.get("metadata") or {}).get("ls_model_name") or (serialized or {}).get("name") or "chat_model"
+        self._open[run_id] = Span(model, "llm", parent.trace_id if parent else None, parent.span_id if parent else None)
+
+    def on_llm_end(self, response: Any, *, run_id: Any, **kwargs: Any) -> None:
+        current = self._open.pop(run_id, None)
+        if current is None:
+            return
+        usage = {}
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or usage
+        if not usage:
+            token_usage = (response.llm_output or {}).get("token_usage") or {}
+            usage = {"input_tokens": token_usage.get("prompt_tokens"), "output_tokens": token_usage.get("completion_tokens")}
+        current.set(input_tokens=usage.get("input_tokens"), output_tokens=usage.get("output_tokens"))
+        (self.tracer or TRACER).record(current.finish())
+
+    def on_llm_error(self, error: BaseException, *, run_id: Any, **kwargs: Any) -> None:
+        current = self._open.pop(run_id, None)
+        if current is not None:
+            (self.tracer or TRACER).record(current.finish(error))
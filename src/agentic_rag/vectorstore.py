@@ -1,77 +1,366 @@
 import os
-import tempfile
-import hashlib
-from typing import List, Any
-import streamlit as st
-from langchain_community.document_loaders import TextLoader, PyPDFLoader, Docx2txtLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from langchain_core.tools import create_retriever_tool
-from langchain_community.vectorstores import Qdrant
-from qdrant_client import QdrantClient
-import qdrant_client
-
-
-def load_uploaded_docs(uploaded_files: List[Any]):
-    docs = []
-    for uploaded_file in uploaded_files:
+import json
+import shutil
+import contextlib
+import uuid
+import threading
+import multiprocessing
+from collections import deque
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking for the local index
+    fcntl = None
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Any, Callable, Dict, Set, Optional, Iterable, Iterator
+from langchain_core.documents import Document
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.vectorstores import VectorStoreRetriever
+from config import (
+    EMBEDDING_MODEL, EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_MAX_ENTRIES,
+    INGEST_BATCH_SIZE, INGEST_MAX_WORKERS, INGEST_QUEUE_SIZE,
+    LOAD_PARALLEL, LOAD_MAX_WORKERS, LOAD_PAGES_PER_TASK, LOAD_PARALLEL_MIN_BYTES,
+    VECTOR_BACKEND, LOCAL_INDEX_DIR, RETRIEVAL_MODE, HYBRID_CANDIDATES, RETRIEVER_SCORE_THRESHOLD,
+    SECRETS,
+)
+from parsers import SUPPORTED_EXTENSIONS, file_digest, file_extension, parse_task, pdf_page_count
+from knowledge_manifest import build_manifest, get_file_digest
+from chunker import ChunkIndex, iter_chunks
+from embedding_cache import CachedEmbeddings
+from ingestion import ingest_batches, embed_batches, chunk_batches, ProgressCallback
+from local_index import NumpyVectorStore
+from lexical_index import BM25Index, HybridRetriever
+from tracing import span
+from startup import LazyImports, LazyModule, timed
+
+# client libraries are imported on first use; see startup.py
+st = LazyModule("streamlit")
+qdrant_client = LazyModule("qdrant_client")
+_lazy = LazyImports(
+    globals(),
+    GoogleGenerativeAIEmbeddings="langchain_google_genai:GoogleGenerativeAIEmbeddings",
+    create_retriever_tool="langchain_core.tools:create_retriever_tool",
+    Qdrant="langchain_community.vectorstores:Qdrant",
+    QdrantClient="qdrant_client:QdrantClient",
+)
+__getattr__ = _lazy
+
+
+# v2: points carry source/page/offset payloads; older payload-less points
+# get new IDs and are re-ingested once. The key also covers chunk_overlap, so
+# changing the overlap re-ingests once as well.
+CHUNK_ID_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "agentic_rag/chunks/v2")
+
+PAYLOAD_FIELDS = ("source", "page", "start_index", "token_count")
+
+_EMBEDDINGS: Dict[str, CachedEmbeddings] = {}
+_LOCAL_STORES: Dict[str, NumpyVectorStore] = {}
+_LEXICAL_INDEXES: Dict[str, BM25Index] = {}
+
+
+def _show_error(message: str) -> None:
+    st.error(message)
+
+
+def _loading_tasks(uploaded_files: List[Any], pages_per_task: int, on_error: Callable[[str], None] = _show_error):
+    for index, uploaded_file in enumerate(uploaded_files):
+        data = uploaded_file.getvalue()
+        if not data:
+            on_error(f"Uploaded file {uploaded_file.name} is empty and was skipped.")
+            continue
+        if file_extension(uploaded_file.name) not in SUPPORTED_EXTENSIONS:
+            on_error(f"Unsupported file type: {uploaded_file.name}")
+            continue
+        page_ranges = [None]
+        if file_extension(uploaded_file.name) == ".pdf" and pages_per_task > 0:
+            try:
+                total_pages = pdf_page_count(data)
+            except Exception:
+                total_pages = 0
+            if total_pages > pages_per_task:
+                page_ranges = [(start, start + pages_per_task) for start in range(0, total_pages, pages_per_task)]
+        digest = get_file_digest(uploaded_file)
+        for page_range in page_ranges:
+            yield index, uploaded_file.name, data, page_range, digest
+
+
+def _upload_size(uploaded_file: Any) -> int:
+    size = getattr(uploaded_file, "size", None)
+    return int(size) if size is not None else len(uploaded_file.getvalue())
+
+
+_LOAD_POOL: Optional[ProcessPoolExecutor] = None
+_LOAD_POOL_WORKERS = 0
+_LOAD_POOL_LOCK = threading.Lock()
+
+
+def _get_load_pool(max_workers: Optional[int]) -> ProcessPoolExecutor:
+    # kept for the life of the process, like chunker's: spawning workers costs more than parsing small uploads
+    global _LOAD_POOL, _LOAD_POOL_WORKERS
+    with _LOAD_POOL_LOCK:
+        if _LOAD_POOL is None:
+            _LOAD_POOL_WORKERS = max_workers or os.cpu_count() or 1
+            _LOAD_POOL = ProcessPoolExecutor(max_workers=_LOAD_POOL_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _LOAD_POOL
+
+
+def iter_uploaded_docs(uploaded_files: List[Any], parallel: bool = LOAD_PARALLEL, max_workers: Optional[int] = LOAD_MAX_WORKERS, pages_per_task: int = LOAD_PAGES_PER_TASK, on_error: Optional[Callable[[str], None]] = None, min_parallel_bytes: int = LOAD_PARALLEL_MIN_BYTES) -> Iterator[Document]:
+    """Yield parsed pages in upload order, optionally parsing in a process pool.
+
+    Each task is one file or one PDF page range. Uploads under
+    ``min_parallel_bytes`` in total, a single task or a single worker are
+    parsed in-process; otherwise tasks go to one pool kept for the process.
+    At most two tasks per worker are outstanding, so parsed pages never pile
+    up ahead of the consumer. Per-file problems go to ``on_error`` (shown in
+    the Streamlit page by default).
+    """
+    on_error = on_error or _show_error
+    total_bytes = sum(_upload_size(uploaded_file) for uploaded_file in uploaded_files)
+    parallel = parallel and total_bytes >= min_parallel_bytes and (max_workers or os.cpu_count() or 1) > 1
+    tasks = list(_loading_tasks(uploaded_files, pages_per_task if parallel else 0, on_error))
+    failed = set()
+
+    def emit(task, result):
+        index, name = task[0], task[1]
+        file_docs, error = result
+        if error is not None:
+            if index not in failed:
+                on_error(f"Failed to load uploaded file {name}: {error}")
+            failed.add(index)
+            return []
+        return file_docs
+
+    if parallel and len(tasks) > 1:
+        pool = _get_load_pool(max_workers)
+        window = deque()
+        for task in tasks:
+            window.append((task, pool.submit(parse_task, *task[1:])))
+            if len(window) >= 2 * _LOAD_POOL_WORKERS:
+                task, future = window.popleft()
+                yield from emit(task, future.result())
+        while window:
+            task, future = window.popleft()
+            yield from emit(task, future.result())
+    else:
+        for task in tasks:
+            yield from emit(task, parse_task(*task[1:]))
+
+
+def load_uploaded_docs(uploaded_files: List[Any], parallel: bool = LOAD_PARALLEL, max_workers: Optional[int] = LOAD_MAX_WORKERS, pages_per_task: int = LOAD_PAGES_PER_TASK, on_error: Optional[Callable[[str], None]] = None, min_parallel_bytes: int = LOAD_PARALLEL_MIN_BYTES):
+    return list(iter_uploaded_docs(uploaded_files, parallel=parallel, max_workers=max_workers, pages_per_task=pages_per_task, on_error=on_error, min_parallel_bytes=min_parallel_bytes))
+
+
+def iter_split_documents(docs: Iterable[Any], chunk_size: int = 250, chunk_overlap: Optional[int] = None, index: Optional[ChunkIndex] = None) -> Iterator[Any]:
+    return iter_chunks(docs, chunk_size=chunk_size, overlap=chunk_overlap, index=index)
+
+
+def split_documents(docs: List[Any], chunk_size: int = 250, chunk_overlap: Optional[int] = None, index: Optional[ChunkIndex] = None):
+    return list(iter_split_documents(docs, chunk_size=chunk_size, chunk_overlap=chunk_overlap, index=index))
+
+
+def chunk_id(doc: Any) -> str:
+    """Deterministic point ID from (file digest, chunk_size, overlap, page, chunk offset)."""
+    metadata = getattr(doc, "metadata", None) or {}
+    digest = metadata.get("file_digest") or file_digest(doc.page_content.encode())
+    key = f"{digest}:{metadata.get('chunk_size', '')}:{metadata.get('chunk_overlap', '')}:{metadata.get('page', 0)}:{metadata.get('start_index', 0)}"
+    return str(uuid.uuid5(CHUNK_ID_NAMESPACE, key))
+
+
+def _existing_point_ids(client: Any, collection_name: str, page_size: int = 1024) -> Set[str]:
+    ids = set()
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection_name,
+            limit=page_size,
+            offset=offset,
+            with_payload=False,
+            with_vectors=False,
+        )
+        ids.update(str(point.id) for point in points)
+        if offset is None:
+            return ids
+
+
+def get_embeddings(google_api_key: str) -> CachedEmbeddings:
+    # One cache per API key for the whole process, so reruns reuse hit/miss counts
+    if google_api_key not in _EMBEDDINGS:
+        with timed("embeddings client"):
+            _EMBEDDINGS[google_api_key] = CachedEmbeddings(
+                _lazy.get("GoogleGenerativeAIEmbeddings")(model=EMBEDDING_MODEL, google_api_key=google_api_key),
+                model_name=EMBEDDING_MODEL,
+                path=EMBEDDING_CACHE_PATH,
+                max_entries=EMBEDDING_CACHE_MAX_ENTRIES,
+            )
+    return _EMBEDDINGS[google_api_key]
+
+
+def embedding_cache_stats() -> Dict[str, int]:
+    hits = sum(cache.hits for cache in _EMBEDDINGS.values())
+    misses = sum(cache.misses for cache in _EMBEDDINGS.values())
+    return {"hits": hits, "misses": misses}
+
+
+def _new_chunks(doc_splits: Iterable[Any], existing_ids: Set[str], seen_ids: Set[str], lexical_index: Optional[BM25Index] = None):
+    # Only chunks whose ID is not already stored get embedded. doc_splits may
+    # be a generator; only point IDs are kept for the whole corpus.
+    for doc in doc_splits:
+        point_id = chunk_id(doc)
+        if point_id in seen_ids:
+            continue
+        seen_ids.add(point_id)
+        metadata = getattr(doc, "metadata", None) or {}
+        payload = {field: metadata[field] for field in PAYLOAD_FIELDS if field in metadata}
+        if lexical_index is not None and point_id not in lexical_index:
+            lexical_index.add(point_id, doc.page_content, payload)
+        if point_id not in existing_ids:
+            yield doc.page_content, point_id, payload
+
+
+@contextlib.contextmanager
+def index_lock(path: str, exclusive: bool = False) -> Iterator[None]:
+    """Advisory lock shared by every process using the local index at ``path``.
+
+    Builds hold it exclusively from load to save; readers hold it shared while
+    re-reading, so they never see a half-replaced index.
+    """
+    if fcntl is None:
+        yield
+        return
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, ".lock"), "a") as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
         try:
-            with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(uploaded_file.name)[1]) as temp_file:
-                temp_file.write(uploaded_file.getvalue())
-                temp_file_path = temp_file.name
-
-            if os.path.getsize(temp_file_path) == 0:
-                st.error(f"Uploaded file {uploaded_file.name} is empty and was skipped.")
-                os.unlink(temp_file_path)
-                continue
-
-            ext = os.path.splitext(uploaded_file.name)[1].lower()
-            if ext == ".txt":
-                loader = TextLoader(temp_file_path, encoding="utf-8")
-            elif ext == ".pdf":
-                loader = PyPDFLoader(temp_file_path)
-            elif ext == ".docx":
-                loader = Docx2txtLoader(temp_file_path)
-            else:
-                st.error(f"Unsupported file type: {uploaded_file.name}")
-                os.unlink(temp_file_path)
-                continue
-
-            file_docs = loader.load()
-            for doc in file_docs:
-                if not hasattr(doc, "metadata") or doc.metadata is None:
-                    doc.metadata = {}
-                doc.metadata["source"] = uploaded_file.name
-            docs.extend(file_docs)
-            os.unlink(temp_file_path)
-        except Exception as e:
-            st.error(f"Failed to load uploaded file {uploaded_file.name}: {str(e)}")
-    return docs
-
-
-def split_documents(docs: List[Any], chunk_size: int = 250):
-    text_splitter = RecursiveCharacterTextSplitter.from_tiktoken_encoder(
-        chunk_size=chunk_size, chunk_overlap=100
-    )
-    return text_splitter.split_documents(docs)
+            yield
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def get_lexical_index(collection_name: str, index_dir: str = LOCAL_INDEX_DIR) -> BM25Index:
+    path = os.path.join(index_dir, collection_name)
+    if path not in _LEXICAL_INDEXES:
+        _LEXICAL_INDEXES[path] = BM25Index.load(path)
+    else:
+        _LEXICAL_INDEXES[path].refresh(path)
+    return _LEXICAL_INDEXES[path]
+
+
+def release_local_indexes(collection_name: str, index_dir: str = LOCAL_INDEX_DIR) -> None:
+    """Drop a collection's in-memory indexes; the saved files stay and are reloaded on next use."""
+    path = os.path.join(index_dir, collection_name)
+    _LOCAL_STORES.pop(path, None)
+    _LEXICAL_INDEXES.pop(path, None)
+
 
+def drop_collection(collection_name: str, backend: str = VECTOR_BACKEND, qdrant_url: Optional[str] = None, qdrant_api: Optional[str] = None, index_dir: str = LOCAL_INDEX_DIR) -> None:
+    """Delete a collection for good: the Qdrant collection and the saved local and lexical indexes."""
+    release_local_indexes(collection_name, index_dir)
+    if backend == "qdrant":
+        client = _lazy.get("QdrantClient")(qdrant_url or SECRETS["QDRANT_URL"], api_key=qdrant_api or SECRETS["QDRANT_API"])
+        client.delete_collection(collection_name=collection_name)
+    path = os.path.join(index_dir, collection_name)
+    with index_lock(path, exclusive=True):
+        shutil.rmtree(path, ignore_errors=True)
 
-def build_qdrant_vectorstore(doc_splits: List[Any], google_api_key: str, qdrant_url: str, qdrant_api: str, collection_name: str = "agentic_collection"):
-    embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001", google_api_key=google_api_key)
 
-    client = QdrantClient(
-        qdrant_url,
-        api_key=qdrant_api
+def refresh_local_indexes() -> int:
+    """Pick up indexes saved by other worker processes; returns how many were reloaded."""
+    reloaded = 0
+    for path, index in list(_LOCAL_STORES.items()) + list(_LEXICAL_INDEXES.items()):
+        with index_lock(path):
+            reloaded += index.refresh(path)
+    return reloaded
+
+
+def _sync_lexical_index(lexical_index: Optional[BM25Index], seen_ids: Set[str], collection_name: str, index_dir: str = LOCAL_INDEX_DIR):
+    if lexical_index is None:
+        return
+    lexical_index.delete([point_id for point_id in lexical_index.ids() if point_id not in seen_ids])
+    lexical_index.save(os.path.join(index_dir, collection_name))
+
+
+def source_filter(vectorstore: Any, sources: List[str]) -> Any:
+    if isinstance(vectorstore, NumpyVectorStore):
+        return {"source": list(sources)}
+    models = qdrant_client.http.models
+    return models.Filter(must=[
+        models.FieldCondition(key="metadata.source", match=models.MatchAny(any=list(sources)))
+    ])
+
+
+class SourceScopedRetriever(VectorStoreRetriever):
+    """VectorStoreRetriever that turns ``invoke(query, sources=[...])`` into a
+    backend-native filter, so the restriction runs inside the vector search."""
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun, sources: Optional[List[str]] = None, **kwargs: Any) -> List[Document]:
+        if sources:
+            kwargs["filter"] = source_filter(self.vectorstore, sources)
+        with span(f"{type(self.vectorstore).__name__.lower()}.search", "vectorstore", filtered=bool(sources)) as current:
+            docs = super()._get_relevant_documents(query, run_manager=run_manager, **kwargs)
+            current.set(documents=len(docs))
+        return docs
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun, sources: Optional[List[str]] = None, **kwargs: Any) -> List[Document]:
+        if sources:
+            kwargs["filter"] = source_filter(self.vectorstore, sources)
+        with span(f"{type(self.vectorstore).__name__.lower()}.search", "vectorstore", filtered=bool(sources)) as current:
+            docs = await super()._aget_relevant_documents(query, run_manager=run_manager, **kwargs)
+            current.set(documents=len(docs))
+        return docs
+
+
+def _retriever_and_tool(vectorstore: Any, lexical_index: Optional[BM25Index] = None, k: int = 4, score_threshold: Optional[float] = RETRIEVER_SCORE_THRESHOLD):
+    search_kwargs = {"k": HYBRID_CANDIDATES if lexical_index is not None else k}
+    if score_threshold is not None:
+        search_kwargs["score_threshold"] = score_threshold
+    retriever = SourceScopedRetriever(vectorstore=vectorstore, search_kwargs=search_kwargs)
+    if lexical_index is not None:
+        retriever = HybridRetriever(
+            vector_retriever=retriever,
+            lexical_index=lexical_index,
+            k=k,
+            candidates=HYBRID_CANDIDATES,
+        )
+
+    retriever_tool = _lazy.get("create_retriever_tool")(
+        retriever,
+        "retrieve_knowledge",
+        "Search and return information from the provided knowledge sources.",
     )
 
+    return retriever, retriever_tool
+
+
+def build_qdrant_vectorstore(doc_splits: Iterable[Any], google_api_key: str, qdrant_url: str, qdrant_api: str, collection_name: str = "agentic_collection", progress_callback: Optional[ProgressCallback] = None, retrieval_mode: str = RETRIEVAL_MODE, k: int = 4, score_threshold: Optional[float] = RETRIEVER_SCORE_THRESHOLD, sync: bool = True):
+    embeddings = get_embeddings(google_api_key)
+    lexical_index = get_lexical_index(collection_name) if retrieval_mode == "hybrid" else None
+
+    QdrantClient, Qdrant = _lazy.get("QdrantClient", "Qdrant")
+    with timed("qdrant client"):
+        client = QdrantClient(
+            qdrant_url,
+            api_key=qdrant_api
+        )
+
     collection_config = qdrant_client.http.models.VectorParams(
         size=768,
         distance=qdrant_client.http.models.Distance.COSINE
     )
 
-    client.recreate_collection(
+    if not client.collection_exists(collection_name=collection_name):
+        client.create_collection(
+            collection_name=collection_name,
+            vectors_config=collection_config
+        )
+    # indexed payload fields keep source-scoped searches from scanning the collection
+    client.create_payload_index(
         collection_name=collection_name,
-        vectors_config=collection_config
+        field_name="metadata.source",
+        field_schema=qdrant_client.http.models.PayloadSchemaType.KEYWORD,
+    )
+    client.create_payload_index(
+        collection_name=collection_name,
+        field_name="metadata.page",
+        field_schema=qdrant_client.http.models.PayloadSchemaType.INTEGER,
     )
 
     vectorstore = Qdrant(
@@ -79,22 +368,111 @@ def build_qdrant_vectorstore(doc_splits: List[Any], google_api_key: str, qdrant_
         collection_name=collection_name,
         embeddings=embeddings,
     )
+    if not sync:
+        # attach read-only: whatever other processes ingested stays as it is
+        return _retriever_and_tool(vectorstore, lexical_index, k=k, score_threshold=score_threshold)
 
-    texts = [doc.page_content for doc in doc_splits]
-    vectorstore.add_texts(texts)
-    retriever = vectorstore.as_retriever()
-
-    retriever_tool = create_retriever_tool(
-        retriever,
-        "retrieve_knowledge",
-        "Search and return information from the provided knowledge sources.",
+    existing_ids = _existing_point_ids(client, collection_name)
+    seen_ids: Set[str] = set()
+    ingest_batches(
+        client,
+        collection_name,
+        embeddings,
+        chunk_batches(_new_chunks(doc_splits, existing_ids, seen_ids, lexical_index), INGEST_BATCH_SIZE),
+        max_workers=INGEST_MAX_WORKERS,
+        queue_size=INGEST_QUEUE_SIZE,
+        progress_callback=progress_callback,
     )
 
-    return retriever, retriever_tool
+    # Points whose file (or chunk_size) no longer exists are dropped only
+    # after ingestion succeeds, so a failed run never loses vectors.
+    stale_ids = [point_id for point_id in existing_ids if point_id not in seen_ids]
+    if stale_ids:
+        client.delete(
+            collection_name=collection_name,
+            points_selector=qdrant_client.http.models.PointIdsList(points=stale_ids),
+        )
+    _sync_lexical_index(lexical_index, seen_ids, collection_name)
+
+    return _retriever_and_tool(vectorstore, lexical_index, k=k, score_threshold=score_threshold)
+
+
+def get_local_vectorstore(google_api_key: str, collection_name: str = "agentic_collection", index_dir: str = LOCAL_INDEX_DIR) -> NumpyVectorStore:
+    path = os.path.join(index_dir, collection_name)
+    if path not in _LOCAL_STORES:
+        _LOCAL_STORES[path] = NumpyVectorStore.load(path, get_embeddings(google_api_key))
+    else:
+        _LOCAL_STORES[path].refresh(path)
+    return _LOCAL_STORES[path]
+
+
+def build_local_vectorstore(doc_splits: Iterable[Any], google_api_key: str, collection_name: str = "agentic_collection", progress_callback: Optional[ProgressCallback] = None, index_dir: str = LOCAL_INDEX_DIR, retrieval_mode: str = RETRIEVAL_MODE, k: int = 4, score_threshold: Optional[float] = RETRIEVER_SCORE_THRESHOLD, sync: bool = True):
+    if not sync:
+        with index_lock(os.path.join(index_dir, collection_name)):
+            vectorstore = get_local_vectorstore(google_api_key, collection_name, index_dir)
+            lexical_index = get_lexical_index(collection_name, index_dir) if retrieval_mode == "hybrid" else None
+        return _retriever_and_tool(vectorstore, lexical_index, k=k, score_threshold=score_threshold)
+    # one writer at a time across processes sharing index_dir
+    with index_lock(os.path.join(index_dir, collection_name), exclusive=True):
+        return _build_local_vectorstore(doc_splits, google_api_key, collection_name, progress_callback, index_dir, retrieval_mode, k, score_threshold)
+
+
+def _build_local_vectorstore(doc_splits, google_api_key, collection_name, progress_callback, index_dir, retrieval_mode, k, score_threshold):
+    vectorstore = get_local_vectorstore(google_api_key, collection_name, index_dir)
+    lexical_index = get_lexical_index(collection_name, index_dir) if retrieval_mode == "hybrid" else None
+
+    existing_ids = set(vectorstore.ids())
+    seen_ids: Set[str] = set()
+    done = 0
+    for texts, ids, metadatas, vectors in embed_batches(
+        vectorstore.embeddings,
+        chunk_batches(_new_chunks(doc_splits, existing_ids, seen_ids, lexical_index), INGEST_BATCH_SIZE),
+        max_workers=INGEST_MAX_WORKERS,
+        queue_size=INGEST_QUEUE_SIZE,
+    ):
+        vectorstore.add_vectors(vectors, texts, metadatas, ids)
+        done += len(ids)
+        if progress_callback:
+            progress_callback(done, None)
+
+    vectorstore.delete([point_id for point_id in existing_ids if point_id not in seen_ids])
+    vectorstore.save(os.path.join(index_dir, collection_name))
+    _sync_lexical_index(lexical_index, seen_ids, collection_name, index_dir)
+
+    return _retriever_and_tool(vectorstore, lexical_index, k=k, score_threshold=score_threshold)
+
+
+def build_vectorstore(doc_splits: Iterable[Any], google_api_key: str, qdrant_url: str, qdrant_api: str, collection_name: str = "agentic_collection", progress_callback: Optional[ProgressCallback] = None, backend: str = VECTOR_BACKEND, k: int = 4, score_threshold: Optional[float] = RETRIEVER_SCORE_THRESHOLD, sync: bool = True):
+    """Sync the collection to ``doc_splits`` and return (retriever, tool); ``sync=False`` only attaches to it."""
+    if backend == "qdrant":
+        return build_qdrant_vectorstore(doc_splits, google_api_key, qdrant_url, qdrant_api, collection_name=collection_name, progress_callback=progress_callback, k=k, score_threshold=score_threshold, sync=sync)
+    if backend == "local":
+        return build_local_vectorstore(doc_splits, google_api_key, collection_name=collection_name, progress_callback=progress_callback, k=k, score_threshold=score_threshold, sync=sync)
+    raise ValueError(f"Unknown vector backend: {backend!r} (expected 'qdrant' or 'local')")
+
+
+def _knowledge_version_path(collection_name: str, index_dir: str) -> str:
+    return os.path.join(index_dir, collection_name, "knowledge.json")
+
+
+def read_knowledge_version(collection_name: str = "agentic_collection", index_dir: str = LOCAL_INDEX_DIR) -> Dict[str, Any]:
+    """What was last ingested into a collection, as recorded by ``write_knowledge_version``."""
+    try:
+        with open(_knowledge_version_path(collection_name, index_dir), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"knowledge_hash": "", "files": []}
+
+
+def write_knowledge_version(knowledge_hash: str, files: List[str], collection_name: str = "agentic_collection", index_dir: str = LOCAL_INDEX_DIR) -> None:
+    # next to the index, so every worker process sharing it sees the same version
+    path = _knowledge_version_path(collection_name, index_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"knowledge_hash": knowledge_hash, "files": files}, f)
+    os.replace(tmp_path, path)
 
 
 def calculate_knowledge_hash(files):
-    content = ""
-    for file in files:
-        content += file.getvalue().decode(errors="ignore")
-    return hashlib.md5(content.encode()).hexdigest()
\ No newline at end of file
+    return build_manifest(files).hash
\ No newline at end of file
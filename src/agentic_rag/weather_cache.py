@@ -0,0 +1,89 @@
+import time
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, Optional, Tuple
+from config import WEATHER_CACHE_TTL
+
+
+class WeatherCache:
+    """Per-city TTL cache in front of the weather API.
+
+    Concurrent lookups for the same city share one in-flight request: the
+    first caller fetches, later callers wait on its future. Failures are
+    passed to every waiter and are not cached.
+    """
+
+    def __init__(self, ttl_seconds: float = 600.0, max_entries: int = 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._entries: Dict[str, Tuple[float, str]] = {}
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(city: str) -> str:
+        return " ".join(city.lower().split())
+
+    def get(self, city: str, fetch: Callable[[str], str]) -> str:
+        key = self._key(city)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.time():
+                self.hits += 1
+                return entry[1]
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                self.misses += 1
+                future = self._inflight[key] = Future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            return future.result()
+
+        try:
+            result = fetch(city)
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            future.set_exception(e)
+            raise
+        with self._lock:
+            self._inflight.pop(key, None)
+            if len(self._entries) >= self.max_entries:
+                self._evict()
+            self._entries[key] = (time.time() + self.ttl_seconds, result)
+        future.set_result(result)
+        return result
+
+    def _evict(self) -> None:
+        now = time.time()
+        for key in [key for key, (expires_at, _) in self._entries.items() if expires_at <= now]:
+            del self._entries[key]
+        if len(self._entries) >= self.max_entries:
+            # drop whatever expires soonest
+            del self._entries[min(self._entries, key=lambda key: self._entries[key][0])]
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": len(self._entries),
+        }
+
+
+_SHARED_CACHE: Optional[WeatherCache] = None
+
+
+def get_weather_cache() -> WeatherCache:
+    global _SHARED_CACHE
+    if _SHARED_CACHE is None:
+        _SHARED_CACHE = WeatherCache(ttl_seconds=WEATHER_CACHE_TTL)
+    return _SHARED_CACHE
+